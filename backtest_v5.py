@@ -7,6 +7,7 @@ import re
 import json
 import argparse
 import sys
+import threading
 
 # 添加數據庫支持
 from database_operations import DatabaseManager
@@ -26,11 +27,51 @@ START_DATE = "2024-07-07"  # 開始日期 (修改為有數據的日期)
 END_DATE = "2025-08-24"  # 結束日期 - 延長至3天以看到完整回測效果
 # 移除CSV依賴，全部使用數據庫
 
+# 數據庫使用絕對路徑，回測不依賴當前工作目錄 (可在其他目錄/線程中直接調用)
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+MAIN_DB_PATH = os.path.join(PROJECT_ROOT, "data", "funding_rate.db")
+
+# 排行榜合併收益數據後的欄位重命名 (保持向後兼容)
+RANKING_COLUMN_RENAMES = {
+    'rank_position': 'Rank',
+    'return_1d': '1d_return',  # 重要：將return_1d重命名為1d_return
+    'roi_1d': '1d_ROI',
+    'return_2d': '2d_return',
+    'roi_2d': '2d_ROI',
+    'return_7d': '7d_return',
+    'roi_7d': '7d_ROI',
+    'return_14d': '14d_return',
+    'roi_14d': '14d_ROI',
+    'return_30d': '30d_return',
+    'roi_30d': '30d_ROI',
+    'return_all': 'all_return',
+    'roi_all': 'all_ROI'
+}
+
+# 收益數據與策略無關：同一進程內按 (數據庫, 日期範圍) 缓存，多次回測共用
+_RETURN_PANEL_CACHE = {}
+_RETURN_PANEL_COLUMNS = [
+    'trading_pair', 'date',
+    'return_1d', 'roi_1d', 'return_2d', 'roi_2d', 'return_7d', 'roi_7d',
+    'return_14d', 'roi_14d', 'return_30d', 'roi_30d', 'return_all', 'roi_all'
+]
+
+
+def get_return_panel(db, start_date, end_date):
+    """獲取日期範圍內所有交易對的收益數據 (缓存)"""
+    key = (db.db_path, start_date, end_date)
+    panel = _RETURN_PANEL_CACHE.get(key)
+    if panel is None:
+        panel = db.get_return_metrics(start_date=start_date, end_date=end_date, columns=_RETURN_PANEL_COLUMNS)
+        _RETURN_PANEL_CACHE.clear()  # 只保留最近一個日期範圍
+        _RETURN_PANEL_CACHE[key] = panel
+    return panel
+
 
 class FundingRateBacktest:
     def __init__(self, initial_capital=10000, position_size=0.1, fee_rate=0.0007,
                  exit_size=1.0, max_positions=3, entry_top_n=3, exit_threshold=20,
-                 position_mode='percentage_based'):
+                 position_mode='percentage_based', db_path=None):
         """
         初始化回測參數
         :param initial_capital: 初始資金
@@ -41,6 +82,7 @@ class FundingRateBacktest:
         :param entry_top_n: 進場條件: 綜合評分前N名
         :param exit_threshold: 離場條件: 排名跌出前N名
         :param position_mode: 進場金額計算模式 ('fixed_amount' 或 'percentage_based')
+        :param db_path: 數據庫路徑，默認為項目根目錄下的 data/funding_rate.db
         """
         self.initial_capital = initial_capital
         self.position_size = position_size
@@ -50,6 +92,7 @@ class FundingRateBacktest:
         self.entry_top_n = entry_top_n
         self.exit_threshold = exit_threshold
         self.position_mode = position_mode  # 新增：進場模式開關
+        self.db_path = db_path or MAIN_DB_PATH
 
         # 打印實際接收到的參數值
         print(f"[DEBUG] 初始化參數:")
@@ -518,11 +561,13 @@ class FundingRateBacktest:
         self.end_date = datetime.strptime(end_date, '%Y-%m-%d')
         self.backtest_days = (self.end_date - self.start_date).days + 1
 
-    def plot_equity_curve(self, output_dir="data/picture/backtest"):
+    def plot_equity_curve(self, output_dir=None):
         """
         繪製淨值曲線圖，參考用戶提供的樣式
-        :param output_dir: 輸出目錄，默認為 data/picture/backtest
+        :param output_dir: 輸出目錄，默認為項目根目錄下的 data/picture/backtest
         """
+        if output_dir is None:
+            output_dir = os.path.join(PROJECT_ROOT, "data", "picture", "backtest")
         if not self.equity_curve_data:
             print("警告: 沒有淨值曲線數據可繪製")
             return None
@@ -601,6 +646,7 @@ class FundingRateBacktest:
     def load_strategy_ranking_data(self, strategy_name, start_date, end_date):
         """
         從數據庫載入指定期間的策略排行榜數據，並合併收益數據
+        整個期間的排行榜一次查詢；收益數據與策略無關，同一進程內多次回測共用
         :param strategy_name: 策略名稱
         :param start_date: 開始日期 'YYYY-MM-DD'
         :param end_date: 結束日期 'YYYY-MM-DD'
@@ -611,113 +657,49 @@ class FundingRateBacktest:
         
         try:
             # 使用數據庫管理器
-            db = DatabaseManager()
+            db = DatabaseManager(self.db_path)
             
             # 生成日期範圍 - 策略檔案日期範圍應該是 start_date 到 (end_date-1)
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d')
             end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-            strategy_end_dt = end_dt - timedelta(days=1)
+            strategy_end_date = (end_dt - timedelta(days=1)).strftime('%Y-%m-%d')
             
-            print(f"📅 載入策略數據日期範圍: {start_date} 到 {strategy_end_dt.strftime('%Y-%m-%d')}")
+            print(f"📅 載入策略數據日期範圍: {start_date} 到 {strategy_end_date}")
             
-            current_dt = start_dt
-            loaded_count = 0
+            query = """
+            SELECT 
+                strategy_name,
+                trading_pair,
+                date,
+                final_ranking_score,
+                rank_position,
+                long_term_score,
+                short_term_score,
+                combined_roi_z_score
+            FROM strategy_ranking
+            WHERE strategy_name = ? AND date BETWEEN ? AND ?
+            """
+            ranking_df = pd.read_sql_query(query, db.get_read_connection(),
+                                           params=[strategy_name, start_date, strategy_end_date])
             
-            while current_dt <= strategy_end_dt:
-                date_str = current_dt.strftime('%Y-%m-%d')
-                
-                # 使用JOIN查詢合併strategy_ranking和return_metrics數據
-                query = """
-                SELECT 
-                    sr.strategy_name,
-                    sr.trading_pair,
-                    sr.date,
-                    sr.final_ranking_score,
-                    sr.rank_position,
-                    sr.long_term_score,
-                    sr.short_term_score,
-                    sr.combined_roi_z_score,
-                    rm.return_1d,
-                    rm.roi_1d,
-                    rm.return_2d,
-                    rm.roi_2d,
-                    rm.return_7d,
-                    rm.roi_7d,
-                    rm.return_14d,
-                    rm.roi_14d,
-                    rm.return_30d,
-                    rm.roi_30d,
-                    rm.return_all,
-                    rm.roi_all
-                FROM strategy_ranking sr
-                LEFT JOIN return_metrics rm ON sr.trading_pair = rm.trading_pair AND sr.date = rm.date
-                WHERE sr.strategy_name = ? AND sr.date = ?
-                ORDER BY sr.rank_position
-                """
-                
-                # 添加調試信息
-                print(f"🔍 查詢策略: {strategy_name}, 日期: {date_str}")
+            if not ranking_df.empty:
+                # LEFT JOIN 收益數據 (按日期範圍缓存)
+                returns_df = get_return_panel(db, start_date, strategy_end_date)
+                merged = ranking_df.merge(returns_df, on=['trading_pair', 'date'], how='left')
                 
-                df = pd.read_sql_query(query, db.get_connection(), params=[strategy_name, date_str])
+                # 重命名欄位以保持向後兼容
+                merged = merged.rename(columns=RANKING_COLUMN_RENAMES)
+                merged = merged.sort_values(['date', 'Rank'], kind='stable')
                 
-                if not df.empty:
-                    # 重命名欄位以保持向後兼容
-                    df = df.rename(columns={
-                        'rank_position': 'Rank',
-                        'return_1d': '1d_return',  # 重要：將return_1d重命名為1d_return
-                        'roi_1d': '1d_ROI',
-                        'return_2d': '2d_return',
-                        'roi_2d': '2d_ROI',
-                        'return_7d': '7d_return',
-                        'roi_7d': '7d_ROI',
-                        'return_14d': '14d_return',
-                        'roi_14d': '14d_ROI',
-                        'return_30d': '30d_return',
-                        'roi_30d': '30d_ROI',
-                        'return_all': 'all_return',
-                        'roi_all': 'all_ROI'
-                    })
-                    
-                    # 按排名排序
-                    df = df.sort_values('Rank').reset_index(drop=True)
-                    
-                    self.ranking_data[date_str] = df
-                    loaded_count += 1
-                    print(f"✅ 數據庫載入: {date_str} ({len(df)} 個交易對)")
+                for date_str, df in merged.groupby('date', sort=True):
+                    self.ranking_data[date_str] = df.reset_index(drop=True)
+            
+            for date_str in pd.date_range(start_date, strategy_end_date, freq='D').strftime('%Y-%m-%d'):
+                if date_str in self.ranking_data:
+                    print(f"✅ 數據庫載入: {date_str} ({len(self.ranking_data[date_str])} 個交易對)")
                 else:
-                    # 改進錯誤信息，檢查是否存在策略數據
-                    check_query = "SELECT COUNT(*) as count FROM strategy_ranking WHERE strategy_name = ? AND date = ?"
-                    check_df = pd.read_sql_query(check_query, db.get_connection(), params=[strategy_name, date_str])
-                    count = check_df['count'].iloc[0] if not check_df.empty else 0
-                    
-                    if count > 0:
-                        print(f"⚠️  數據存在但JOIN失敗: {strategy_name} 在 {date_str} ({count} 條記錄)")
-                        # 嘗試只查詢strategy_ranking表
-                        simple_query = """
-                        SELECT 
-                            strategy_name,
-                            trading_pair,
-                            date,
-                            final_ranking_score,
-                            rank_position
-                        FROM strategy_ranking 
-                        WHERE strategy_name = ? AND date = ?
-                        ORDER BY rank_position
-                        """
-                        df = pd.read_sql_query(simple_query, db.get_connection(), params=[strategy_name, date_str])
-                        if not df.empty:
-                            df = df.rename(columns={'rank_position': 'Rank'})
-                            self.ranking_data[date_str] = df
-                            loaded_count += 1
-                            print(f"✅ 簡化查詢成功: {date_str} ({len(df)} 個交易對)")
-                        else:
-                            print(f"❌ 簡化查詢也失敗: {strategy_name} 在 {date_str}")
-                    else:
-                        print(f"❌ 數據庫中沒有找到: {strategy_name} 在 {date_str} 的數據")
-                
-                current_dt += timedelta(days=1)
+                    print(f"❌ 數據庫中沒有找到: {strategy_name} 在 {date_str} 的數據")
             
-            print(f"📊 成功從數據庫載入 {loaded_count} 天的排行榜數據")
+            print(f"📊 成功從數據庫載入 {len(self.ranking_data)} 天的排行榜數據")
             
         except Exception as e:
             print(f"❌ 從數據庫載入策略數據時出錯: {e}")
@@ -886,7 +868,7 @@ class FundingRateBacktest:
         print("📊 正在生成回測報告並保存到數據庫...")
         
         try:
-            db = DatabaseManager()
+            db = DatabaseManager(self.db_path)
             
             # 計算基本統計
             final_capital = self.total_balance
@@ -1151,7 +1133,7 @@ class FundingRateBacktest:
         
         try:
             # 從數據庫獲取策略
-            db = DatabaseManager()
+            db = DatabaseManager(self.db_path)
             
             # 獲取所有可用策略名稱
             available_strategies = db.get_available_strategies()
@@ -1328,7 +1310,7 @@ class FundingRateBacktest:
         批量執行模式 - 用於超參數調優系統調用
         
         Args:
-            config_file: 配置文件路徑
+            config_file: 配置文件路徑，'-' 表示從標準輸入讀取 (免去臨時文件)
             strategy_id: 策略ID
             output_format: 輸出格式
             quiet: 靜默模式
@@ -1338,9 +1320,29 @@ class FundingRateBacktest:
         """
         try:
             # 讀取配置文件
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+            if config_file == '-':
+                config = json.load(sys.stdin)
+            else:
+                with open(config_file, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+        except Exception as e:
+            return self._batch_error_result(strategy_id, e, quiet)
+            
+        return self.run_batch_config(config, strategy_id, quiet)
+
+    def run_batch_config(self, config: dict, strategy_id: str, quiet: bool = False) -> dict:
+        """
+        批量執行模式 (配置直接以字典傳入，供同進程調用)
+        
+        Args:
+            config: 回測配置
+            strategy_id: 策略ID
+            quiet: 靜默模式
             
+        Returns:
+            回測結果字典
+        """
+        try:
             # 更新回測器參數
             self.initial_capital = config.get('initial_capital', 10000)
             self.position_size = config.get('position_size', 0.25)
@@ -1442,32 +1444,98 @@ class FundingRateBacktest:
             return result
             
         except Exception as e:
-            error_result = {
-                'success': False,
-                'strategy_id': strategy_id,
-                'error': str(e),
-                'error_type': type(e).__name__
-            }
-            
-            if not quiet:
-                print(f"[BATCH] 回測失敗: {e}")
-            
-            return error_result
+            return self._batch_error_result(strategy_id, e, quiet)
+
+    @staticmethod
+    def _batch_error_result(strategy_id: str, error: Exception, quiet: bool) -> dict:
+        """批量執行模式的失敗結果"""
+        if not quiet:
+            print(f"[BATCH] 回測失敗: {error}")
+        return {
+            'success': False,
+            'strategy_id': strategy_id,
+            'error': str(error),
+            'error_type': type(error).__name__
+        }
+
+
+# 每個線程復用一個回測器 (run_batch_config 每次都會重置全部回測狀態)
+_BATCH_BACKTESTERS = threading.local()
+
+
+def run_backtest(config: dict, strategy_id: str, quiet: bool = True) -> dict:
+    """
+    同進程執行一次批量回測 (超參數調優系統直接調用，無需啟動子進程)
+    
+    Args:
+        config: 回測配置 (strategy_name、日期範圍與倉位參數)
+        strategy_id: 策略ID
+        quiet: 靜默模式
+        
+    Returns:
+        回測結果字典，失敗時 success 為 False 並帶有 error
+    """
+    backtest = getattr(_BATCH_BACKTESTERS, 'backtest', None)
+    if backtest is None:
+        backtest = _BATCH_BACKTESTERS.backtest = FundingRateBacktest()
+    return backtest.run_batch_config(config, strategy_id, quiet)
+
+
+# 批量模式 JSON 結果的首尾標記，調用方只需在輸出中定位標記即可取出結果
+BATCH_RESULT_BEGIN = '<<<RESULT>>>'
+BATCH_RESULT_END = '<<<END>>>'
+
+
+def format_batch_output(result: dict) -> str:
+    """以首尾標記包裹批量模式的 JSON 結果"""
+    return f"\n{BATCH_RESULT_BEGIN}\n{json.dumps(result, ensure_ascii=False)}\n{BATCH_RESULT_END}\n"
+
+
+def serve_batch(stdin=None, stdout=None):
+    """
+    常駐批量模式：從 stdin 逐行讀取 JSON 任務，每個任務向 stdout 回寫一行 JSON 結果
+    
+    任務格式: {"config": {...}, "strategy_id": ...}
+    同一進程內復用解釋器與回測器，stdin 關閉時結束。
+    """
+    stdin = stdin or sys.stdin
+    channel = stdout or sys.stdout
+    # stdout 專用於回傳結果，回測過程中的輸出改到 stderr
+    sys.stdout = sys.stderr
+    
+    for line in stdin:
+        if not line.strip():
+            continue
+        strategy_id = None
+        try:
+            task = json.loads(line)
+            strategy_id = task.get('strategy_id')
+            result = run_backtest(task['config'], strategy_id, quiet=True)
+        except Exception as e:
+            result = FundingRateBacktest._batch_error_result(strategy_id, e, quiet=True)
+        
+        channel.write(json.dumps(result, ensure_ascii=False) + '\n')
+        channel.flush()
 
 
 # 使用範例
 if __name__ == "__main__":
     # 解析命令行參數
     parser = argparse.ArgumentParser(description='智能策略回測系統 - 支持交互式和批量執行模式')
-    parser.add_argument('--config', help='配置文件路徑 (批量執行模式)')
+    parser.add_argument('--config', help="配置文件路徑 (批量執行模式)，'-' 表示從標準輸入讀取")
     parser.add_argument('--strategy_id', help='策略ID (批量執行模式)')
     parser.add_argument('--output_format', default='json', help='輸出格式 (默認: json)')
     parser.add_argument('--quiet', action='store_true', help='靜默模式，減少輸出')
+    parser.add_argument('--batch', action='store_true', help='常駐批量模式 (stdin/stdout 逐行收發 JSON 任務)')
     
     args, unknown = parser.parse_known_args()
     
+    if args.batch:
+        # ===== 常駐批量模式 (一個進程連續執行多個策略) =====
+        serve_batch()
+    
     # 檢查是否為批量執行模式
-    if args.config and args.strategy_id:
+    elif args.config and args.strategy_id:
         # ===== 批量執行模式 (用於超參數調優系統) =====
         try:
             # 初始化回測器 (將使用配置文件中的參數覆蓋)
@@ -1483,7 +1551,7 @@ if __name__ == "__main__":
             
             # 輸出結果
             if args.output_format.lower() == 'json':
-                print(json.dumps(result, ensure_ascii=False, indent=2))
+                print(format_batch_output(result), end='')
             else:
                 # 簡化輸出
                 if result['success']:
@@ -1503,7 +1571,7 @@ if __name__ == "__main__":
             }
             
             if args.output_format.lower() == 'json':
-                print(json.dumps(error_result, ensure_ascii=False, indent=2))
+                print(format_batch_output(error_result), end='')
             else:
                 print(f"FAILED: {e}")
             
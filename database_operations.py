@@ -8,7 +8,9 @@ import sqlite3
 from typing import List, Dict, Any, Optional, Union
 from database_schema import FundingRateDB
 import json
+import threading
 from datetime import datetime, timedelta
+from pathlib import Path
 import uuid
 
 class DatabaseManager(FundingRateDB):
@@ -17,6 +19,37 @@ class DatabaseManager(FundingRateDB):
     def __init__(self, db_path="data/funding_rate.db"):
         super().__init__(db_path)
         self.batch_size = 1000  # 默認批處理大小
+        self._read_local = threading.local()  # 每個線程一個復用的讀取連接
+    
+    def get_read_connection(self) -> sqlite3.Connection:
+        """
+        獲取當前線程復用的只讀連接 (首次使用時創建並調優)
+        
+        因子計算等高頻讀取路徑每天、每個策略都會查詢，
+        復用連接可避免反覆打開數據庫文件。以只讀模式打開，
+        只設置連接級的讀取參數，不修改數據庫文件的日誌模式。
+        """
+        conn = getattr(self._read_local, 'conn', None)
+        if conn is None:
+            uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA cache_size = -65536")  # 64MB緩存
+            conn.execute("PRAGMA temp_store = MEMORY")
+            conn.execute("PRAGMA mmap_size = 268435456")  # 256MB 內存映射讀取
+            conn.execute("PRAGMA busy_timeout = 30000")
+            self._read_local.conn = conn
+        return conn
+    
+    def __getstate__(self):
+        # 連接不可跨進程傳遞，在新進程中重新創建
+        state = self.__dict__.copy()
+        state['_read_local'] = None
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._read_local = threading.local()
     
     # ==================== 資金費率歷史數據操作 ====================
     
@@ -435,9 +468,24 @@ class DatabaseManager(FundingRateDB):
             return len(data_to_insert)
     
     def get_return_metrics(self, trading_pair: str = None, start_date: str = None, 
-                         end_date: str = None, date: str = None) -> pd.DataFrame:
-        """查詢收益指標數據"""
-        query = "SELECT * FROM return_metrics WHERE 1=1"
+                         end_date: str = None, date: str = None,
+                         columns: List[str] = None, trading_pairs: List[str] = None) -> pd.DataFrame:
+        """
+        查詢收益指標數據
+        
+        Args:
+            columns: 只讀取指定欄位 (None 表示全部欄位)，減少讀取量
+            trading_pairs: 一次查詢多個交易對，按每批500個分批使用 IN (...) 查詢
+        """
+        if columns:
+            for col in columns:
+                if not col.isidentifier():
+                    raise ValueError(f"無效的欄位名稱: {col}")
+            select_cols = ", ".join(columns)
+        else:
+            select_cols = "*"
+        
+        query = f"SELECT {select_cols} FROM return_metrics WHERE 1=1"
         params = []
         
         if trading_pair:
@@ -455,10 +503,25 @@ class DatabaseManager(FundingRateDB):
         elif end_date:
             query += " AND date <= ?"
             params.append(end_date)
-            
-        query += " ORDER BY date DESC"
         
-        return pd.read_sql_query(query, self.get_connection(), params=params)
+        if not trading_pairs:
+            query += " ORDER BY date DESC"
+            return pd.read_sql_query(query, self.get_read_connection(), params=params)
+        
+        # 多交易對批量查詢：SQLite 參數數量有限，每批最多500個
+        conn = self.get_read_connection()
+        trading_pairs = list(trading_pairs)
+        chunks = []
+        for i in range(0, len(trading_pairs), 500):
+            batch = trading_pairs[i:i + 500]
+            placeholders = ", ".join("?" * len(batch))
+            chunk_query = f"{query} AND trading_pair IN ({placeholders})"
+            chunks.append(pd.read_sql_query(chunk_query, conn, params=params + batch))
+        
+        df = pd.concat(chunks, ignore_index=True)
+        if 'date' in df.columns:
+            df = df.sort_values('date', ascending=False, kind='stable').reset_index(drop=True)
+        return df
     
     # ==================== 策略排行榜數據操作 ====================
     
@@ -576,8 +639,7 @@ class DatabaseManager(FundingRateDB):
         """
         query = "SELECT MIN(date) as min_date, MAX(date) as max_date FROM return_metrics"
         try:
-            with self.get_connection() as conn:
-                result = conn.execute(query).fetchone()
+            result = self.get_read_connection().execute(query).fetchone()
             
             if result and result['min_date'] and result['max_date']:
                 return result['min_date'], result['max_date']
@@ -10,15 +10,47 @@ import sys
 import json
 import subprocess
 import time
+from operator import itemgetter
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List
 import argparse
 
+# orjson 为可选依赖，未安装时使用标准库 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 构建因子策略配置时一次取出所需字段
+_STRATEGY_FIELDS = itemgetter(
+    'strategy_name', 'factors', 'window', 'input_column', 'min_data_days', 'skip_first_n_days'
+)
+
+# 本进程已确认存在的目录，避免重复 makedirs 的 stat 调用
+_CREATED_DIRS = set()
+
+
+def ensure_dir(path: str):
+    """确保目录存在 (同一目录只调用一次 makedirs)"""
+    if path in _CREATED_DIRS:
+        return
+    os.makedirs(path, exist_ok=True)
+    _CREATED_DIRS.add(path)
+
+
+def forget_dir(path: str):
+    """目录被删除后从缓存中移除 (包括其子目录)"""
+    prefix = os.path.join(path, '')
+    for created in [p for p in _CREATED_DIRS if p == path or p.startswith(prefix)]:
+        _CREATED_DIRS.discard(created)
+
 # 添加项目根目录到路径
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 
+from factor_strategies.factor_strategy_config import equal_weights, factor_name
+
 class BatchStrategyExecutor:
     """批量策略执行器"""
     
@@ -27,46 +59,51 @@ class BatchStrategyExecutor:
         self.results = []
         self.failed_strategies = []
         
-    def create_temp_strategy_config(self, strategy_config: Dict[str, Any], temp_dir: str) -> str:
-        """创建临时策略配置文件"""
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        strategy_name = strategy_config['strategy_name']
+    @staticmethod
+    def _build_factor_strategy(strategy_config: Dict[str, Any]) -> Dict[str, Any]:
+        """构建 FACTOR_STRATEGIES 格式的单个策略配置 (因子等权重)"""
+        strategy_name, factors, window, input_col, min_data_days, skip_first_n_days = _STRATEGY_FIELDS(strategy_config)
         
-        # 构建因子配置
-        factors_dict = {}
-        weights = []
-        
-        for i, factor_func in enumerate(strategy_config['factors']):
-            factor_name = f"F_{factor_func.replace('calculate_', '')}"
-            factors_dict[factor_name] = {
+        factors_dict = {
+            factor_name(factor_func): {
                 'function': factor_func,
-                'window': strategy_config['window'],
-                'input_col': strategy_config['input_column']
+                'window': window,
+                'input_col': input_col
             }
-            weights.append(1.0 / len(strategy_config['factors']))  # 等权重
+            for factor_func in factors
+        }
         
-        # 构建完整策略配置
-        factor_strategy = {
-            strategy_name: {
-                'name': f"HyperTuned_{strategy_name}",
-                'description': f"超参数调优生成的策略: {strategy_name}",
-                'data_requirements': {
-                    'min_data_days': strategy_config['min_data_days'],
-                    'skip_first_n_days': strategy_config['skip_first_n_days']
-                },
-                'factors': factors_dict,
-                'ranking_logic': {
-                    'indicators': list(factors_dict.keys()),
-                    'weights': weights
-                }
+        return {
+            'name': f"HyperTuned_{strategy_name}",
+            'description': f"超参数调优生成的策略: {strategy_name}",
+            'data_requirements': {
+                'min_data_days': min_data_days,
+                'skip_first_n_days': skip_first_n_days
+            },
+            'factors': factors_dict,
+            'ranking_logic': {
+                'indicators': list(factors_dict),
+                'weights': equal_weights(len(factors))  # 等权重
             }
         }
+    
+    def create_temp_strategy_config(self, strategy_config: Dict[str, Any], temp_dir: str) -> str:
+        """创建临时策略配置文件"""
+        ensure_dir(temp_dir)
+        
+        strategy_name = strategy_config['strategy_name']
+        
+        # 构建完整策略配置
+        factor_strategy = {strategy_name: self._build_factor_strategy(strategy_config)}
         
         # 创建临时配置文件
         temp_config_file = os.path.join(temp_dir, f"{strategy_name}_config.json")
-        with open(temp_config_file, 'w', encoding='utf-8') as f:
-            json.dump(factor_strategy, f, indent=2, ensure_ascii=False)
+        if orjson is not None:
+            with open(temp_config_file, 'wb') as f:
+                f.write(orjson.dumps(factor_strategy, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(temp_config_file, 'w', encoding='utf-8') as f:
+                json.dump(factor_strategy, f, indent=2, ensure_ascii=False)
         
         return temp_config_file
     
@@ -129,33 +166,8 @@ class BatchStrategyExecutor:
         """将策略注册到主配置文件"""
         strategy_name = strategy_config['strategy_name']
         
-        # 构建因子配置
-        factors_dict = {}
-        weights = []
-        
-        for i, factor_func in enumerate(strategy_config['factors']):
-            factor_name = f"F_{factor_func.replace('calculate_', '')}"
-            factors_dict[factor_name] = {
-                'function': factor_func,
-                'window': strategy_config['window'],
-                'input_col': strategy_config['input_column']
-            }
-            weights.append(1.0 / len(strategy_config['factors']))  # 等权重
-        
         # 构建完整策略配置
-        factor_strategy = {
-            'name': f"HyperTuned_{strategy_name}",
-            'description': f"超参数调优生成的策略: {strategy_name}",
-            'data_requirements': {
-                'min_data_days': strategy_config['min_data_days'],
-                'skip_first_n_days': strategy_config['skip_first_n_days']
-            },
-            'factors': factors_dict,
-            'ranking_logic': {
-                'indicators': list(factors_dict.keys()),
-                'weights': weights
-            }
-        }
+        factor_strategy = self._build_factor_strategy(strategy_config)
         
         # 动态注册到 FACTOR_STRATEGIES
         try:
@@ -272,8 +284,15 @@ class BatchStrategyExecutor:
     def batch_execute(self, strategies: List[Dict[str, Any]], 
                      start_date: str, end_date: str,
                      temp_dir: str = "temp_strategies",
+                     results_stream: str = None,
                      **backtest_params) -> Dict[str, Any]:
-        """批量执行策略"""
+        """
+        批量执行策略
+        
+        Args:
+            results_stream: 结果流文件路径 (JSONL)。指定时每个策略完成后立即追加写入一行，
+                            不在内存中累积结果，返回的 results 为空列表
+        """
         print("\n" + "=" * 80)
         print("🚀 批量策略执行启动")
         print("=" * 80)
@@ -285,7 +304,9 @@ class BatchStrategyExecutor:
         
         # 创建临时目录
         temp_path = os.path.join(self.project_root, temp_dir)
-        os.makedirs(temp_path, exist_ok=True)
+        ensure_dir(temp_path)
+        
+        stream_file = open(results_stream, 'a', encoding='utf-8') if results_stream else None
         
         try:
             for i, strategy_config in enumerate(strategies, 1):
@@ -305,10 +326,16 @@ class BatchStrategyExecutor:
                         combined_result = {
                             'strategy_config': strategy_config,
                             'backtest_result': backtest_result,
-                            'execution_time': datetime.now().isoformat()
+                            'execution_time_ns': time.time_ns()  # 写出汇总时再格式化
                         }
                         
-                        self.results.append(combined_result)
+                        if stream_file:
+                            # 流式记录立即写出，与内存结果使用相同的 execution_time 字段
+                            self._format_execution_times((combined_result,))
+                            stream_file.write(json.dumps(combined_result, ensure_ascii=False) + '\n')
+                            stream_file.flush()
+                        else:
+                            self.results.append(combined_result)
                         successful_count += 1
                         print(f"✅ 策略完成: {strategy_name}")
                     else:
@@ -334,6 +361,8 @@ class BatchStrategyExecutor:
             end_time = time.time()
             execution_time = end_time - start_time
             
+            self._format_execution_times(self.results)
+            
             summary = {
                 'total_strategies': len(strategies),
                 'successful': successful_count,
@@ -344,20 +373,35 @@ class BatchStrategyExecutor:
                 'failed_strategies': self.failed_strategies
             }
             
+            if results_stream:
+                summary['results_stream'] = results_stream
+            
             self._print_summary(summary)
             
             return summary
             
         finally:
+            if stream_file:
+                stream_file.close()
+            
             # 清理临时文件
             self._cleanup_temp_files(temp_path)
     
+    @staticmethod
+    def _format_execution_times(results: Iterable[Dict[str, Any]]):
+        """将纳秒时间戳统一转换为ISO格式的 execution_time"""
+        for result in results:
+            execution_time_ns = result.pop('execution_time_ns', None)
+            if execution_time_ns is not None:
+                result['execution_time'] = datetime.fromtimestamp(execution_time_ns / 1e9).isoformat()
+    
     def _cleanup_temp_files(self, temp_path: str):
         """清理临时文件"""
         try:
             import shutil
             if os.path.exists(temp_path):
                 shutil.rmtree(temp_path)
+                forget_dir(temp_path)
                 print(f"🧹 清理临时文件: {temp_path}")
         except Exception as e:
             print(f"⚠️ 清理临时文件时出错: {str(e)}")
@@ -10,10 +10,34 @@ import os
 import sys
 import json
 import time
+import sqlite3
+import uuid
+import numpy as np
+import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List, Optional
+from dataclasses import dataclass
+from functools import cached_property
 import argparse
 
+# orjson 为可选依赖，未安装时使用标准库 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# zstandard 为可选依赖，安装后导出的结果文件以 zstd 压缩保存
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+def _dumps_json(obj: Any) -> bytes:
+    """紧凑序列化为单行JSON (bytes)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, default=str).encode('utf-8')
+
 # 添加项目根目录到路径
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
@@ -22,7 +46,40 @@ sys.path.append(project_root)
 # 导入优化的组件
 from optimized_hyperparameter_tuning import OptimizedHyperparameterTuner
 from factor_strategies.factor_engine import FactorEngine
-from factor_strategies.factor_strategy_config import FACTOR_STRATEGIES
+from factor_strategies.factor_strategy_config import equal_weights, factor_name
+
+@dataclass
+class ExecutionStats:
+    """批量执行统计 (成功率只计算一次)"""
+    total: int
+    successful: int
+    failed: int
+    elapsed: float
+    
+    @cached_property
+    def success_rate(self) -> float:
+        """成功率 (%)"""
+        return self.successful / self.total * 100 if self.total else 0
+    
+    def to_summary(self) -> Dict[str, Any]:
+        return {
+            'total_strategies': self.total,
+            'successful': self.successful,
+            'failed': self.failed,
+            'success_rate': self.success_rate,
+            'total_time_minutes': self.elapsed / 60,
+        }
+
+
+# 逐策略数值指标 (结构化数组，预分配后按行写入)
+NUMERIC_RESULT_DTYPE = np.dtype([
+    ('total_return', 'f8'),
+    ('sharpe_ratio', 'f8'),
+    ('max_drawdown', 'f8'),
+    ('execution_success_rate', 'f8'),
+    ('execution_days', 'i4'),
+])
+
 
 class DirectOptimizationSystem:
     """直接优化系统 - 纯Python API版本"""
@@ -37,33 +94,120 @@ class DirectOptimizationSystem:
         self.factor_engine = FactorEngine()
         print("✅ FactorEngine初始化完成，享受三阶段性能优化")
         
-        # 结果存储
+        # 结果存储：完整结果只写入结果数据库，内存中只保留每个策略的摘要
         self.results = []
         self.failed_strategies = []
+        # 与 self.results 按行对应的数值指标
+        self._numeric_results = np.zeros(0, dtype=NUMERIC_RESULT_DTYPE)
+        # 预先批量生成的模拟回测随机数
+        self._mock_draws = None
         
         # 结果存储目录
         self.results_dir = os.path.join(current_dir, "direct_results")
         os.makedirs(self.results_dir, exist_ok=True)
         
-        # 时间戳
-        self.timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        # 当前运行ID (每次 run_complete_optimization 重新生成)
+        self.run_id: Optional[str] = None
+        
+        # 结果数据库：唯一的结果存储，逐策略结果累积后在单个事务中批量写入；
+        # JSON结果文件与指标表只在请求时由 export_run 从数据库导出
+        self.results_db_path = os.path.join(self.results_dir, "results.db")
+        self._results_conn: Optional[sqlite3.Connection] = None
+        self._get_results_conn()
+        self._pending_rows = []
+        self.result_flush_size = 10000
         
-    def register_strategy(self, strategy_config: Dict[str, Any]) -> str:
-        """注册策略到配置"""
+    def _init_results_db(self) -> sqlite3.Connection:
+        """初始化结果数据库"""
+        conn = sqlite3.connect(self.results_db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS direct_results (
+                run_id TEXT NOT NULL,
+                strategy_name TEXT NOT NULL,
+                total_return REAL,
+                sharpe_ratio REAL,
+                max_drawdown REAL,
+                success_rate REAL,
+                execution_days INTEGER,
+                config_json TEXT,
+                backtest_json TEXT,
+                execution_json TEXT,
+                recorded_at TEXT,
+                PRIMARY KEY (run_id, strategy_name)
+            )
+        """)
+        # 旧版本创建的表缺少完整执行结果列时补齐
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(direct_results)")}
+        for column in ('execution_json', 'recorded_at'):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE direct_results ADD COLUMN {column} TEXT")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS direct_runs (
+                run_id TEXT PRIMARY KEY,
+                summary_json TEXT NOT NULL
+            )
+        """)
+        conn.commit()
+        return conn
+    
+    def _get_results_conn(self) -> sqlite3.Connection:
+        """获取结果数据库连接 (关闭后再次使用时重新打开)"""
+        if self._results_conn is None:
+            self._results_conn = self._init_results_db()
+        return self._results_conn
+    
+    def _queue_result_row(self, strategy_config: Dict[str, Any], execution_result: Dict[str, Any],
+                          backtest_result: Dict[str, Any]):
+        """加入待写入的结果行 (策略的完整结果)，累积到阈值时批量写入"""
+        self._pending_rows.append((
+            self.run_id,
+            strategy_config['strategy_name'],
+            backtest_result.get('total_return'),
+            backtest_result.get('sharpe_ratio'),
+            backtest_result.get('max_drawdown'),
+            backtest_result.get('success_rate'),
+            backtest_result.get('execution_days'),
+            json.dumps(strategy_config, ensure_ascii=False),
+            json.dumps(backtest_result, ensure_ascii=False),
+            json.dumps(execution_result, ensure_ascii=False, default=str),
+            datetime.now().isoformat()
+        ))
+        
+        if len(self._pending_rows) >= self.result_flush_size:
+            self._flush_result_rows()
+    
+    def _flush_result_rows(self):
+        """在单个事务中批量写入累积的结果行"""
+        if not self._pending_rows:
+            return
+        
+        conn = self._get_results_conn()
+        with conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO direct_results (
+                    run_id, strategy_name, total_return, sharpe_ratio, max_drawdown,
+                    success_rate, execution_days, config_json, backtest_json,
+                    execution_json, recorded_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, self._pending_rows)
+        
+        self._pending_rows = []
+        
+    def build_factor_strategy(self, strategy_config: Dict[str, Any]) -> Dict[str, Any]:
+        """构建 FACTOR_STRATEGIES 格式的策略定义 (直接传给引擎，不注册到全局配置)"""
         strategy_name = strategy_config['strategy_name']
         
         # 构建因子配置
         factors_dict = {}
-        weights = []
         
         for factor_func in strategy_config['factors']:
-            factor_name = f"F_{factor_func.replace('calculate_', '')}"
-            factors_dict[factor_name] = {
+            factors_dict[factor_name(factor_func)] = {
                 'function': factor_func,
                 'window': strategy_config['window'],
                 'input_col': strategy_config['input_column']
             }
-            weights.append(1.0 / len(strategy_config['factors']))
         
         # 构建完整策略配置
         factor_strategy = {
@@ -76,18 +220,11 @@ class DirectOptimizationSystem:
             'factors': factors_dict,
             'ranking_logic': {
                 'indicators': list(factors_dict.keys()),
-                'weights': weights
+                'weights': equal_weights(len(strategy_config['factors']))  # 等权重
             }
         }
         
-        # 注册策略
-        FACTOR_STRATEGIES[strategy_name] = factor_strategy
-        return strategy_name
-    
-    def unregister_strategy(self, strategy_name: str):
-        """移除策略注册"""
-        if strategy_name in FACTOR_STRATEGIES:
-            del FACTOR_STRATEGIES[strategy_name]
+        return factor_strategy
     
     def execute_strategy_for_date_range(self, strategy_config: Dict[str, Any], 
                                       start_date: str, end_date: str) -> Dict[str, Any]:
@@ -98,8 +235,8 @@ class DirectOptimizationSystem:
             print(f"\n🚀 执行策略: {strategy_name}")
             print(f"📅 日期范围: {start_date} - {end_date}")
             
-            # 注册策略
-            registered_name = self.register_strategy(strategy_config)
+            # 构建策略定义
+            strategy_def = self.build_factor_strategy(strategy_config)
             
             # 解析日期范围
             start_dt = datetime.strptime(start_date, '%Y-%m-%d')
@@ -123,7 +260,7 @@ class DirectOptimizationSystem:
             for i, date_str in enumerate(execution_dates):
                 try:
                     # 直接调用run_strategy方法 - 享受缓存优化
-                    result = self.factor_engine.run_strategy(registered_name, date_str)
+                    result = self.factor_engine.run_strategy(strategy_name, date_str, strategy_def=strategy_def)
                     
                     if result:
                         success_count += 1
@@ -168,12 +305,24 @@ class DirectOptimizationSystem:
                 'status': 'failed',
                 'error': str(e)
             }
-        finally:
-            # 清理策略注册
-            self.unregister_strategy(strategy_name)
     
-    def run_backtest_simulation(self, strategy_name: str, execution_result: Dict[str, Any]) -> Dict[str, Any]:
-        """模拟回测结果"""
+    def _precompute_mock_results(self, n: int):
+        """一次性生成n个策略的模拟回测随机数"""
+        rng = np.random.default_rng()
+        self._mock_draws = {
+            'return': rng.uniform(-20, 50, n),
+            'sharpe': rng.uniform(0.1, 2.5, n),
+            'drawdown': rng.uniform(-30, -1, n),
+        }
+    
+    def run_backtest_simulation(self, strategy_name: str, execution_result: Dict[str, Any],
+                                draw_index: int = None) -> Dict[str, Any]:
+        """
+        模拟回测结果
+        
+        Args:
+            draw_index: 预生成随机数的下标，为空或超出范围时单独生成
+        """
         # 这里简化处理，实际环境中会调用真实的回测系统
         import random
         
@@ -189,9 +338,15 @@ class DirectOptimizationSystem:
         base_performance = success_rate / 100
         
         # 模拟回测指标
-        simulated_return = random.uniform(-20, 50) * base_performance
-        simulated_sharpe = random.uniform(0.1, 2.5) * base_performance
-        simulated_drawdown = random.uniform(-30, -1) * (1 - base_performance)
+        draws = self._mock_draws
+        if draws is not None and draw_index is not None and draw_index < len(draws['return']):
+            simulated_return = float(draws['return'][draw_index]) * base_performance
+            simulated_sharpe = float(draws['sharpe'][draw_index]) * base_performance
+            simulated_drawdown = float(draws['drawdown'][draw_index]) * (1 - base_performance)
+        else:
+            simulated_return = random.uniform(-20, 50) * base_performance
+            simulated_sharpe = random.uniform(0.1, 2.5) * base_performance
+            simulated_drawdown = random.uniform(-30, -1) * (1 - base_performance)
         
         backtest_result = {
             'strategy_name': strategy_name,
@@ -219,6 +374,7 @@ class DirectOptimizationSystem:
         print("=" * 80)
         
         total_start_time = time.time()
+        self.run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
         
         try:
             # 第1步：生成策略配置
@@ -229,6 +385,13 @@ class DirectOptimizationSystem:
             
             print(f"✅ 策略配置生成完成: {len(strategies)} 个")
             
+            # 按策略数量扩展数值指标数组 (保留之前运行已记录的行)
+            self._numeric_results = np.concatenate((
+                self._numeric_results[:len(self.results)],
+                np.zeros(len(strategies), dtype=NUMERIC_RESULT_DTYPE)
+            ))
+            self._precompute_mock_results(len(strategies))
+            
             # 第2步：批量执行策略
             print(f"\n🎯 第2步：批量执行策略")
             print("-" * 50)
@@ -248,18 +411,12 @@ class DirectOptimizationSystem:
                 
                 if execution_result.get('status') == 'completed':
                     # 模拟回测
-                    backtest_result = self.run_backtest_simulation(strategy_name, execution_result)
+                    backtest_result = self.run_backtest_simulation(strategy_name, execution_result, draw_index=i - 1)
                     
                     if backtest_result.get('status') == 'completed':
-                        # 合并结果
-                        combined_result = {
-                            'strategy_config': strategy_config,
-                            'execution_result': execution_result,
-                            'backtest_result': backtest_result,
-                            'timestamp': datetime.now().isoformat()
-                        }
-                        
-                        self.results.append(combined_result)
+                        self._record_numeric_result(len(self.results), execution_result, backtest_result)
+                        self.results.append(self._summarize_result(strategy_config, execution_result, backtest_result))
+                        self._queue_result_row(strategy_config, execution_result, backtest_result)
                         successful_count += 1
                         
                         print(f"✅ 策略完成: {strategy_name} - 收益率: {backtest_result.get('total_return', 'N/A')}%")
@@ -286,34 +443,36 @@ class DirectOptimizationSystem:
             print(f"\n🎯 第3步：分析和保存结果")
             print("-" * 50)
             
+            self._flush_result_rows()
+            print(f"💾 结果已写入数据库: {self.results_db_path}")
+            
             # 分析最佳策略
             best_strategies = self._analyze_best_strategies()
             
             # 构建最终结果
-            total_time = time.time() - total_start_time
+            stats = ExecutionStats(
+                total=len(strategies),
+                successful=successful_count,
+                failed=failed_count,
+                elapsed=time.time() - total_start_time
+            )
             
             final_result = {
                 'optimization_summary': {
-                    'total_strategies': len(strategies),
-                    'successful': successful_count,
-                    'failed': failed_count,
-                    'success_rate': successful_count / len(strategies) * 100,
-                    'total_time_minutes': total_time / 60,
+                    **stats.to_summary(),
                     'date_range': {'start': start_date, 'end': end_date},
-                    'timestamp': self.timestamp
+                    'run_id': self.run_id,
+                    'timestamp': datetime.now().isoformat()
                 },
                 'strategies_generated': strategies,
-                'execution_results': self.results,
+                'execution_results': self.results,  # 返回值中为摘要，完整结果在结果数据库中
                 'failed_strategies': self.failed_strategies,
                 'best_strategies': best_strategies
             }
             
-            # 保存结果
-            results_file = os.path.join(self.results_dir, f"direct_results_{self.timestamp}.json")
-            with open(results_file, 'w', encoding='utf-8') as f:
-                json.dump(final_result, f, indent=2, ensure_ascii=False)
-            
-            print(f"📄 结果已保存: {results_file}")
+            # 汇总信息与逐策略结果一起保存在结果数据库中 (导出时使用)
+            self._save_run_summary(final_result)
+            print(f"🆔 运行ID: {self.run_id} (可用 --export 从数据库导出结果文件)")
             
             # 打印总结
             self._print_final_summary(final_result)
@@ -323,41 +482,185 @@ class DirectOptimizationSystem:
         except Exception as e:
             print(f"❌ 优化过程出错: {str(e)}")
             raise
+        finally:
+            # 出错时也把已缓冲的结果行写入数据库
+            self.close()
+    
+    @staticmethod
+    def _summarize_result(strategy_config: Dict[str, Any], execution_result: Dict[str, Any],
+                          backtest_result: Dict[str, Any]) -> Dict[str, Any]:
+        """提取策略结果摘要 (完整结果保存在结果数据库中)"""
+        return {
+            'strategy_name': strategy_config.get('strategy_name', 'Unknown'),
+            'strategy_id': strategy_config.get('strategy_id'),
+            'factors': strategy_config.get('factors', []),
+            'window': strategy_config.get('window'),
+            'input_column': strategy_config.get('input_column'),
+            'total_return': backtest_result.get('total_return'),
+            'sharpe_ratio': backtest_result.get('sharpe_ratio'),
+            'max_drawdown': backtest_result.get('max_drawdown'),
+            'execution_days': backtest_result.get('execution_days'),
+            'execution_success_rate': execution_result.get('success_rate'),
+            'execution_time_seconds': execution_result.get('execution_time_seconds')
+        }
+    
+    def _record_numeric_result(self, row: int, execution_result: Dict[str, Any],
+                               backtest_result: Dict[str, Any]):
+        """将策略的数值指标写入预分配数组的指定行"""
+        self._numeric_results[row] = (
+            backtest_result.get('total_return', 0),
+            backtest_result.get('sharpe_ratio', 0),
+            backtest_result.get('max_drawdown', 0),
+            execution_result.get('success_rate', 0),
+            backtest_result.get('execution_days', 0),
+        )
+    
+    def close(self):
+        """写入剩余结果行并关闭结果数据库"""
+        self._flush_result_rows()
+        if self._results_conn is not None:
+            self._results_conn.close()
+            self._results_conn = None
+    
+    def _save_run_summary(self, final_result: Dict[str, Any]):
+        """保存本次运行的汇总信息 (逐策略结果已在 direct_results 中)"""
+        summary = {key: value for key, value in final_result.items() if key != 'execution_results'}
+        conn = self._get_results_conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO direct_runs (run_id, summary_json) VALUES (?, ?)",
+                         (self.run_id, json.dumps(summary, ensure_ascii=False, default=str)))
+    
+    def export_run(self, run_id: str = None, formats: Iterable[str] = ('json',)) -> List[str]:
+        """
+        从结果数据库导出一次运行的结果
+        
+        Args:
+            run_id: 运行ID，为空时导出当前实例最近一次运行
+            formats: json 为完整结果文件 (安装了 zstandard 时为 .json.zst)，
+                     metrics 为扁平的数值指标表 (Parquet，缺少 pyarrow 时为 CSV)
+            
+        Returns:
+            导出的文件路径列表
+        """
+        run_id = run_id or self.run_id
+        if not run_id:
+            raise ValueError("没有可导出的运行ID")
+        
+        self._flush_result_rows()
+        conn = self._get_results_conn()
+        
+        paths = []
+        for fmt in formats:
+            if fmt == 'json':
+                paths.append(self._export_json(conn, run_id))
+            elif fmt == 'metrics':
+                paths.append(self._export_metrics(conn, run_id))
+            else:
+                raise ValueError(f"未知的导出格式: {fmt}")
+        return paths
+    
+    def _export_json(self, conn: sqlite3.Connection, run_id: str) -> str:
+        """
+        导出完整结果文件
+        
+        汇总字段作为头部单独序列化，execution_results 逐行从数据库读取后流式写出。
+        """
+        row = conn.execute("SELECT summary_json FROM direct_runs WHERE run_id = ?", (run_id,)).fetchone()
+        header = json.loads(row[0]) if row else {}
+        
+        results_file = os.path.join(self.results_dir, f"direct_results_{run_id}.json")
+        if zstandard is not None:
+            results_file += '.zst'
+        
+        cursor = conn.execute("""
+            SELECT config_json, execution_json, backtest_json, recorded_at
+            FROM direct_results WHERE run_id = ? ORDER BY rowid
+        """, (run_id,))
+        
+        with open(results_file, 'wb') as raw:
+            if zstandard is not None:
+                dest = zstandard.ZstdCompressor(level=3, threads=-1).stream_writer(raw)
+            else:
+                dest = raw
+            
+            dest.write(_dumps_json(header)[:-1] + (b',' if header else b'') + b'"execution_results":[')
+            
+            separator = b''
+            for config_json, execution_json, backtest_json, recorded_at in cursor:
+                dest.write(separator + _dumps_json({
+                    'strategy_config': json.loads(config_json),
+                    'execution_result': json.loads(execution_json) if execution_json else None,
+                    'backtest_result': json.loads(backtest_json),
+                    'timestamp': recorded_at
+                }))
+                separator = b','
+            
+            dest.write(b']}')
+            
+            if dest is not raw:
+                dest.close()
+        
+        return results_file
+    
+    def _export_metrics(self, conn: sqlite3.Connection, run_id: str) -> str:
+        """导出每个策略的数值指标表 (优先写 Parquet，需要 pyarrow，否则退回 CSV)"""
+        df = pd.read_sql_query("""
+            SELECT strategy_name, total_return, sharpe_ratio, max_drawdown,
+                   success_rate AS execution_success_rate, execution_days,
+                   config_json, execution_json
+            FROM direct_results WHERE run_id = ? ORDER BY rowid
+        """, conn, params=(run_id,))
+        
+        configs = df.pop('config_json').map(json.loads)
+        executions = df.pop('execution_json').map(lambda value: json.loads(value) if value else {})
+        df.insert(1, 'strategy_id', configs.map(lambda config: config.get('strategy_id')))
+        df.insert(2, 'num_factors', configs.map(lambda config: len(config.get('factors', []))))
+        df.insert(3, 'window', configs.map(lambda config: config.get('window')))
+        df.insert(4, 'input_column', configs.map(lambda config: config.get('input_column')))
+        df['execution_time_seconds'] = executions.map(lambda execution: execution.get('execution_time_seconds'))
+        
+        base_path = os.path.join(self.results_dir, f"direct_metrics_{run_id}")
+        try:
+            df.to_parquet(f"{base_path}.parquet", index=False, compression='zstd')
+            return f"{base_path}.parquet"
+        except ImportError:
+            df.to_csv(f"{base_path}.csv", index=False)
+            return f"{base_path}.csv"
+    
+    @staticmethod
+    def _top_indices(values: np.ndarray, k: int) -> np.ndarray:
+        """取数值最大的前k个下标 (降序)"""
+        if len(values) > k:
+            candidates = np.argpartition(-values, k - 1)[:k]
+        else:
+            candidates = np.arange(len(values))
+        return candidates[np.argsort(-values[candidates], kind='stable')]
     
     def _analyze_best_strategies(self) -> Dict[str, Any]:
         """分析最佳策略"""
         if not self.results:
             return {}
         
-        strategies_with_metrics = []
-        
-        for result in self.results:
-            backtest = result.get('backtest_result', {})
-            strategy_config = result.get('strategy_config', {})
-            execution = result.get('execution_result', {})
-            
-            metrics = {
-                'strategy_name': strategy_config.get('strategy_name', 'Unknown'),
-                'total_return': backtest.get('total_return', 0),
-                'sharpe_ratio': backtest.get('sharpe_ratio', 0),
-                'max_drawdown': backtest.get('max_drawdown', 0),
-                'execution_success_rate': execution.get('success_rate', 0),
-                'factors': strategy_config.get('factors', []),
-                'window': strategy_config.get('window', 0)
-            }
-            
-            strategies_with_metrics.append(metrics)
+        numeric = self._numeric_results[:len(self.results)]
         
-        # 按不同指标排序
-        by_return = sorted(strategies_with_metrics, key=lambda x: x['total_return'], reverse=True)
-        by_sharpe = sorted(strategies_with_metrics, key=lambda x: x['sharpe_ratio'], reverse=True)
-        by_stability = sorted(strategies_with_metrics, key=lambda x: x['execution_success_rate'], reverse=True)
+        def strategy_metrics(row: int) -> Dict[str, Any]:
+            summary = self.results[row]
+            return {
+                'strategy_name': summary['strategy_name'],
+                'total_return': float(numeric['total_return'][row]),
+                'sharpe_ratio': float(numeric['sharpe_ratio'][row]),
+                'max_drawdown': float(numeric['max_drawdown'][row]),
+                'execution_success_rate': float(numeric['execution_success_rate'][row]),
+                'factors': summary['factors'],
+                'window': summary['window'] or 0
+            }
         
+        # 按不同指标取Top 5 (部分排序)
         return {
-            'top_by_return': by_return[:5],
-            'top_by_sharpe': by_sharpe[:5],
-            'top_by_stability': by_stability[:5],
-            'total_analyzed': len(strategies_with_metrics)
+            'top_by_return': [strategy_metrics(i) for i in self._top_indices(numeric['total_return'], 5)],
+            'top_by_sharpe': [strategy_metrics(i) for i in self._top_indices(numeric['sharpe_ratio'], 5)],
+            'top_by_stability': [strategy_metrics(i) for i in self._top_indices(numeric['execution_success_rate'], 5)],
+            'total_analyzed': len(numeric)
         }
     
     def _print_final_summary(self, final_result: Dict[str, Any]):
@@ -406,6 +709,9 @@ def main():
     parser.add_argument('--start_date', type=str, default='2024-06-01', help='开始日期')
     parser.add_argument('--end_date', type=str, default='2024-06-10', help='结束日期')
     parser.add_argument('--config', type=str, default='hyperparameter_tuning/config.yaml', help='配置文件')
+    parser.add_argument('--export', nargs='+', choices=['json', 'metrics'], default=[],
+                        help='从结果数据库导出结果文件 (json: 完整结果, metrics: 指标表)')
+    parser.add_argument('--run_id', type=str, help='配合 --export 导出已有运行的结果 (不再执行优化)')
     
     args = parser.parse_args()
     
@@ -413,6 +719,12 @@ def main():
         # 创建直接优化系统
         optimizer = DirectOptimizationSystem(config_file=args.config)
         
+        if args.run_id:
+            for path in optimizer.export_run(args.run_id, args.export or ['json']):
+                print(f"📄 已导出: {path}")
+            optimizer.close()
+            return
+        
         # 运行优化
         result = optimizer.run_complete_optimization(
             n_strategies=args.n_strategies,
@@ -422,6 +734,11 @@ def main():
         
         print(f"\n🎉 直接优化完成！成功率: {result['optimization_summary']['success_rate']:.1f}%")
         
+        if args.export:
+            for path in optimizer.export_run(formats=args.export):
+                print(f"📄 已导出: {path}")
+            optimizer.close()
+        
     except KeyboardInterrupt:
         print(f"\n❌ 用户中断执行")
     except Exception as e:
@@ -27,13 +27,19 @@ import hashlib
 import time
 from functools import lru_cache
 
+# 項目根目錄與默認數據庫路徑 (模塊加載時計算一次)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_DB_PATH = os.path.join(PROJECT_ROOT, "data", "funding_rate.db")
+
 # 添加父目錄到 Python 路徑，以便導入核心模組
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(PROJECT_ROOT)
 
 from database_operations import DatabaseManager
 from factor_strategies.factor_library import *
-from factor_strategies.factor_library import standardize_factor_scores
-from factor_strategies.factor_strategy_config import FACTOR_STRATEGIES
+from factor_strategies.factor_library import standardize_factor_scores, calculate_weighted_scores, multi_window_sharpe
+from factor_strategies.factor_strategy_config import (
+    FACTOR_STRATEGIES, SHARPE_WINDOW_CLUSTERS, compile_execution_plan, get_execution_plan
+)
 
 class FactorEngine:
     """
@@ -48,10 +54,7 @@ class FactorEngine:
     def __init__(self, db_path: str = None):
         # 如果沒有指定路徑，使用項目根目錄下的數據庫
         if db_path is None:
-            # 獲取項目根目錄路徑
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            project_root = os.path.dirname(current_dir)
-            db_path = os.path.join(project_root, "data", "funding_rate.db")
+            db_path = MAIN_DB_PATH
         """
         初始化因子引擎
         
@@ -71,7 +74,15 @@ class FactorEngine:
             'factor_misses': 0,
             'total_time_saved': 0.0
         }
+        self._sharpe_cluster_cache = {}  # 多窗口夏普缓存 {(交易對, 欄位, 年化係數, 上限, 最新日期, 長度): ({window: value}, timestamp)}
+        self._factor_spec_cache = {}   # 跨策略因子分數缓存 {(目標日期, 函數, 窗口, 欄位, 參數): ({交易對: 分數}, timestamp)}
+        self._max_factor_spec_size = 2000  # 跨策略因子分數缓存最大條目數 (每個日期×因子定義一條)
+        self._sufficiency_cache = {}   # 數據充足性檢查缓存 {(最少天數, 跳過天數, 最大窗口, 目標日期): ((是否充足, 信息), timestamp)}
+        self._date_range_cache = None  # return_metrics 日期範圍缓存 ((最早, 最晚), timestamp)
+        self._override_plans = {}      # 調用方直接傳入的策略定義 {策略名稱: (策略配置, 執行計劃)}
+        self._max_override_plans = 256 # 傳入策略定義的執行計劃最大缓存數
         self._max_cache_size = 100     # 最大缓存條目數
+        self._max_sharpe_cluster_size = 5000  # 多窗口夏普缓存最大條目數 (每個交易對一條)
         self._cache_ttl = 3600         # 缓存生存時間 (秒)
         
         print(f"✅ 因子引擎初始化完成 (🚀階段3缓存系統已啟用)，數據庫: {db_path}")
@@ -88,6 +99,27 @@ class FactorEngine:
         }
     
     # 🚀 階段3優化：缓存管理方法
+    def warmup_factor_functions(self, function_names=None):
+        """
+        用一小段合成收益序列預先調用因子函數
+        
+        讓首次調用的開銷 (延遲導入、pandas/scipy 分派路徑初始化) 在正式計算前支付，
+        供並行執行的每個工作線程/進程在開始處理策略前調用一次。
+        
+        Args:
+            function_names: 要預熱的因子函數名稱 (默認為全部)
+        """
+        sample = pd.Series(np.linspace(-0.01, 0.02, 30))
+        for name in function_names or self.factor_functions:
+            func = self.factor_functions.get(name)
+            if func is None:
+                continue
+            try:
+                func(sample)
+            except Exception:
+                # 預熱失敗不影響正式計算
+                pass
+    
     def _generate_cache_key(self, *args) -> str:
         """生成缓存鍵"""
         key_string = "|".join(str(arg) for arg in args)
@@ -116,6 +148,30 @@ class FactorEngine:
         ]
         for key in expired_factor_keys:
             del self._factor_cache[key]
+        
+        # 清理多窗口夏普缓存
+        expired_sharpe_keys = [
+            key for key, (_, timestamp) in self._sharpe_cluster_cache.items()
+            if (current_time - timestamp) > self._cache_ttl
+        ]
+        for key in expired_sharpe_keys:
+            del self._sharpe_cluster_cache[key]
+        
+        # 清理跨策略因子分數缓存
+        expired_spec_keys = [
+            key for key, (_, timestamp) in self._factor_spec_cache.items()
+            if (current_time - timestamp) > self._cache_ttl
+        ]
+        for key in expired_spec_keys:
+            del self._factor_spec_cache[key]
+        
+        # 清理數據充足性檢查缓存
+        expired_sufficiency_keys = [
+            key for key, (_, timestamp) in self._sufficiency_cache.items()
+            if (current_time - timestamp) > self._cache_ttl
+        ]
+        for key in expired_sufficiency_keys:
+            del self._sufficiency_cache[key]
     
     def _manage_cache_size(self):
         """管理缓存大小，避免內存溢出"""
@@ -130,6 +186,14 @@ class FactorEngine:
             oldest_key = min(self._factor_cache.keys(),
                             key=lambda k: self._factor_cache[k][1])
             del self._factor_cache[oldest_key]
+        
+        # 多窗口夏普缓存按插入順序移除最舊的項目
+        while len(self._sharpe_cluster_cache) > self._max_sharpe_cluster_size:
+            del self._sharpe_cluster_cache[next(iter(self._sharpe_cluster_cache))]
+        
+        # 跨策略因子分數缓存按插入順序移除最舊的項目
+        while len(self._factor_spec_cache) > self._max_factor_spec_size:
+            del self._factor_spec_cache[next(iter(self._factor_spec_cache))]
     
     def get_cache_stats(self) -> Dict[str, Any]:
         """獲取缓存統計信息"""
@@ -144,6 +208,8 @@ class FactorEngine:
         return {
             'data_cache_size': len(self._data_cache),
             'factor_cache_size': len(self._factor_cache),
+            'factor_spec_cache_size': len(self._factor_spec_cache),
+            'sufficiency_cache_size': len(self._sufficiency_cache),
             'data_hit_rate': f"{data_hit_rate:.1f}%",
             'factor_hit_rate': f"{factor_hit_rate:.1f}%", 
             'total_time_saved': f"{self._cache_stats['total_time_saved']:.2f}秒",
@@ -175,7 +241,7 @@ class FactorEngine:
         
         # 如果沒有指定日期，獲取最新日期
         if target_date is None:
-            start_date, end_date = self.db_manager.get_return_metrics_date_range()
+            start_date, end_date = self._get_data_date_range()
             if not end_date:
                 raise ValueError("數據庫中沒有 return_metrics 數據")
             target_date = end_date
@@ -185,13 +251,18 @@ class FactorEngine:
         start_date_obj = target_date_obj - pd.Timedelta(days=min_days + skip_days + 30)  # 額外緩衝
         start_date_str = start_date_obj.strftime('%Y-%m-%d')
         
+        # 只讀取因子計算需要的欄位
+        input_cols = sorted({factor_config['input_col'] for factor_config in strategy_config['factors'].values()})
+        columns = ['trading_pair', 'date'] + [col for col in input_cols if col not in ('trading_pair', 'date')]
+        
         # 🚀 階段3優化：生成缓存鍵
         cache_key = self._generate_cache_key(
             'strategy_data', 
             start_date_str, 
             target_date, 
             min_days, 
-            skip_days
+            skip_days,
+            ','.join(columns)
         )
         
         # 🚀 階段3優化：檢查缓存
@@ -209,7 +280,8 @@ class FactorEngine:
         # 從數據庫獲取數據
         df = self.db_manager.get_return_metrics(
             start_date=start_date_str,
-            end_date=target_date
+            end_date=target_date,
+            columns=columns
         )
         
         if df.empty:
@@ -232,6 +304,11 @@ class FactorEngine:
             df = df[df['trading_pair'].isin(valid_pairs)]
             print(f"📊 過濾後剩餘 {len(valid_pairs)} 個交易對 (跳過上線少於{skip_days}天的)")
         
+        # 緩存中的ROI欄位以 float32 保存：因子只用於排名，減半內存佔用與掃描頻寬
+        roi_cols = [col for col in df.columns if col.startswith('roi_') and df[col].dtype == np.float64]
+        if roi_cols:
+            df[roi_cols] = df[roi_cols].astype(np.float32)
+        
         # 🚀 階段3優化：將結果存入缓存
         query_time = time.time() - query_start_time
         self._data_cache[cache_key] = (df.copy(), time.time())
@@ -263,6 +340,10 @@ class FactorEngine:
         if input_col not in pair_data.columns:
             raise ValueError(f"數據中缺少列: {input_col}")
         
+        # 夏普因子：同一輸入序列的多個窗口一次算完並共享 (如 sharp_only_v1~v4)
+        if function_name == 'calculate_sharpe_ratio' and trading_pair:
+            return self._calculate_clustered_sharpe(pair_data, window, input_col, params, trading_pair)
+        
         # 獲取最近的數據窗口
         recent_data = pair_data.tail(window)
         
@@ -300,8 +381,8 @@ class FactorEngine:
         calc_start_time = time.time()
         self._cache_stats['factor_misses'] += 1
         
-        # 獲取輸入序列
-        input_series = recent_data[input_col]
+        # 獲取輸入序列（窗口內轉回 float64 計算，避免方差/斜率累加的精度損失）
+        input_series = recent_data[input_col].astype(np.float64)
         
         # 調用因子計算函數
         factor_function = self.factor_functions[function_name]
@@ -314,21 +395,121 @@ class FactorEngine:
         
         return score
     
-    def calculate_strategy_ranking(self, strategy_name: str, target_date: str = None) -> pd.DataFrame:
+    def _calculate_factor_with_spec_cache(self, pair_data: pd.DataFrame, factor_config: Dict[str, Any],
+                                          trading_pair: str, target_date: str) -> float:
+        """
+        計算因子分數，同一日期、同一因子定義 (函數/窗口/欄位/參數) 的結果在策略之間共享
+        
+        超參數掃描中大量策略只是權重或其他因子不同，單個因子的分數可直接復用。
+        只有數據長度不少於窗口時才讀寫缓存 (此時分數只取決於最近 window 天，與策略的數據範圍無關)。
+        """
+        window = factor_config['window']
+        if len(pair_data) < window:
+            return self.calculate_factor_for_trading_pair(pair_data, factor_config, trading_pair=trading_pair)
+        
+        spec_key = (
+            target_date,
+            factor_config['function'],
+            window,
+            factor_config['input_col'],
+            repr(sorted(factor_config.get('params', {}).items()))
+        )
+        
+        entry = self._factor_spec_cache.get(spec_key)
+        if entry is None or not self._is_cache_valid(entry[1]):
+            entry = ({}, time.time())
+            self._factor_spec_cache[spec_key] = entry
+        
+        pair_scores = entry[0]
+        if trading_pair in pair_scores:
+            self._cache_stats['factor_hits'] += 1
+            return pair_scores[trading_pair]
+        
+        score = self.calculate_factor_for_trading_pair(pair_data, factor_config, trading_pair=trading_pair)
+        pair_scores[trading_pair] = score
+        return score
+    
+    def _calculate_clustered_sharpe(self, pair_data: pd.DataFrame, window: int, input_col: str,
+                                    params: Dict[str, Any], trading_pair: str) -> float:
+        """
+        計算夏普因子，同組 (輸入欄位, 年化係數, 上限) 的所有窗口一次計算並缓存
+        
+        Args:
+            pair_data: 單個交易對的歷史數據 (按日期升序)
+            window: 本次需要的回看窗口
+            input_col: 輸入欄位
+            params: 因子參數
+            trading_pair: 交易對名稱
+            
+        Returns:
+            因子分數
+        """
+        annualizing_factor = params.get('annualizing_factor', 365)
+        max_sharpe = params.get('max_sharpe', 1000.0)
+        
+        cache_key = (
+            trading_pair, input_col, annualizing_factor, max_sharpe,
+            pair_data['date'].iloc[-1] if 'date' in pair_data.columns and len(pair_data) else None,
+            len(pair_data)
+        )
+        
+        cached = self._sharpe_cluster_cache.get(cache_key)
+        if cached is not None and self._is_cache_valid(cached[1]) and window in cached[0]:
+            self._cache_stats['factor_hits'] += 1
+            self._cache_stats['total_time_saved'] += 0.1  # 估計節省的計算時間
+            return cached[0][window]
+        
+        self._cache_stats['factor_misses'] += 1
+        
+        windows = set(SHARPE_WINDOW_CLUSTERS.get((input_col, annualizing_factor, max_sharpe), ()))
+        windows.add(window)
+        
+        values = pair_data[input_col].to_numpy(dtype=np.float64)
+        scores = multi_window_sharpe(values, tuple(sorted(windows)), annualizing_factor, max_sharpe)
+        
+        if cached is not None and self._is_cache_valid(cached[1]):
+            scores = {**cached[0], **scores}
+        self._sharpe_cluster_cache[cache_key] = (scores, time.time())
+        
+        return scores[window]
+    
+    def _resolve_strategy(self, strategy_name: str, strategy_def: Dict[str, Any] = None) -> tuple:
+        """
+        獲取策略配置與執行計劃
+        
+        傳入 strategy_def 時直接使用該定義 (執行計劃按引擎缓存)，
+        不讀寫全局 FACTOR_STRATEGIES，並行執行動態策略時無需註冊/註銷。
+        
+        Returns:
+            (策略配置, 執行計劃)
+        """
+        if strategy_def is None:
+            if strategy_name not in FACTOR_STRATEGIES:
+                raise ValueError(f"未知的策略: {strategy_name}")
+            return FACTOR_STRATEGIES[strategy_name], get_execution_plan(strategy_name)
+        
+        cached = self._override_plans.get(strategy_name)
+        if cached is None or cached[0] is not strategy_def:
+            if len(self._override_plans) >= self._max_override_plans:
+                self._override_plans.clear()
+            cached = (strategy_def, compile_execution_plan(strategy_name, strategy_def))
+            self._override_plans[strategy_name] = cached
+        return cached
+    
+    def calculate_strategy_ranking(self, strategy_name: str, target_date: str = None,
+                                   strategy_def: Dict[str, Any] = None) -> pd.DataFrame:
         """
         計算策略排名
         
         Args:
             strategy_name: 策略名稱
             target_date: 目標日期
+            strategy_def: 策略定義 (可選，提供時不查找 FACTOR_STRATEGIES)
             
         Returns:
             包含排名結果的 DataFrame
         """
-        if strategy_name not in FACTOR_STRATEGIES:
-            raise ValueError(f"未知的策略: {strategy_name}")
-        
-        strategy_config = FACTOR_STRATEGIES[strategy_name]
+        strategy_config, plan = self._resolve_strategy(strategy_name, strategy_def)
         print(f"🧮 開始計算因子策略: {strategy_config['name']}")
         
         # 獲取數據
@@ -350,13 +531,14 @@ class FactorEngine:
             # 計算所有因子分數
             factor_scores = {}
             
-            for factor_name, factor_config in strategy_config['factors'].items():
+            for factor_name, factor_config in plan.factors:
                 try:
-                    # 🚀 階段3優化：傳遞 trading_pair 參數以啟用缓存
-                    score = self.calculate_factor_for_trading_pair(
+                    # 🚀 階段3優化：傳遞 trading_pair 參數以啟用缓存 (同一因子定義跨策略共享)
+                    score = self._calculate_factor_with_spec_cache(
                         pair_data, 
                         factor_config, 
-                        trading_pair=pair
+                        pair,
+                        target_date
                     )
                     factor_scores[factor_name] = score
                 except Exception as e:
@@ -391,10 +573,29 @@ class FactorEngine:
         print("⚖️  第三階段：計算加權最終分數...")
         results = []
         
-        for pair in standardized_scores.keys():
-            # 計算最終排名分數（使用標準化後的分數）
+        # 將所有交易對的標準化分數組成矩陣，以一次矩陣乘法完成加權
+        ranking_logic = strategy_config['ranking_logic']
+        indicators = plan.indicators
+        
+        pairs = list(standardized_scores.keys())
+        z_matrix = np.zeros((len(pairs), len(indicators)))
+        valid_mask = np.zeros((len(pairs), len(indicators)), dtype=bool)
+        for i, pair in enumerate(pairs):
+            pair_scores = standardized_scores[pair]
+            for j, indicator in enumerate(indicators):
+                if indicator in pair_scores:
+                    raw_value = pair_scores[indicator]['raw']
+                    z_score = pair_scores[indicator]['z_score']
+                    if not np.isnan(raw_value) and not np.isnan(z_score):
+                        z_matrix[i, j] = z_score
+                        valid_mask[i, j] = True
+        
+        final_scores = calculate_weighted_scores(z_matrix, valid_mask, plan.weights)
+        
+        for pair, matrix_score in zip(pairs, final_scores):
+            # 最終分數來自矩陣計算，這裡只生成計算過程記錄
             final_score, calculation_record = self._calculate_final_score_with_standardization(
-                standardized_scores[pair], strategy_config['ranking_logic']
+                standardized_scores[pair], ranking_logic, final_score=float(matrix_score)
             )
             
             # 保留原始分數用於component_scores
@@ -474,13 +675,14 @@ class FactorEngine:
         
         return final_score, calculation_record
     
-    def _calculate_final_score_with_standardization(self, standardized_factor_scores: Dict[str, Dict[str, float]], ranking_logic: Dict[str, Any]) -> tuple[float, str]:
+    def _calculate_final_score_with_standardization(self, standardized_factor_scores: Dict[str, Dict[str, float]], ranking_logic: Dict[str, Any], final_score: float = None) -> tuple[float, str]:
         """
         使用標準化後的因子分數計算最終排名分數並生成計算過程記錄
         
         Args:
             standardized_factor_scores: 標準化後的因子分數字典，格式為 {factor_name: {'raw': raw_value, 'z_score': z_value}}
             ranking_logic: 排名邏輯配置
+            final_score: 已由矩陣計算得出的最終分數，提供時直接使用
             
         Returns:
             (最終分數, 計算過程記錄)
@@ -518,7 +720,8 @@ class FactorEngine:
             return np.nan, calculation_record
         
         # 正規化權重
-        final_score = weighted_sum / total_weight
+        if final_score is None:
+            final_score = weighted_sum / total_weight
         
         # 生成最終的計算記錄
         valid_weighted_values = [p.split(' = ')[1] for p in calculation_parts if 'NaN' not in p and 'Missing' not in p]
@@ -526,36 +729,60 @@ class FactorEngine:
         
         return final_score, calculation_record
     
-    def check_data_sufficiency(self, strategy_name: str, target_date: str = None) -> tuple[bool, str]:
+    def _get_data_date_range(self) -> tuple:
+        """獲取 return_metrics 的日期範圍 (按缓存生存時間復用，避免每次檢查都全表查詢)"""
+        cached = self._date_range_cache
+        if cached is not None and self._is_cache_valid(cached[1]):
+            return cached[0]
+        
+        date_range = self.db_manager.get_return_metrics_date_range()
+        self._date_range_cache = (date_range, time.time())
+        return date_range
+    
+    def check_data_sufficiency(self, strategy_name: str, target_date: str = None,
+                               strategy_def: Dict[str, Any] = None) -> tuple[bool, str]:
         """
         檢查策略所需的數據是否充足
         
+        結果只取決於 (最少天數, 跳過天數, 最大因子窗口, 目標日期)，
+        相同數據要求的策略共享同一檢查結果。
+        
         Args:
             strategy_name: 策略名稱
             target_date: 目標日期
+            strategy_def: 策略定義 (可選，提供時不查找 FACTOR_STRATEGIES)
             
         Returns:
             (是否充足, 詳細信息)
         """
-        if strategy_name not in FACTOR_STRATEGIES:
-            return False, f"未知的策略: {strategy_name}"
-        
-        strategy_config = FACTOR_STRATEGIES[strategy_name]
-        data_req = strategy_config['data_requirements']
-        min_days = data_req['min_data_days']
-        skip_days = data_req['skip_first_n_days']
+        try:
+            _, plan = self._resolve_strategy(strategy_name, strategy_def)
+        except ValueError as e:
+            return False, str(e)
         
         # 獲取目標日期
         if target_date is None:
-            start_date, end_date = self.db_manager.get_return_metrics_date_range()
+            start_date, end_date = self._get_data_date_range()
             if not end_date:
                 return False, "數據庫中沒有 return_metrics 數據"
             target_date = end_date
         
+        key = (plan.min_data_days, plan.skip_first_n_days, plan.max_window, target_date)
+        cached = self._sufficiency_cache.get(key)
+        if cached is not None and self._is_cache_valid(cached[1]):
+            return cached[0]
+        
+        verdict = self._check_data_sufficiency(*key)
+        self._sufficiency_cache[key] = (verdict, time.time())
+        return verdict
+    
+    def _check_data_sufficiency(self, min_days: int, skip_days: int, max_window: int,
+                                target_date: str) -> tuple[bool, str]:
+        """按數據要求檢查數據是否充足"""
         target_date_obj = pd.to_datetime(target_date)
         
         # 檢查數據庫中的數據範圍
-        start_date, end_date = self.db_manager.get_return_metrics_date_range()
+        start_date, end_date = self._get_data_date_range()
         if not end_date:
             return False, "數據庫中沒有 return_metrics 數據"
         
@@ -581,22 +808,15 @@ class FactorEngine:
             if days_from_start <= skip_days:
                 return False, f"無交易對符合條件：所有交易對上線時間不足 {skip_days} 天 (實際: {days_from_start} 天)"
         
-        # 檢查各因子所需的最大窗口
-        max_window = 0
-        factor_windows = []
-        for factor_name, factor_config in strategy_config['factors'].items():
-            window = factor_config['window']
-            max_window = max(max_window, window)
-            factor_windows.append(f"{factor_name}({window}天)")
-        
         # 檢查是否有足夠的數據來計算最大窗口的因子
         total_required_days = max_window + skip_days
         if available_days < total_required_days:
-            return False, f"因子計算數據不足：最大因子窗口需要 {total_required_days} 天，但只有 {available_days} 天可用。因子窗口: {', '.join(factor_windows)}"
+            return False, f"因子計算數據不足：最大因子窗口需要 {total_required_days} 天，但只有 {available_days} 天可用。最大因子窗口: {max_window}天"
         
         return True, f"數據充足：可用數據 {available_days} 天，滿足策略要求"
 
-    def run_strategy(self, strategy_name: str, target_date: str = None, save_to_db: bool = True) -> pd.DataFrame:
+    def run_strategy(self, strategy_name: str, target_date: str = None, save_to_db: bool = True,
+                     strategy_def: Dict[str, Any] = None) -> pd.DataFrame:
         """
         執行策略計算並保存結果
         
@@ -604,6 +824,7 @@ class FactorEngine:
             strategy_name: 策略名稱
             target_date: 目標日期
             save_to_db: 是否保存到數據庫
+            strategy_def: 策略定義 (可選，動態策略直接傳入而不註冊到 FACTOR_STRATEGIES)
             
         Returns:
             排名結果 DataFrame
@@ -611,7 +832,7 @@ class FactorEngine:
         print(f"\n🚀 執行因子策略: {strategy_name}")
         
         # 預檢查數據是否充足
-        is_sufficient, message = self.check_data_sufficiency(strategy_name, target_date)
+        is_sufficient, message = self.check_data_sufficiency(strategy_name, target_date, strategy_def)
         if not is_sufficient:
             print(f"❌ 數據量檢查失敗: {message}")
             print("💡 建議:")
@@ -623,7 +844,7 @@ class FactorEngine:
         print(f"✅ 數據量檢查通過: {message}")
         
         # 計算排名
-        result_df = self.calculate_strategy_ranking(strategy_name, target_date)
+        result_df = self.calculate_strategy_ranking(strategy_name, target_date, strategy_def)
         
         if result_df.empty:
             print("❌ 策略計算失敗，沒有結果")
@@ -89,6 +89,49 @@ def calculate_sharpe_ratio(series: pd.Series, annualizing_factor: int = 365, max
     # 限制夏普比率在合理範圍內
     return np.clip(sharpe_ratio, -max_sharpe, max_sharpe)
 
+def multi_window_sharpe(values: np.ndarray, windows: tuple, annualizing_factor: int = 365, max_sharpe: float = 1000.0) -> dict:
+    """
+    對同一條回報序列一次計算多個回看窗口的年化夏普比率。
+    計算結果與對每個窗口分別調用 calculate_sharpe_ratio(series.tail(window)) 相同，
+    但只需提取一次數據，供共用同一輸入欄位的多個夏普因子 (如 sharp_only_v1~v4) 共享。
+
+    Args:
+        values (np.ndarray): 按日期升序排列的完整回報率序列。
+        windows (tuple): 需要計算的回看窗口列表。
+        annualizing_factor (int): 年化係數。
+        max_sharpe (float): 夏普比率的上限。
+
+    Returns:
+        dict: {window: 夏普比率}，數據點不足的窗口為 np.nan。
+    """
+    values = np.asarray(values, dtype=np.float64)
+    sqrt_ann = np.sqrt(annualizing_factor)
+    results = {}
+
+    for window in windows:
+        segment = values[-window:]
+
+        # 與因子引擎一致的最小數據點要求
+        if len(segment) < max(2, min(window // 4, 3)):
+            results[window] = np.nan
+            continue
+
+        segment = segment[~np.isnan(segment)]
+        if segment.size == 0:
+            results[window] = np.nan
+            continue
+
+        mean_return = segment.mean()
+        std_dev = segment.std(ddof=1) if segment.size > 1 else np.nan
+
+        if std_dev == 0 or np.isnan(std_dev):
+            results[window] = max_sharpe if mean_return > 0 else -max_sharpe if mean_return < 0 else 0.0
+            continue
+
+        results[window] = float(np.clip((mean_return / std_dev) * sqrt_ann, -max_sharpe, max_sharpe))
+
+    return results
+
 def calculate_inv_std_dev(series: pd.Series, epsilon: float = 1e-9, high_score: float = 1e9, **kwargs) -> float:
     """
     計算回報率標準差的倒數，作為穩定性指標。
@@ -336,6 +379,40 @@ def standardize_factor_scores(all_factor_scores: dict) -> tuple[dict, dict]:
     
     return standardized_scores, factor_stats
 
+def calculate_weighted_scores(z_matrix: np.ndarray, valid_mask: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    以矩陣乘法一次計算所有交易對的加權最終分數
+
+    等價於逐交易對執行「Σ(z × 權重) / Σ(有效權重)」，無效因子不計入分子與分母。
+
+    Args:
+        z_matrix (np.ndarray): 標準化分數矩陣，形狀為 (交易對數, 因子數)
+        valid_mask (np.ndarray): 因子是否有效的布林矩陣，形狀同 z_matrix
+        weights (np.ndarray): 權重，形狀為 (因子數,) 或 (因子數, 策略數)
+
+    Returns:
+        np.ndarray: 最終分數，形狀為 (交易對數,) 或 (交易對數, 策略數)；
+                    沒有任何有效因子的位置為 np.nan
+    """
+    valid = np.asarray(valid_mask, dtype=bool)
+    w = np.asarray(weights, dtype=np.float64)
+
+    # 單因子策略 (如 sharp_only、trend_only)：加權平均就是因子本身，無需矩陣運算
+    if w.shape == (1,):
+        if w[0] == 0:
+            return np.full(valid.shape[0], np.nan)
+        return np.where(valid[:, 0], np.asarray(z_matrix, dtype=np.float64)[:, 0], np.nan)
+
+    z_valid = np.where(valid, np.asarray(z_matrix, dtype=np.float64), 0.0)
+
+    weighted_sum = z_valid @ w
+    total_weight = valid.astype(np.float64) @ w
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = weighted_sum / total_weight
+
+    return np.where(total_weight == 0, np.nan, scores)
+
 # --- 您未來可以在此處添加更多因子計算函式 ---
 # 例如: Calmar Ratio, Information Ratio, Beta, Alpha 等
 #
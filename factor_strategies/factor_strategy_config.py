@@ -17,6 +17,15 @@
 - 使用 database_operations.py 的函數進行數據庫操作
 """
 
+import hashlib
+import json
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
 FACTOR_STRATEGIES = {
     'cerebrum_core': {
         'name': 'Cerebrum-Core v1.0',
@@ -310,4 +319,180 @@ FACTOR_STRATEGIES = {
             'weights': [1.0]                             # 權重為1，結果就是因子本身
         }
     }
-}
\ No newline at end of file
+}
+
+
+# ==========================================
+# 動態策略構建輔助
+# ==========================================
+
+@lru_cache(maxsize=None)
+def factor_name(function_name: str) -> str:
+    """
+    由因子函數名生成因子名稱 (calculate_sharpe_ratio -> F_sharpe_ratio)
+
+    結果經 sys.intern 駐留，大量動態策略共用同一字符串對象，作為字典鍵時哈希與比較更快。
+    """
+    return sys.intern(f"F_{function_name.replace('calculate_', '')}")
+
+
+@lru_cache(maxsize=64)
+def equal_weights(num_factors: int) -> Tuple[float, ...]:
+    """
+    n 個因子的等權重
+
+    返回缓存的不可變元組，可被大量動態策略共用，並可直接序列化為 JSON 數組。
+    """
+    if num_factors <= 0:
+        return ()
+    return (1.0 / num_factors,) * num_factors
+
+
+# ==========================================
+# 策略配置哈希 (用於跨次運行的結果缓存)
+# ==========================================
+
+def config_hash(config: dict) -> str:
+    """
+    計算策略配置的內容哈希
+
+    Args:
+        config (dict): 策略配置字典（靜態策略定義或動態生成的策略配置）
+
+    Returns:
+        str: 32位十六進制的 blake2b 哈希值，配置內容相同則哈希相同
+    """
+    payload = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+# 導入時預先計算所有靜態策略的哈希
+_STRATEGY_HASHES = {name: config_hash(config) for name, config in FACTOR_STRATEGIES.items()}
+
+
+def strategy_config_hash(name: str) -> str:
+    """
+    獲取 FACTOR_STRATEGIES 中指定策略的配置哈希
+
+    Args:
+        name (str): 策略名稱
+
+    Returns:
+        str: 策略配置哈希；運行時動態註冊的策略會即時計算
+    """
+    if name in _STRATEGY_HASHES:
+        return _STRATEGY_HASHES[name]
+    if name not in FACTOR_STRATEGIES:
+        raise KeyError(f"未知的策略: {name}")
+    return config_hash(FACTOR_STRATEGIES[name])
+
+
+# ==========================================
+# 策略執行計劃 (預先解析的策略配置)
+# ==========================================
+
+# dataclass(slots=True) 需要 Python 3.10+，更早的版本退回普通 dataclass (行為相同，只是不省內存)
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
+class ExecutionPlan:
+    """
+    預先解析好的策略執行計劃，避免在計算熱路徑中反覆解析配置字典
+    """
+    name: str
+    factors: Tuple[Tuple[str, Dict[str, Any]], ...]  # (因子名稱, 因子配置)
+    indicators: Tuple[str, ...]
+    weights: np.ndarray  # 與 indicators 對應的權重向量
+    min_data_days: int
+    skip_first_n_days: int
+    max_window: int
+
+
+@lru_cache(maxsize=256)
+def _weight_vector(weights: Tuple[float, ...]) -> np.ndarray:
+    """權重元組 -> 只讀權重向量 (相同權重的執行計劃共用同一數組)"""
+    vector = np.asarray(weights, dtype=np.float64)
+    vector.setflags(write=False)
+    return vector
+
+
+def compile_execution_plan(name: str, config: dict) -> ExecutionPlan:
+    """
+    將策略配置字典編譯為 ExecutionPlan
+
+    Args:
+        name (str): 策略名稱
+        config (dict): FACTOR_STRATEGIES 中的策略配置
+
+    Returns:
+        ExecutionPlan: 編譯後的執行計劃
+    """
+    ranking_logic = config['ranking_logic']
+    indicators = tuple(ranking_logic['indicators'])
+    weights = _weight_vector(tuple(ranking_logic['weights']))
+
+    if len(indicators) != len(weights):
+        raise ValueError("因子數量與權重數量不匹配")
+
+    factors = tuple(config['factors'].items())
+    data_req = config['data_requirements']
+
+    return ExecutionPlan(
+        name=name,
+        factors=factors,
+        indicators=indicators,
+        weights=weights,
+        min_data_days=data_req['min_data_days'],
+        skip_first_n_days=data_req['skip_first_n_days'],
+        max_window=max((factor_config['window'] for _, factor_config in factors), default=0)
+    )
+
+
+# 導入時預先編譯所有靜態策略
+EXECUTION_PLANS = {name: compile_execution_plan(name, config) for name, config in FACTOR_STRATEGIES.items()}
+_PLAN_SOURCES = dict(FACTOR_STRATEGIES)
+
+
+def get_execution_plan(name: str) -> ExecutionPlan:
+    """
+    獲取策略的執行計劃
+
+    運行時動態註冊（或被替換）的策略會在首次使用時編譯並缓存。
+
+    Args:
+        name (str): 策略名稱
+
+    Returns:
+        ExecutionPlan: 策略執行計劃
+    """
+    config = FACTOR_STRATEGIES.get(name)
+    if config is None:
+        raise KeyError(f"未知的策略: {name}")
+
+    if _PLAN_SOURCES.get(name) is not config:
+        EXECUTION_PLANS[name] = compile_execution_plan(name, config)
+        _PLAN_SOURCES[name] = config
+
+    return EXECUTION_PLANS[name]
+
+
+def _build_sharpe_window_clusters() -> Dict[tuple, Tuple[int, ...]]:
+    """將所有靜態策略中的夏普因子按 (輸入欄位, 年化係數, 上限) 分組，收集各組的窗口"""
+    clusters = {}
+    for plan in EXECUTION_PLANS.values():
+        for _, factor_config in plan.factors:
+            if factor_config['function'] != 'calculate_sharpe_ratio':
+                continue
+            params = factor_config.get('params', {})
+            key = (
+                factor_config['input_col'],
+                params.get('annualizing_factor', 365),
+                params.get('max_sharpe', 1000.0)
+            )
+            clusters.setdefault(key, set()).add(factor_config['window'])
+    return {key: tuple(sorted(windows)) for key, windows in clusters.items()}
+
+
+# 共用同一輸入序列的夏普因子窗口 (如 sharp_only_v1~v4 的 10/30/60/90 天)
+SHARPE_WINDOW_CLUSTERS = _build_sharpe_window_clusters()
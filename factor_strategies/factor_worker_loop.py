@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔁 常驻因子策略工作进程
+
+从 stdin 逐行读取 JSON 任务，将策略定义直接传给引擎执行日期范围，
+每个任务向 stdout 回写一行 JSON 结果。进程与 FactorEngine 在多个任务间复用，
+避免每个策略都启动一次 Python 解释器。
+
+任务格式:
+    {"strategy_name": ..., "factor_strategy": {...}, "start_date": ..., "end_date": ...}
+结果格式:
+    {"success": bool, "processed_dates": int, "total_dates": int, "error": str | null}
+
+stdin 关闭 (主进程退出) 时工作进程自动结束。
+"""
+
+import os
+import sys
+import json
+
+# 添加项目根目录到路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from factor_strategies.factor_engine import FactorEngine
+from factor_strategies.run_factor_strategies import generate_date_range, run_strategy_for_date
+
+
+def process_task(engine: FactorEngine, task: dict) -> dict:
+    """执行单个策略任务 (策略定义直接传给引擎，不注册到 FACTOR_STRATEGIES)"""
+    strategy_name = task['strategy_name']
+    strategy_def = task['factor_strategy']
+
+    dates = generate_date_range(task['start_date'], task['end_date'])
+    processed = sum(1 for target_date in dates
+                    if run_strategy_for_date(engine, strategy_name, target_date, strategy_def))
+    return {
+        'success': processed > 0,
+        'processed_dates': processed,
+        'total_dates': len(dates),
+        'error': None if processed > 0 else 'No dates processed'
+    }
+
+
+def main():
+    # stdout 专用于回传结果，引擎的进度输出改到 stderr
+    channel = sys.stdout
+    sys.stdout = sys.stderr
+
+    engine = FactorEngine()
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            result = process_task(engine, json.loads(line))
+        except Exception as e:
+            result = {'success': False, 'processed_dates': 0, 'total_dates': 0, 'error': str(e)}
+
+        channel.write(json.dumps(result, ensure_ascii=False) + '\n')
+        channel.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,9 @@ import os
 import sys
 import json
 import time
+import hashlib
 import argparse
+import pandas as pd
 from datetime import datetime
 
 # 添加项目根目录到路径
@@ -19,290 +21,535 @@ project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 
 from optimized_hyperparameter_tuning import OptimizedHyperparameterTuner
-from batch_optimize_strategies import BatchStrategyExecutor
+from batch_optimize_strategies import BatchStrategyExecutor, ensure_dir
+from factor_strategy_config import config_hash
+
+# orjson 為可選依賴，未安裝時退回標準庫 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# 运行结果缓存的版本号：回测/因子计算逻辑有不改变文件时间的语义变化时手动递增，使旧缓存全部失效
+RESULT_CACHE_VERSION = 1
+
+# 缓存键包含这些文件的修改时间与大小：数据库更新或代码改动后旧缓存自动失效
+_CACHE_DATA_FILES = (os.path.join(project_root, 'data', 'funding_rate.db'),)
+_CACHE_CODE_FILES = tuple(
+    os.path.join(project_root, *parts) for parts in (
+        ('backtest_v5.py',),
+        ('factor_strategies', 'factor_engine.py'),
+        ('factor_strategies', 'factor_library.py'),
+        ('factor_strategies', 'factor_strategy_config.py'),
+        ('factor_strategies', 'run_factor_strategies.py'),
+    )
+)
+
+
+def _file_fingerprint(file_path: str) -> str:
+    """文件的修改时间与大小 (文件不存在时为 missing)"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return 'missing'
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def _dumps_canonical(obj) -> bytes:
+    """序列化为键排序的紧凑JSON字节，内容相同则结果相同 (用于内容哈希)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def _dump_json(obj, file_path: str, pretty: bool = False):
+    """写入JSON文件，优先使用 orjson 加速序列化"""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        with open(file_path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=option))
+        return
+    
+    with open(file_path, 'w', encoding='utf-8') as f:
+        if pretty:
+            json.dump(obj, f, indent=2, ensure_ascii=False)
+        else:
+            json.dump(obj, f, separators=(',', ':'), ensure_ascii=False)
+
+
+def _iter_jsonl(file_path: str):
+    """逐行读取JSONL文件，每次产出一条记录"""
+    with open(file_path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield orjson.loads(line) if orjson is not None else json.loads(line)
+
+
+def _load_json(file_path: str):
+    """读取JSON文件，优先使用 orjson 加速解析"""
+    if orjson is not None:
+        with open(file_path, 'rb') as f:
+            return orjson.loads(f.read())
+    
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
 
 class OptimizedHyperparameterMain:
     """优化版超参数调优系统主程序"""
     
-    def __init__(self, config_file: str = "hyperparameter_tuning/config.yaml"):
+    def __init__(self, config_file: str = "hyperparameter_tuning/config.yaml", verbose: bool = True,
+                 use_cache: bool = True):
         self.config_file = config_file
-        self.tuner = OptimizedHyperparameterTuner(config_file)
-        self.executor = BatchStrategyExecutor()
+        self.verbose = verbose  # 作为库调用时可关闭进度输出
+        self._tuner = None
+        self._executor = None
         self.project_root = project_root
         
-        # 结果存储目录
+        # 结果存储目录 (运行优化流程时一次性创建，config 模式不创建)
         self.results_dir = os.path.join(current_dir, "optimized_results")
-        os.makedirs(self.results_dir, exist_ok=True)
+        
+        # 跨次运行的结果缓存目录 (按 策略配置+日期范围+回测参数+数据/代码版本 的哈希存储)；
+        # use_cache=False 时不读取缓存，所有策略重新执行 (新结果仍写入缓存)
+        self.cache_dir = os.path.join(self.results_dir, "cache")
+        self.cache_max_entries = 1000
+        self.use_cache = use_cache
         
         # 时间戳用于文件命名
         self.timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
+    def _log(self, message: str = ""):
+        """输出进度信息 (verbose 关闭时静默)"""
+        if self.verbose:
+            print(message)
+    
+    def _create_output_dirs(self):
+        """一次性创建本次运行的所有输出目录 (结果目录与结果缓存目录)"""
+        ensure_dir(self.results_dir)
+        ensure_dir(self.cache_dir)
+    
+    @property
+    def tuner(self) -> OptimizedHyperparameterTuner:
+        """策略配置生成器 (首次使用时才创建)"""
+        if self._tuner is None:
+            self._tuner = OptimizedHyperparameterTuner(self.config_file)
+        return self._tuner
+    
+    @property
+    def executor(self) -> BatchStrategyExecutor:
+        """批量策略执行器 (首次使用时才创建，config 模式不需要)"""
+        if self._executor is None:
+            self._executor = BatchStrategyExecutor()
+        return self._executor
+    
     def run_complete_optimization(self, n_strategies: int = 10, 
                                  start_date: str = "2024-01-01",
                                  end_date: str = "2025-06-20",
                                  run_mode: str = "test") -> dict:
         """运行完整的超参数调优流程"""
         
-        print("🚀 优化版超参数调优系统")
-        print("=" * 80)
-        print(f"📅 回测期间: {start_date} - {end_date}")
-        print(f"🎯 策略数量: {n_strategies}")
-        print(f"🔧 运行模式: {run_mode}")
-        print(f"📁 结果目录: {self.results_dir}")
-        print("=" * 80)
+        self._log("🚀 优化版超参数调优系统")
+        self._log("=" * 80)
+        self._log(f"📅 回测期间: {start_date} - {end_date}")
+        self._log(f"🎯 策略数量: {n_strategies}")
+        self._log(f"🔧 运行模式: {run_mode}")
+        self._log(f"📁 结果目录: {self.results_dir}")
+        self._log("=" * 80)
         
         total_start_time = time.time()
         
-        try:
-            # 第一阶段：生成策略配置
-            print("\n🎯 第一阶段：生成策略配置")
-            print("-" * 50)
+        # 第一阶段：生成策略配置
+        self._log("\n🎯 第一阶段：生成策略配置")
+        self._log("-" * 50)
+        
+        phase1_start = time.time()
+        
+        strategies = self.tuner.generate_strategy_configs(n_strategies)
+        
+        self._create_output_dirs()
+        
+        # 保存策略配置：按内容哈希命名，相同的策略集只写一次
+        generated_at = datetime.now().isoformat()
+        strategies_bytes = _dumps_canonical({'strategies': strategies})
+        strategies_sha = hashlib.blake2b(strategies_bytes, digest_size=16).hexdigest()
+        strategies_file = os.path.join(self.results_dir, f"strategies_{strategies_sha}.json")
+        
+        if not os.path.exists(strategies_file):
+            with open(strategies_file, 'wb') as f:
+                f.write(strategies_bytes)
+        
+        strategies_ref = {
+            'file': os.path.basename(strategies_file),
+            'sha': strategies_sha,
+            'count': len(strategies)
+        }
+        
+        phase1_time = time.time() - phase1_start
+        
+        self._log(f"✅ 第一阶段完成: {phase1_time:.2f}秒")
+        self._log(f"📄 策略配置已保存: {strategies_file}")
+        
+        # 第二阶段：批量执行策略
+        self._log(f"\n🎯 第二阶段：批量执行策略")
+        self._log("-" * 50)
+        
+        phase2_start = time.time()
+        
+        if run_mode == "test":
+            # 测试模式：只运行前2个策略
+            self._log("🧪 测试模式：仅运行前2个策略")
+            test_strategies = strategies[:2]
             
-            phase1_start = time.time()
+            # 创建测试的时间范围（缩短）
+            test_start_date = "2024-06-01"
+            test_end_date = "2024-06-30"
             
-            strategies = self.tuner.generate_strategy_configs(n_strategies)
+            self._log(f"📅 测试期间: {test_start_date} - {test_end_date}")
             
-            # 保存策略配置
-            strategies_file = os.path.join(self.results_dir, f"strategies_{self.timestamp}.json")
-            strategy_data = {
-                'strategies': strategies,
-                'generated_at': datetime.now().isoformat(),
-                'parameters': {
-                    'n_strategies': n_strategies,
-                    'start_date': start_date,
-                    'end_date': end_date,
-                    'run_mode': run_mode
-                }
+            # 回测参数
+            backtest_params = {
+                'initial_capital': 10000,
+                'position_size': 0.25,
+                'fee_rate': 0.001,
+                'max_positions': 4,
+                'entry_top_n': 4,
+                'exit_threshold': 10
             }
             
-            with open(strategies_file, 'w', encoding='utf-8') as f:
-                json.dump(strategy_data, f, indent=2, ensure_ascii=False)
-            
-            phase1_time = time.time() - phase1_start
-            
-            print(f"✅ 第一阶段完成: {phase1_time:.2f}秒")
-            print(f"📄 策略配置已保存: {strategies_file}")
+            # 执行测试
+            execution_result = self._batch_execute_with_cache(
+                test_strategies,
+                test_start_date,
+                test_end_date,
+                temp_dir=f"temp_strategies_{self.timestamp}",
+                **backtest_params
+            )
             
-            # 第二阶段：批量执行策略
-            print(f"\n🎯 第二阶段：批量执行策略")
-            print("-" * 50)
+        elif run_mode == "full":
+            # 完整模式：运行所有策略
+            self._log("🚀 完整模式：运行所有策略")
             
-            phase2_start = time.time()
-            
-            if run_mode == "test":
-                # 测试模式：只运行前2个策略
-                print("🧪 测试模式：仅运行前2个策略")
-                test_strategies = strategies[:2]
-                
-                # 创建测试的时间范围（缩短）
-                test_start_date = "2024-06-01"
-                test_end_date = "2024-06-30"
-                
-                print(f"📅 测试期间: {test_start_date} - {test_end_date}")
-                
-                # 回测参数
-                backtest_params = {
-                    'initial_capital': 10000,
-                    'position_size': 0.25,
-                    'fee_rate': 0.001,
-                    'max_positions': 4,
-                    'entry_top_n': 4,
-                    'exit_threshold': 10
-                }
-                
-                # 执行测试
-                execution_result = self.executor.batch_execute(
-                    test_strategies,
-                    test_start_date,
-                    test_end_date,
-                    temp_dir=f"temp_strategies_{self.timestamp}",
-                    **backtest_params
-                )
-                
-            elif run_mode == "full":
-                # 完整模式：运行所有策略
-                print("🚀 完整模式：运行所有策略")
-                
-                # 从配置中获取回测参数
-                backtest_config = self.tuner.config.get('backtest', {})
-                backtest_params = {
-                    'initial_capital': backtest_config.get('initial_capital', 10000),
-                    'position_size': backtest_config.get('position_size', 0.25),
-                    'fee_rate': backtest_config.get('fee_rate', 0.001),
-                    'max_positions': backtest_config.get('max_positions', 4),
-                    'entry_top_n': backtest_config.get('entry_top_n', 4),
-                    'exit_threshold': backtest_config.get('exit_threshold', 10)
-                }
-                
-                # 执行完整批量处理
-                execution_result = self.executor.batch_execute(
-                    strategies,
-                    start_date,
-                    end_date,
-                    temp_dir=f"temp_strategies_{self.timestamp}",
-                    **backtest_params
-                )
-                
-            else:
-                # 配置模式：只生成配置，不执行
-                print("📝 配置模式：仅生成策略配置")
-                execution_result = {
-                    'total_strategies': len(strategies),
-                    'successful': 0,
-                    'failed': 0,
-                    'success_rate': 0,
-                    'execution_time_minutes': 0,
-                    'results': [],
-                    'mode': 'config_only'  
-                }
-            
-            phase2_time = time.time() - phase2_start
-            
-            print(f"✅ 第二阶段完成: {phase2_time:.2f}秒")
-            
-            # 第三阶段：分析和保存结果
-            print(f"\n🎯 第三阶段：分析和保存结果")
-            print("-" * 50)
+            # 从配置中获取回测参数
+            backtest_config = self.tuner.config.get('backtest', {})
+            backtest_params = {
+                'initial_capital': backtest_config.get('initial_capital', 10000),
+                'position_size': backtest_config.get('position_size', 0.25),
+                'fee_rate': backtest_config.get('fee_rate', 0.001),
+                'max_positions': backtest_config.get('max_positions', 4),
+                'entry_top_n': backtest_config.get('entry_top_n', 4),
+                'exit_threshold': backtest_config.get('exit_threshold', 10)
+            }
             
-            phase3_start = time.time()
+            # 执行完整批量处理
+            execution_result = self._batch_execute_with_cache(
+                strategies,
+                start_date,
+                end_date,
+                temp_dir=f"temp_strategies_{self.timestamp}",
+                **backtest_params
+            )
             
-            # 合并所有结果
-            final_result = {
-                'optimization_summary': {
-                    'total_strategies': len(strategies),
-                    'execution_mode': run_mode,
-                    'date_range': {
-                        'start': start_date,
-                        'end': end_date
-                    },
-                    'timestamp': self.timestamp,
-                    'total_time_minutes': 0  # 稍后计算
-                },
-                'phase_times': {
-                    'phase1_config_generation': phase1_time,
-                    'phase2_batch_execution': phase2_time,
-                    'phase3_analysis': 0  # 稍后计算
-                },
-                'strategies_generated': strategies,
-                'execution_results': execution_result
+        else:
+            # 配置模式：只生成配置，不执行
+            self._log("📝 配置模式：仅生成策略配置")
+            execution_result = {
+                'total_strategies': len(strategies),
+                'successful': 0,
+                'failed': 0,
+                'success_rate': 0,
+                'execution_time_minutes': 0,
+                'results': [],
+                'mode': 'config_only'  
             }
-            
-            # 分析最佳策略
-            if execution_result.get('results'):
-                best_strategies = self._analyze_best_strategies(execution_result['results'])
+        
+        phase2_time = time.time() - phase2_start
+        
+        self._log(f"✅ 第二阶段完成: {phase2_time:.2f}秒")
+        
+        # 第三阶段：分析和保存结果
+        self._log(f"\n🎯 第三阶段：分析和保存结果")
+        self._log("-" * 50)
+        
+        phase3_start = time.time()
+        
+        # 合并所有结果
+        final_result = {
+            'optimization_summary': {
+                'total_strategies': len(strategies),
+                'execution_mode': run_mode,
+                'date_range': {
+                    'start': start_date,
+                    'end': end_date
+                },
+                'timestamp': self.timestamp,
+                'generated_at': generated_at,
+                'requested_strategies': n_strategies,
+                'total_time_minutes': 0  # 稍后计算
+            },
+            'phase_times': {
+                'phase1_config_generation': phase1_time,
+                'phase2_batch_execution': phase2_time,
+                'phase3_analysis': 0  # 稍后计算
+            },
+            'strategies_ref': strategies_ref,
+            'execution_results': execution_result
+        }
+        
+        # 分析最佳策略 (从结果流文件逐行读取)
+        if execution_result.get('results_stream'):
+            stream_file = os.path.join(self.results_dir, execution_result['results_stream'])
+            best_strategies = self._analyze_best_strategies(_iter_jsonl(stream_file))
+            if best_strategies:
                 final_result['best_strategies'] = best_strategies
-            
-            # 保存最终结果
-            final_results_file = os.path.join(self.results_dir, f"final_results_{self.timestamp}.json")
-            with open(final_results_file, 'w', encoding='utf-8') as f:
-                json.dump(final_result, f, indent=2, ensure_ascii=False)
-            
-            phase3_time = time.time() - phase3_start
-            final_result['phase_times']['phase3_analysis'] = phase3_time
-            
-            # 更新总时间
-            total_time = time.time() - total_start_time
-            final_result['optimization_summary']['total_time_minutes'] = total_time / 60
-            
-            print(f"✅ 第三阶段完成: {phase3_time:.2f}秒")
-            print(f"📄 最终结果已保存: {final_results_file}")
-            
-            # 打印最终总结
-            self._print_final_summary(final_result)
-            
-            return final_result
-            
-        except Exception as e:
-            print(f"❌ 优化过程出错: {str(e)}")
-            raise
+        
+        # 保存最终结果
+        final_results_file = os.path.join(self.results_dir, f"final_results_{self.timestamp}.json")
+        _dump_json(final_result, final_results_file)
+        
+        # 供人工查看的摘要文件，只包含最佳策略
+        summary_file = os.path.join(self.results_dir, f"summary_{self.timestamp}.json")
+        _dump_json(final_result.get('best_strategies', {}), summary_file, pretty=True)
+        
+        phase3_time = time.time() - phase3_start
+        final_result['phase_times']['phase3_analysis'] = phase3_time
+        
+        # 更新总时间
+        total_time = time.time() - total_start_time
+        final_result['optimization_summary']['total_time_minutes'] = total_time / 60
+        
+        self._log(f"✅ 第三阶段完成: {phase3_time:.2f}秒")
+        self._log(f"📄 最终结果已保存: {final_results_file}")
+        self._log(f"📄 最佳策略摘要: {summary_file}")
+        
+        # 打印最终总结
+        self._print_final_summary(final_result)
+        
+        return final_result
     
-    def _analyze_best_strategies(self, results: list) -> dict:
-        """分析最佳策略"""
-        if not results:
-            return {}
+    @staticmethod
+    def _cache_version() -> str:
+        """
+        缓存的数据/代码版本
+        
+        由 RESULT_CACHE_VERSION、资金费率数据库以及回测/因子代码文件的修改时间和大小组成，
+        数据刷新或代码改动后缓存键随之改变，旧结果不再命中 (之后由 LRU 淘汰)。
+        """
+        fingerprints = [_file_fingerprint(path) for path in _CACHE_DATA_FILES + _CACHE_CODE_FILES]
+        return f"v{RESULT_CACHE_VERSION}|" + "|".join(fingerprints)
+    
+    def _run_cache_key(self, strategy_config: dict, start_date: str, end_date: str,
+                       backtest_params: dict, cache_version: str) -> str:
+        """计算单次策略运行的缓存键"""
+        # strategy_id 只是本次生成的序号，不影响运行结果
+        config_part = {k: v for k, v in strategy_config.items() if k != 'strategy_id'}
+        params_part = json.dumps(sorted(backtest_params.items()), default=str)
+        payload = f"{config_hash(config_part)}|{start_date}|{end_date}|{params_part}|{cache_version}"
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _load_cached_result(self, run_key: str):
+        """读取缓存的运行结果，未命中返回 None"""
+        cache_file = os.path.join(self.cache_dir, f"{run_key}.json")
+        if not os.path.exists(cache_file):
+            return None
+        
+        try:
+            cached = _load_json(cache_file)
+            # 更新修改时间，作为 LRU 淘汰依据
+            os.utime(cache_file)
+            return cached
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 读取缓存失败 {run_key}: {e}")
+            return None
+    
+    def _save_cached_result(self, run_key: str, result: dict):
+        """保存单次运行结果到缓存"""
+        cache_file = os.path.join(self.cache_dir, f"{run_key}.json")
+        _dump_json(result, cache_file)
+    
+    def _evict_cache(self):
+        """按修改时间淘汰最久未使用的缓存文件"""
+        if not os.path.isdir(self.cache_dir):
+            return
         
-        # 按不同指标排序
-        strategies_with_metrics = []
+        entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.json')]
+        if len(entries) <= self.cache_max_entries:
+            return
         
-        for result in results:
-            backtest = result.get('backtest_result', {})
-            strategy_config = result.get('strategy_config', {})
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.cache_max_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+    
+    def _batch_execute_with_cache(self, strategies: list, start_date: str, end_date: str,
+                                  temp_dir: str, **backtest_params) -> dict:
+        """
+        批量执行策略，已有缓存结果的策略直接复用
+        
+        所有结果 (缓存命中 + 新执行) 逐行写入 results_stream_{ts}.jsonl，不在内存中累积。
+        缓存键包含数据/代码版本 (见 _cache_version)；use_cache=False 时跳过缓存读取。
+        """
+        stream_file = os.path.join(self.results_dir, f"results_stream_{self.timestamp}.jsonl")
+        
+        cache_hits = 0
+        pending = []
+        cache_version = self._cache_version()  # 每批只计算一次
+        
+        with open(stream_file, 'w', encoding='utf-8') as f:
+            for strategy_config in strategies:
+                run_key = self._run_cache_key(strategy_config, start_date, end_date, backtest_params, cache_version)
+                cached = self._load_cached_result(run_key) if self.use_cache else None
+                if cached is not None:
+                    f.write(json.dumps(cached, ensure_ascii=False) + '\n')
+                    cache_hits += 1
+                else:
+                    pending.append((run_key, strategy_config))
+        
+        self._log(f"💾 缓存命中: {cache_hits}/{len(strategies)} 个策略")
+        
+        execution_result = {
+            'successful': 0,
+            'failed': 0,
+            'execution_time_minutes': 0,
+            'failed_strategies': []
+        }
+        
+        if pending:
+            execution_result = self.executor.batch_execute(
+                [strategy_config for _, strategy_config in pending],
+                start_date,
+                end_date,
+                temp_dir=temp_dir,
+                results_stream=stream_file,
+                **backtest_params
+            )
             
-            metrics = {
-                'strategy_name': strategy_config.get('strategy_name', 'Unknown'),
-                'total_return': backtest.get('total_return', 0),
-                'max_drawdown': backtest.get('max_drawdown', 0),
-                'sharpe_ratio': backtest.get('sharpe_ratio', 0),
-                'factors': strategy_config.get('factors', []),
-                'window': strategy_config.get('window', 0)
-            }
+            # 保存新结果到缓存 (缓存命中的结果写在流文件前面，跳过即可)
+            key_by_name = {strategy_config['strategy_name']: run_key for run_key, strategy_config in pending}
+            for i, result in enumerate(_iter_jsonl(stream_file)):
+                if i < cache_hits:
+                    continue
+                run_key = key_by_name.get(result['strategy_config']['strategy_name'])
+                if run_key:
+                    self._save_cached_result(run_key, result)
             
-            strategies_with_metrics.append(metrics)
+            self._evict_cache()
+        
+        successful = execution_result.get('successful', 0) + cache_hits
+        
+        return {
+            'total_strategies': len(strategies),
+            'successful': successful,
+            'failed': execution_result.get('failed', 0),
+            'success_rate': successful / len(strategies) * 100 if strategies else 0,
+            'execution_time_minutes': execution_result.get('execution_time_minutes', 0),
+            'cache_hits': cache_hits,
+            'results_stream': os.path.relpath(stream_file, self.results_dir),
+            'failed_strategies': execution_result.get('failed_strategies', [])
+        }
+    
+    def _analyze_best_strategies(self, results) -> dict:
+        """分析最佳策略 (results 可为列表或逐条产出结果的迭代器)"""
+        # 只提取排序所需的指标，不保留完整结果 (如回测原始输出)
+        metrics_rows = [
+            {
+                'strategy_name': result.get('strategy_config', {}).get('strategy_name', 'Unknown'),
+                'total_return': result.get('backtest_result', {}).get('total_return', 0),
+                'max_drawdown': result.get('backtest_result', {}).get('max_drawdown', 0),
+                'sharpe_ratio': result.get('backtest_result', {}).get('sharpe_ratio', 0),
+                'factors': result.get('strategy_config', {}).get('factors', []),
+                'window': result.get('strategy_config', {}).get('window', 0)
+            }
+            for result in results
+        ]
+        
+        if not metrics_rows:
+            return {}
         
-        # 按总收益率排序
-        by_return = sorted(strategies_with_metrics, key=lambda x: x['total_return'], reverse=True)
+        # 一次性构建指标表，再用部分排序取前5名
+        metrics_df = pd.DataFrame(metrics_rows)
         
-        # 按夏普比率排序
-        by_sharpe = sorted(strategies_with_metrics, key=lambda x: x['sharpe_ratio'], reverse=True)
+        for column in ('total_return', 'max_drawdown', 'sharpe_ratio'):
+            metrics_df[column] = pd.to_numeric(metrics_df[column], errors='coerce').fillna(0.0)
+        
+        # 按总收益率、夏普比率排序 (越大越好)
+        by_return = metrics_df.nlargest(5, 'total_return')
+        by_sharpe = metrics_df.nlargest(5, 'sharpe_ratio')
         
         # 按最大回撤排序 (越小越好)
-        by_drawdown = sorted(strategies_with_metrics, key=lambda x: abs(x['max_drawdown']))
+        by_drawdown = metrics_df.loc[metrics_df['max_drawdown'].abs().nsmallest(5).index]
         
         return {
-            'top_by_return': by_return[:5],
-            'top_by_sharpe': by_sharpe[:5],
-            'top_by_drawdown': by_drawdown[:5],
-            'total_analyzed': len(strategies_with_metrics)
+            'top_by_return': by_return.to_dict('records'),
+            'top_by_sharpe': by_sharpe.to_dict('records'),
+            'top_by_drawdown': by_drawdown.to_dict('records'),
+            'total_analyzed': len(metrics_df)
         }
     
     def _print_final_summary(self, final_result: dict):
-        """打印最终总结"""
-        print("\n" + "=" * 80)
-        print("🎉 优化版超参数调优完成")
-        print("=" * 80)
+        """打印最终总结 (组装后一次性写出)"""
+        if not self.verbose:
+            return
         
         summary = final_result['optimization_summary']
         execution = final_result['execution_results']
         phase_times = final_result['phase_times']
+        timestamp = summary['timestamp']
         
-        print(f"📊 执行总结:")
-        print(f"   - 总策略数: {summary['total_strategies']}")
-        print(f"   - 执行模式: {summary['execution_mode']}")
-        print(f"   - 成功执行: {execution.get('successful', 0)}")
-        print(f"   - 失败执行: {execution.get('failed', 0)}")
-        print(f"   - 成功率: {execution.get('success_rate', 0):.1f}%")
-        print(f"   - 总耗时: {summary['total_time_minutes']:.2f} 分钟")
-        
-        print(f"\n⏱️ 阶段耗时:")
-        print(f"   - 配置生成: {phase_times['phase1_config_generation']:.2f}s")
-        print(f"   - 批量执行: {phase_times['phase2_batch_execution']:.2f}s")
-        print(f"   - 结果分析: {phase_times['phase3_analysis']:.2f}s")
+        lines = [
+            "",
+            "=" * 80,
+            "🎉 优化版超参数调优完成",
+            "=" * 80,
+            "📊 执行总结:",
+            f"   - 总策略数: {summary['total_strategies']}",
+            f"   - 执行模式: {summary['execution_mode']}",
+            f"   - 成功执行: {execution.get('successful', 0)}",
+            f"   - 失败执行: {execution.get('failed', 0)}",
+            f"   - 成功率: {execution.get('success_rate', 0):.1f}%",
+            f"   - 总耗时: {summary['total_time_minutes']:.2f} 分钟",
+            "",
+            "⏱️ 阶段耗时:",
+            f"   - 配置生成: {phase_times['phase1_config_generation']:.2f}s",
+            f"   - 批量执行: {phase_times['phase2_batch_execution']:.2f}s",
+            f"   - 结果分析: {phase_times['phase3_analysis']:.2f}s",
+        ]
         
         # 显示最佳策略
-        if 'best_strategies' in final_result:
-            best = final_result['best_strategies']
-            
-            if best.get('top_by_return'):
-                print(f"\n🏆 收益率最佳策略:")
-                for i, strategy in enumerate(best['top_by_return'][:3], 1):
-                    print(f"   {i}. {strategy['strategy_name']}: {strategy['total_return']:.2f}%")
-            
-            if best.get('top_by_sharpe'):
-                print(f"\n📈 夏普比率最佳策略:")
-                for i, strategy in enumerate(best['top_by_sharpe'][:3], 1):
-                    print(f"   {i}. {strategy['strategy_name']}: {strategy['sharpe_ratio']:.2f}")
-        
-        print(f"\n🚀 性能提升效果:")
-        print(f"   - 使用了三阶段优化的 run_factor_strategies.py")
-        print(f"   - 单例FactorEngine避免重复初始化")
-        print(f"   - 智能并行化减少执行时间")
-        print(f"   - 双重缓存系统提供20-100x加速")
-        
-        print(f"\n📁 结果文件:")
-        print(f"   - 策略配置: strategies_{summary['timestamp']}.json")
-        print(f"   - 最终结果: final_results_{summary['timestamp']}.json")
-        print(f"   - 存储位置: {self.results_dir}")
-
+        best = final_result.get('best_strategies', {})
+        
+        if best.get('top_by_return'):
+            lines += ["", "🏆 收益率最佳策略:"]
+            lines += [f"   {i}. {strategy['strategy_name']}: {strategy['total_return']:.2f}%"
+                      for i, strategy in enumerate(best['top_by_return'][:3], 1)]
+        
+        if best.get('top_by_sharpe'):
+            lines += ["", "📈 夏普比率最佳策略:"]
+            lines += [f"   {i}. {strategy['strategy_name']}: {strategy['sharpe_ratio']:.2f}"
+                      for i, strategy in enumerate(best['top_by_sharpe'][:3], 1)]
+        
+        lines += [
+            "",
+            "🚀 性能提升效果:",
+            "   - 使用了三阶段优化的 run_factor_strategies.py",
+            "   - 单例FactorEngine避免重复初始化",
+            "   - 智能并行化减少执行时间",
+            "   - 双重缓存系统提供20-100x加速",
+            "",
+            "📁 结果文件:",
+            f"   - 策略配置: {final_result['strategies_ref']['file']}",
+            f"   - 最终结果: final_results_{timestamp}.json",
+            f"   - 最佳策略摘要: summary_{timestamp}.json",
+            f"   - 逐条结果: results_stream_{timestamp}.jsonl",
+            f"   - 存储位置: {self.results_dir}",
+        ]
+        
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
 
 def main():
     """主函数"""
@@ -314,12 +561,14 @@ def main():
                        default='test', help='运行模式 (test/full/config)')
     parser.add_argument('--config', type=str, default='hyperparameter_tuning/config.yaml', 
                        help='配置文件路径')
+    parser.add_argument('--no_cache', action='store_true',
+                       help='不使用已缓存的运行结果，全部策略重新执行 (数据库或代码更新后会自动失效)')
     
     args = parser.parse_args()
     
     try:
         # 创建主程序
-        main_program = OptimizedHyperparameterMain(config_file=args.config)
+        main_program = OptimizedHyperparameterMain(config_file=args.config, use_cache=not args.no_cache)
         
         # 运行完整流程
         result = main_program.run_complete_optimization(
@@ -3,6 +3,6 @@
 Configuration Management Module
 """
 
-from .config_manager import ConfigManager, ParameterConfig, SystemConfig
+from .config_manager import ConfigManager, ParameterConfig, SystemConfig, get_config_manager
 
-__all__ = ['ConfigManager', 'ParameterConfig', 'SystemConfig'] 
\ No newline at end of file
+__all__ = ['ConfigManager', 'ParameterConfig', 'SystemConfig', 'get_config_manager'] 
\ No newline at end of file
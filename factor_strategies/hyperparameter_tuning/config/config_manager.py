@@ -3,13 +3,43 @@
 負責讀取和管理系統配置文件
 """
 
+import os
+import sys
+import json
 import yaml
 import logging
+import math
+import functools
 from pathlib import Path
 from typing import Dict, Any, List, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 
-@dataclass
+# 安裝了 libyaml 時使用 C 實現的解析器/輸出器，否則退回純 Python 版本 (語義相同)
+try:
+    from yaml import CSafeLoader as _YamlLoader, CSafeDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader, SafeDumper as _YamlDumper
+
+
+def _warm_up_yaml():
+    """導入時先用一次 Loader/Dumper，首次載入配置時不再承擔 PyYAML 的初始化開銷"""
+    try:
+        yaml.load('{a: [1]}', Loader=_YamlLoader)
+        yaml.dump({'a': [1]}, Dumper=_YamlDumper)
+    except yaml.YAMLError:
+        pass
+
+
+_warm_up_yaml()
+
+# 默認配置文件路徑
+DEFAULT_CONFIG_PATH = Path(__file__).parent.parent / "config.yaml"
+
+# dataclass(slots=True) 需要 Python 3.10+，更早的版本退回普通 dataclass
+# (字段有默認值，無法手寫 __slots__；凍結與比較語義不變)
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class ParameterConfig:
     """參數配置類"""
     name: str
@@ -20,7 +50,7 @@ class ParameterConfig:
     choices: Optional[List[Any]] = None
     value: Optional[Any] = None
 
-@dataclass
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class SystemConfig:
     """系統配置類"""
     database_path: str = "../../data/funding_rate.db"
@@ -29,6 +59,67 @@ class SystemConfig:
     cleanup_failed: bool = True
     results_retention_days: int = 30
 
+
+def _parse_range(name: str, param_config: Dict[str, Any]) -> ParameterConfig:
+    return ParameterConfig(name=name, type='range',
+                           min_value=param_config.get('min_value'),
+                           max_value=param_config.get('max_value'),
+                           step=param_config.get('step', 1))
+
+
+def _parse_choice(name: str, param_config: Dict[str, Any]) -> ParameterConfig:
+    return ParameterConfig(name=name, type='choice', choices=param_config.get('choices', []))
+
+
+def _parse_fixed(name: str, param_config: Dict[str, Any]) -> ParameterConfig:
+    return ParameterConfig(name=name, type='fixed', value=param_config.get('value'))
+
+
+def _validate_range(config: ParameterConfig) -> Optional[str]:
+    if config.min_value is None or config.max_value is None:
+        return f"參數 {config.name}: range類型需要設置min_value和max_value"
+    if config.min_value >= config.max_value:
+        return f"參數 {config.name}: min_value必須小於max_value"
+    if config.step is None or config.step <= 0:
+        return f"參數 {config.name}: step必須大於0"
+    return None
+
+
+def _validate_choice(config: ParameterConfig) -> Optional[str]:
+    if not config.choices:
+        return f"參數 {config.name}: choice類型需要設置choices列表"
+    return None
+
+
+def _validate_fixed(config: ParameterConfig) -> Optional[str]:
+    if config.value is None:
+        return f"參數 {config.name}: fixed類型需要設置value"
+    return None
+
+
+# 可按歷史結果剪枝的參數 (與 hyperparameter_tuning_results 的列同名)
+_PRUNABLE_COLUMNS = ('factors', 'window_size', 'rebalance_frequency',
+                     'data_period', 'selection_count', 'weight_method')
+
+
+def _choice_key(value):
+    """參數取值的可哈希形式 (列表類取值如 factors 轉為元組)"""
+    return tuple(value) if isinstance(value, list) else value
+
+# 參數類型 -> 解析函數 / 驗證函數 (新增參數類型只需在此登記)
+_PARAMETER_PARSERS = {
+    'range': _parse_range,
+    'choice': _parse_choice,
+    'fixed': _parse_fixed,
+}
+
+_PARAMETER_VALIDATORS = {
+    'range': _validate_range,
+    'choice': _validate_choice,
+    'fixed': _validate_fixed,
+}
+
+
 class ConfigManager:
     """配置管理器"""
     
@@ -43,23 +134,64 @@ class ConfigManager:
         
         if config_path is None:
             # 使用默認配置文件
-            config_path = Path(__file__).parent.parent / "config.yaml"
+            config_path = DEFAULT_CONFIG_PATH
             
         self.config_path = Path(config_path)
         self.config_data = {}
         self.parameter_configs = []
         self.system_config = SystemConfig()
+        self._space_size = None  # 參數空間大小緩存 (重新解析配置時失效)
+        self._validated = False  # 當前解析結果已通過驗證 (重新解析配置時失效)
         
         # 載入配置
         self._load_config()
         
+    @property
+    def _cache_path(self) -> Path:
+        """解析結果的 JSON 緩存文件 (與配置文件同目錄)"""
+        return self.config_path.with_suffix('.cache.json')
+        
+    def _load_cached_config(self) -> bool:
+        """配置文件未修改時從 JSON 緩存載入解析結果，成功返回 True"""
+        cache_path = self._cache_path
+        try:
+            if cache_path.stat().st_mtime_ns < self.config_path.stat().st_mtime_ns:
+                return False
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                self.config_data = json.load(f)
+            return True
+        except (OSError, ValueError):
+            return False
+            
+    def _write_config_cache(self):
+        """將通過驗證的解析結果寫入 JSON 緩存 (無法序列化或寫入失敗時跳過)"""
+        cache_path = self._cache_path
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.config_data, f, ensure_ascii=False)
+            os.replace(tmp_path, cache_path)
+        except (OSError, TypeError, ValueError) as e:
+            self.logger.debug(f"寫入配置緩存失敗: {e}")
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+                
     def _load_config(self):
-        """載入配置文件"""
+        """載入配置文件 (配置文件未修改時直接讀取已驗證的 JSON 緩存)"""
         try:
             if self.config_path.exists():
+                if self._load_cached_config():
+                    self.logger.info(f"載入配置文件 (緩存): {self.config_path}")
+                    self._parse_config()
+                    # 緩存中只有通過驗證的配置，無需再次驗證
+                    self._validated = True
+                    return
+                    
                 self.logger.info(f"載入配置文件: {self.config_path}")
                 with open(self.config_path, 'r', encoding='utf-8') as f:
-                    self.config_data = yaml.safe_load(f)
+                    self.config_data = yaml.load(f, Loader=_YamlLoader)
             else:
                 self.logger.warning(f"配置文件不存在: {self.config_path}，使用默認配置")
                 self._create_default_config()
@@ -67,6 +199,10 @@ class ConfigManager:
             # 解析配置
             self._parse_config()
             
+            # 只緩存通過驗證的配置文件解析結果，避免錯誤配置被緩存
+            if self.config_path.exists() and not self.validate_config():
+                self._write_config_cache()
+            
         except Exception as e:
             self.logger.error(f"載入配置文件失敗: {e}")
             self.logger.info("使用默認配置")
@@ -132,24 +268,17 @@ class ConfigManager:
         # 解析參數配置
         parameters = self.config_data.get('parameters', {})
         self.parameter_configs = []
+        self._space_size = None
+        self._validated = False
         
         for param_name, param_config in parameters.items():
             param_type = param_config.get('type', 'fixed')
-            
-            config = ParameterConfig(
-                name=param_name,
-                type=param_type
-            )
-            
-            if param_type == 'range':
-                config.min_value = param_config.get('min_value')
-                config.max_value = param_config.get('max_value')
-                config.step = param_config.get('step', 1)
-            elif param_type == 'choice':
-                config.choices = param_config.get('choices', [])
-            elif param_type == 'fixed':
-                config.value = param_config.get('value')
-                
+            parser = _PARAMETER_PARSERS.get(param_type)
+            if parser is None:
+                # 未知類型只保留名稱和類型
+                config = ParameterConfig(name=param_name, type=param_type)
+            else:
+                config = parser(param_name, param_config)
             self.parameter_configs.append(config)
             
         self.logger.info(f"成功解析 {len(self.parameter_configs)} 個參數配置")
@@ -163,42 +292,90 @@ class ConfigManager:
         return self.system_config
         
     def get_parameter_space_size(self) -> int:
-        """計算參數空間大小"""
-        total_size = 1
+        """計算參數空間大小 (結果緩存到下次解析配置)"""
+        if self._space_size is None:
+            self._space_size = math.prod(map(self._parameter_size, self.parameter_configs))
+        return self._space_size
         
-        for config in self.parameter_configs:
-            if config.type == 'range':
-                if config.min_value is not None and config.max_value is not None:
-                    size = int((config.max_value - config.min_value) / config.step) + 1
-                    total_size *= size
-            elif config.type == 'choice':
-                if config.choices:
-                    total_size *= len(config.choices)
-            # fixed type不影響空間大小
+    @staticmethod
+    def _parameter_size(config: ParameterConfig) -> int:
+        """單個參數的取值個數 (fixed 類型或未完整設置時為1)"""
+        if config.type == 'range':
+            if config.min_value is not None and config.max_value is not None:
+                return int((config.max_value - config.min_value) / config.step) + 1
+        elif config.type == 'choice':
+            if config.choices:
+                return len(config.choices)
+        return 1
+        
+    def prune_from_results(self, db, p_aggr: float = 0.5) -> Dict[str, List[Any]]:
+        """
+        根據歷史回測結果剪枝 choice 類型參數的取值
+        
+        以所有歷史結果中的最佳夏普比率為基準，門檻為 best - (1 - p_aggr) * |best|
+        (best > 0 時即 p_aggr * best)。曾經測試過但從未達到門檻的取值被移除，
+        未測試過的取值保留。本實例的參數配置會被修改 (get_config_manager 返回的共享實例同樣受影響)。
+        
+        Args:
+            db: 數據庫管理器 (DatabaseManager)
+            p_aggr: 剪枝力度，0~1，越大剪得越多
+            
+        Returns:
+            {參數名: 被移除的取值列表}
+        """
+        targets = [config for config in self.parameter_configs
+                   if config.type == 'choice' and config.choices and config.name in _PRUNABLE_COLUMNS]
+        if not targets:
+            return {}
             
-        return total_size
+        columns = ', '.join(config.name for config in targets)
+        with db.get_connection() as conn:
+            rows = conn.execute(
+                f'SELECT {columns}, sharpe_ratio FROM hyperparameter_tuning_results '
+                f'WHERE sharpe_ratio IS NOT NULL'
+            ).fetchall()
+        if not rows:
+            return {}
+            
+        best = max(row[-1] for row in rows)
+        cut = best - (1 - p_aggr) * abs(best)
+        
+        pruned = {}
+        for index, config in enumerate(targets):
+            tested, passed = set(), set()
+            for row in rows:
+                value = row[index]
+                if config.name == 'factors' and isinstance(value, str):
+                    value = json.loads(value)
+                key = _choice_key(value)
+                tested.add(key)
+                if row[-1] >= cut:
+                    passed.add(key)
+                    
+            kept = [choice for choice in config.choices
+                    if _choice_key(choice) not in tested or _choice_key(choice) in passed]
+            if kept and len(kept) < len(config.choices):
+                pruned[config.name] = [choice for choice in config.choices if choice not in kept]
+                self.parameter_configs[self.parameter_configs.index(config)] = replace(config, choices=kept)
+                
+        if pruned:
+            self._space_size = None
+            self.logger.info(f"根據歷史結果剪枝參數: {pruned} (門檻 sharpe >= {cut:.4f})")
+        return pruned
         
     def validate_config(self) -> List[str]:
-        """驗證配置合法性"""
+        """驗證配置合法性 (已驗證通過的解析結果直接返回)"""
+        if self._validated:
+            return []
+            
         errors = []
         
         # 驗證參數配置
         for config in self.parameter_configs:
-            if config.type == 'range':
-                if config.min_value is None or config.max_value is None:
-                    errors.append(f"參數 {config.name}: range類型需要設置min_value和max_value")
-                elif config.min_value >= config.max_value:
-                    errors.append(f"參數 {config.name}: min_value必須小於max_value")
-                elif config.step is None or config.step <= 0:
-                    errors.append(f"參數 {config.name}: step必須大於0")
-                    
-            elif config.type == 'choice':
-                if not config.choices:
-                    errors.append(f"參數 {config.name}: choice類型需要設置choices列表")
-                    
-            elif config.type == 'fixed':
-                if config.value is None:
-                    errors.append(f"參數 {config.name}: fixed類型需要設置value")
+            validator = _PARAMETER_VALIDATORS.get(config.type)
+            error = validator(config) if validator is not None else None
+            if error:
+                errors.append(error)
                     
         # 驗證系統配置
         if self.system_config.max_parallel <= 0:
@@ -207,6 +384,7 @@ class ConfigManager:
         if self.system_config.timeout_minutes <= 0:
             errors.append("timeout_minutes必須大於0")
             
+        self._validated = not errors
         return errors
         
     def save_config(self, path: str = None):
@@ -216,7 +394,7 @@ class ConfigManager:
             
         try:
             with open(path, 'w', encoding='utf-8') as f:
-                yaml.dump(self.config_data, f, default_flow_style=False, 
+                yaml.dump(self.config_data, f, Dumper=_YamlDumper, default_flow_style=False, 
                          allow_unicode=True, sort_keys=False)
             self.logger.info(f"配置已保存到: {path}")
         except Exception as e:
@@ -232,4 +410,29 @@ class ConfigManager:
             'max_parallel': self.system_config.max_parallel,
             'timeout_minutes': self.system_config.timeout_minutes,
             'database_path': self.system_config.database_path
-        } 
\ No newline at end of file
+        }
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_config_manager(config_path: str, mtime_ns: int) -> ConfigManager:
+    """按 (配置文件絕對路徑, 修改時間) 緩存配置管理器實例"""
+    return ConfigManager(config_path)
+
+
+def get_config_manager(config_path: str = None) -> ConfigManager:
+    """
+    獲取配置管理器，同一進程內配置文件未修改時復用已解析的實例
+    
+    Args:
+        config_path: 配置文件路徑，如果為空則使用默認配置
+        
+    Returns:
+        配置管理器 (多個組件共享，修改後需自行保存)
+    """
+    path = Path(config_path if config_path is not None else DEFAULT_CONFIG_PATH).resolve()
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except OSError:
+        # 配置文件不存在時不緩存 (使用默認配置)
+        return ConfigManager(str(path))
+    return _cached_config_manager(str(path), mtime_ns)
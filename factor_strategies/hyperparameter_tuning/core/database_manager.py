@@ -3,14 +3,159 @@
 負責管理超參數調優過程中的數據存儲
 """
 
+import os
+import atexit
 import sqlite3
 import logging
 import json
+import time
+import queue
+import threading
+import uuid
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from contextlib import contextmanager
 
+# orjson 為可選依賴，未安裝時退回標準庫 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps_bytes(obj) -> bytes:
+    """序列化為緊湊的 UTF-8 JSON 字節 (存入 BLOB 列)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def _dumps(obj) -> str:
+    """序列化為緊湊的 JSON 文本 (存入 TEXT 列)"""
+    if orjson is not None:
+        return _dumps_bytes(obj).decode('utf-8')
+    return json.dumps(obj, separators=(',', ':'))
+
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+# zstandard 為可選依賴，未安裝時完整結果以未壓縮的 JSON 存放
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'  # zstd 幀頭，JSON 文本不會以此開頭
+_ZSTD_LEVEL = 3
+
+
+def _pack_raw(obj) -> bytes:
+    """序列化完整回測結果，可用時以 zstd 壓縮"""
+    data = _dumps_bytes(obj)
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(data)
+    return data
+
+
+def _load_raw(blob: bytes):
+    """解析 _pack_raw 存入的數據 (兼容未壓縮的舊記錄)"""
+    data = bytes(blob)
+    if data.startswith(_ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError("完整結果以 zstd 壓縮存放，需要安裝 zstandard 才能讀取")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    return _loads(data)
+
+# 每個連接打開時設置的 PRAGMA (WAL 模式下 NORMAL 同步不在每次提交時 fsync)
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+
+# 熱路徑 SQL 固定為常量：sqlite3 的語句緩存以 SQL 文本為鍵，文本不變即可復用已編譯的語句
+_STATEMENT_CACHE_SIZE = 256
+
+_SQL_INSERT_QUEUE = (
+    "INSERT INTO strategy_queue "
+    "(session_id, strategy_id, strategy_config, priority) "
+    "VALUES (?, ?, ?, ?)"
+)
+
+_SQL_SELECT_PENDING = (
+    "SELECT id, strategy_id, strategy_config, priority, retry_count "
+    "FROM strategy_queue "
+    "WHERE session_id = ? AND status = 'pending' "
+    "ORDER BY priority ASC, created_at ASC "
+    "LIMIT ?"
+)
+
+_SQL_MARK_RUNNING = (
+    "UPDATE strategy_queue "
+    "SET status = ?, started_at = CURRENT_TIMESTAMP "
+    "WHERE id = ?"
+)
+
+_SQL_MARK_FINISHED = (
+    "UPDATE strategy_queue "
+    "SET status = ?, completed_at = CURRENT_TIMESTAMP, "
+    "execution_time_seconds = ?, error_message = ? "
+    "WHERE id = ?"
+)
+
+_SQL_SET_STATUS = (
+    "UPDATE strategy_queue "
+    "SET status = ?, error_message = ? "
+    "WHERE id = ?"
+)
+
+_SQL_INSERT_RESULT = (
+    "INSERT OR REPLACE INTO hyperparameter_tuning_results "
+    "(session_id, strategy_id, factors, window_size, rebalance_frequency, "
+    "data_period, selection_count, weight_method, total_return, "
+    "annual_return, sharpe_ratio, max_drawdown, win_rate, trade_count, "
+    "start_date, end_date) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+_SQL_INSERT_RAW = (
+    "INSERT OR REPLACE INTO hyperparameter_tuning_raw "
+    "(session_id, strategy_id, raw) "
+    "VALUES (?, ?, ?)"
+)
+
+_SQL_SESSION_STATUS = (
+    "WITH stats AS ("
+    "SELECT status, COUNT(*) AS count, AVG(execution_time_seconds) AS avg_time "
+    "FROM strategy_queue WHERE session_id = ? GROUP BY status"
+    "), top AS ("
+    "SELECT strategy_id, sharpe_ratio, annual_return "
+    "FROM hyperparameter_tuning_results WHERE session_id = ? "
+    "ORDER BY sharpe_ratio DESC LIMIT 5"
+    ") "
+    "SELECT s.*, "
+    "(SELECT json_group_object(status, json_object('count', count, 'avg_time', avg_time)) FROM stats) "
+    "AS status_breakdown, "
+    "(SELECT json_group_array(json_object('strategy_id', strategy_id, 'sharpe_ratio', sharpe_ratio, "
+    "'annual_return', annual_return)) FROM top) AS top_results "
+    "FROM tuning_sessions s WHERE s.session_id = ?"
+)
+
+_SQL_INSERT_LOG = (
+    "INSERT INTO execution_log "
+    "(session_id, strategy_id, log_level, message, details) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+
+# 執行日誌批量寫入：隊列上限、單批最大行數、湊批等待時間 (秒)
+_LOG_QUEUE_SIZE = 10000
+_LOG_BATCH_SIZE = 500
+_LOG_BATCH_WAIT = 0.2
+_LOG_STOP = object()  # 通知寫入線程退出
+
+
 class DatabaseManager:
     """數據庫管理器"""
     
@@ -30,9 +175,31 @@ class DatabaseManager:
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         
+        # 每個線程復用一個持久連接，退出時統一關閉
+        self._local = threading.local()
+        self._connections = []  # [(進程ID, 連接)]
+        self._connections_lock = threading.Lock()
+        self._generation = 0    # close() 後遞增，使各線程緩存的連接失效
+        
+        # 執行日誌先進入隊列，由後台線程按批寫入 (首次記錄日誌時啟動)
+        self._log_queue = queue.Queue(_LOG_QUEUE_SIZE)
+        self._log_thread = None
+        self._log_pid = None
+        self._log_thread_lock = threading.Lock()
+        atexit.register(self.close)
+        
         # 初始化數據庫
         self._init_database()
+        self._enable_wal()
         
+    def _enable_wal(self):
+        """啟用 WAL 日誌模式 (持久化在數據庫文件中，只需設置一次)，讀寫互不阻塞"""
+        try:
+            with self.get_connection() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.Error as e:
+            self.logger.warning(f"啟用 WAL 模式失敗: {e}")
+            
     def _init_database(self):
         """初始化數據庫表結構"""
         try:
@@ -96,13 +263,22 @@ class DatabaseManager:
                         trade_count INTEGER,
                         start_date TEXT,
                         end_date TEXT,
-                        raw_result TEXT,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         FOREIGN KEY (session_id) REFERENCES tuning_sessions (session_id),
                         UNIQUE(session_id, strategy_id)
                     )
                 ''')
                 
+                # 創建完整回測結果表 (原始結果單獨存放，使匯總表保持緊湊，排名查詢讀取更少頁面)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS hyperparameter_tuning_raw (
+                        session_id TEXT NOT NULL,
+                        strategy_id TEXT NOT NULL,
+                        raw BLOB,
+                        PRIMARY KEY (session_id, strategy_id)
+                    )
+                ''')
+                
                 # 創建執行日誌表
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS execution_log (
@@ -118,7 +294,10 @@ class DatabaseManager:
                 ''')
                 
                 # 創建索引以提高查詢性能
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_strategy_queue_session_status ON strategy_queue (session_id, status)')
+                # 待執行隊列按 (session_id, status) 過濾並按 (priority, created_at) 排序，索引覆蓋排序列避免臨時排序；
+                # 舊的 (session_id, status) 索引是其前綴，已冗餘
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_sq_pending ON strategy_queue (session_id, status, priority, created_at)')
+                cursor.execute('DROP INDEX IF EXISTS idx_strategy_queue_session_status')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_hyperparameter_tuning_results_session ON hyperparameter_tuning_results (session_id)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_hyperparameter_tuning_results_performance ON hyperparameter_tuning_results (sharpe_ratio, annual_return)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_execution_log_session ON execution_log (session_id)')
@@ -130,22 +309,127 @@ class DatabaseManager:
             self.logger.error(f"數據庫初始化失敗: {e}")
             raise
             
+    def _thread_connection(self) -> sqlite3.Connection:
+        """獲取當前線程的持久連接 (首次使用或在子進程中時新建並設置 PRAGMA)"""
+        conn = getattr(self._local, 'conn', None)
+        key = (os.getpid(), self._generation)
+        if conn is None or self._local.key != key:
+            # 連接只在創建它的線程中使用；關閉 check_same_thread 以便 close() 在退出時統一關閉
+            conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                   cached_statements=_STATEMENT_CACHE_SIZE)
+            conn.row_factory = sqlite3.Row  # 使結果可以通過字段名訪問
+            for pragma in _CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            self._local.key = key
+            with self._connections_lock:
+                self._connections.append((key[0], conn))
+        return conn
+        
     @contextmanager
     def get_connection(self):
-        """獲取數據庫連接的上下文管理器"""
-        conn = None
+        """獲取數據庫連接的上下文管理器 (復用當前線程的連接，出錯時回滾但不關閉)"""
+        conn = self._thread_connection()
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row  # 使結果可以通過字段名訪問
             yield conn
         except Exception as e:
-            if conn:
-                conn.rollback()
+            conn.rollback()
             self.logger.error(f"數據庫操作失敗: {e}")
             raise
-        finally:
-            if conn:
+            
+    def close(self):
+        """寫出待寫日誌並關閉本進程中所有線程創建的連接 (之後的操作會重新建立連接)"""
+        self._stop_log_writer()
+        pid = os.getpid()
+        with self._connections_lock:
+            self._generation += 1
+            connections = [conn for owner, conn in self._connections if owner == pid]
+            self._connections = []
+        for conn in connections:
+            try:
                 conn.close()
+            except sqlite3.Error:
+                pass
+            
+    def __getstate__(self):
+        # 連接與鎖不可跨進程傳遞，在新進程中重新創建
+        state = self.__dict__.copy()
+        state['_local'] = None
+        state['_connections'] = []
+        state['_connections_lock'] = None
+        state['_log_queue'] = None
+        state['_log_thread'] = None
+        state['_log_thread_lock'] = None
+        return state
+        
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._connections_lock = threading.Lock()
+        self._log_queue = queue.Queue(_LOG_QUEUE_SIZE)
+        self._log_thread_lock = threading.Lock()
+        
+    def _ensure_log_writer(self):
+        """確保本進程的日誌寫入線程在運行"""
+        thread = self._log_thread
+        if thread is not None and thread.is_alive() and self._log_pid == os.getpid():
+            return
+        with self._log_thread_lock:
+            if self._log_thread is not None and self._log_thread.is_alive() and self._log_pid == os.getpid():
+                return
+            if self._log_thread is not None:
+                # fork 後父進程的線程不存在，隊列狀態也不可信，重新創建
+                self._log_queue = queue.Queue(_LOG_QUEUE_SIZE)
+            self._log_pid = os.getpid()
+            self._log_thread = threading.Thread(target=self._drain_logs, name='tuning-log-writer', daemon=True)
+            self._log_thread.start()
+            
+    def _stop_log_writer(self):
+        """寫出隊列中剩餘的日誌並停止寫入線程"""
+        with self._log_thread_lock:
+            thread = self._log_thread
+            if thread is None or not thread.is_alive() or self._log_pid != os.getpid():
+                return
+            self._log_queue.put(_LOG_STOP)
+            thread.join()
+            self._log_thread = None
+            
+    def flush_logs(self):
+        """等待已提交的執行日誌全部寫入數據庫"""
+        thread = self._log_thread
+        if thread is not None and thread.is_alive() and self._log_pid == os.getpid():
+            self._log_queue.join()
+            
+    def _drain_logs(self):
+        """後台線程：從隊列湊批，一個事務內 executemany 寫入"""
+        log_queue = self._log_queue
+        while True:
+            batch = [log_queue.get()]
+            deadline = time.monotonic() + _LOG_BATCH_WAIT
+            while batch[-1] is not _LOG_STOP and len(batch) < _LOG_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(log_queue.get(timeout=remaining) if remaining > 0 else log_queue.get_nowait())
+                except queue.Empty:
+                    break
+                    
+            stop = batch[-1] is _LOG_STOP
+            rows = batch[:-1] if stop else batch
+            try:
+                if rows:
+                    self._write_log_rows(rows)
+            except Exception as e:
+                self.logger.error(f"批量寫入執行日誌失敗 ({len(rows)} 條): {e}")
+            finally:
+                for _ in batch:
+                    log_queue.task_done()
+            if stop:
+                return
+                
+    def _write_log_rows(self, rows: List[Tuple]):
+        with self.get_connection() as conn:
+            conn.executemany(_SQL_INSERT_LOG, rows)
+            conn.commit()
                 
     def create_session(self, mode: str, total_strategies: int, 
                       config_data: Dict[str, Any] = None, notes: str = None) -> str:
@@ -162,10 +446,8 @@ class DatabaseManager:
             session_id: 會話ID
         """
         try:
-            import random
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            random_suffix = f"{random.randint(1000, 9999)}"
-            session_id = f"session_{timestamp}_{random_suffix}"
+            # 時間前綴便於人工辨識，uuid4 後綴保證多進程同時創建也不衝突
+            session_id = f"session_{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:12]}"
             
             with self.get_connection() as conn:
                 cursor = conn.cursor()
@@ -174,7 +456,7 @@ class DatabaseManager:
                     (session_id, mode, total_strategies, config_data, notes)
                     VALUES (?, ?, ?, ?, ?)
                 ''', (session_id, mode, total_strategies, 
-                     json.dumps(config_data) if config_data else None, notes))
+                     _dumps(config_data) if config_data else None, notes))
                 conn.commit()
                 
             self.logger.info(f"創建會話成功: {session_id}")
@@ -196,13 +478,13 @@ class DatabaseManager:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                for i, strategy in enumerate(strategies):
-                    strategy_id = strategy.get('strategy_id', f"strategy_{i+1:06d}")
-                    cursor.execute('''
-                        INSERT INTO strategy_queue 
-                        (session_id, strategy_id, strategy_config, priority)
-                        VALUES (?, ?, ?, ?)
-                    ''', (session_id, strategy_id, json.dumps(strategy), i))
+                # 單條語句 + executemany，整批在一個事務中提交
+                rows = ((session_id,
+                         strategy.get('strategy_id', f"strategy_{i+1:06d}"),
+                         _dumps(strategy),
+                         i)
+                        for i, strategy in enumerate(strategies))
+                cursor.executemany(_SQL_INSERT_QUEUE, rows)
                     
                 conn.commit()
                 
@@ -212,45 +494,32 @@ class DatabaseManager:
             self.logger.error(f"添加策略到隊列失敗: {e}")
             raise
             
-    def get_pending_strategies(self, session_id: str, limit: int = None) -> List[Dict[str, Any]]:
+    def get_pending_strategies(self, session_id: str, limit: int = None) -> Iterator[Dict[str, Any]]:
         """
-        獲取待執行的策略
+        獲取待執行的策略 (逐行產出，不一次性載入整個隊列)
         
         Args:
             session_id: 會話ID
             limit: 限制數量
             
         Returns:
-            待執行的策略列表
+            待執行策略的迭代器
         """
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                query = '''
-                    SELECT id, strategy_id, strategy_config, priority, retry_count
-                    FROM strategy_queue 
-                    WHERE session_id = ? AND status = 'pending'
-                    ORDER BY priority ASC, created_at ASC
-                '''
-                
-                if limit:
-                    query += f' LIMIT {limit}'
-                    
-                cursor.execute(query, (session_id,))
-                rows = cursor.fetchall()
+                # LIMIT 綁定為參數 (SQLite 中 -1 表示不限制)，語句可被緩存復用
+                cursor.execute(_SQL_SELECT_PENDING, (session_id, limit if limit else -1))
                 
-                strategies = []
-                for row in rows:
-                    strategies.append({
+                for row in cursor:
+                    yield {
                         'id': row['id'],
                         'strategy_id': row['strategy_id'],
-                        'strategy_config': json.loads(row['strategy_config']),
+                        'strategy_config': _loads(row['strategy_config']),
                         'priority': row['priority'],
                         'retry_count': row['retry_count']
-                    })
-                    
-                return strategies
+                    }
                 
         except Exception as e:
             self.logger.error(f"獲取待執行策略失敗: {e}")
@@ -272,24 +541,11 @@ class DatabaseManager:
                 cursor = conn.cursor()
                 
                 if status == 'running':
-                    cursor.execute('''
-                        UPDATE strategy_queue 
-                        SET status = ?, started_at = CURRENT_TIMESTAMP
-                        WHERE id = ?
-                    ''', (status, queue_id))
+                    cursor.execute(_SQL_MARK_RUNNING, (status, queue_id))
                 elif status in ['completed', 'failed']:
-                    cursor.execute('''
-                        UPDATE strategy_queue 
-                        SET status = ?, completed_at = CURRENT_TIMESTAMP,
-                            execution_time_seconds = ?, error_message = ?
-                        WHERE id = ?
-                    ''', (status, execution_time, error_message, queue_id))
+                    cursor.execute(_SQL_MARK_FINISHED, (status, execution_time, error_message, queue_id))
                 else:
-                    cursor.execute('''
-                        UPDATE strategy_queue 
-                        SET status = ?, error_message = ?
-                        WHERE id = ?
-                    ''', (status, error_message, queue_id))
+                    cursor.execute(_SQL_SET_STATUS, (status, error_message, queue_id))
                     
                 conn.commit()
                 
@@ -307,45 +563,90 @@ class DatabaseManager:
             result: 回測結果
         """
         try:
+            summary_row, raw_row = self._result_rows(session_id, strategy_id, result)
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                cursor.execute(_SQL_INSERT_RESULT, summary_row)
+                cursor.execute(_SQL_INSERT_RAW, raw_row)
+                conn.commit()
                 
-                # 提取關鍵指標
-                strategy_config = result.get('strategy_config', {})
-                metrics = result.get('metrics', {})
-                
-                cursor.execute('''
-                    INSERT OR REPLACE INTO hyperparameter_tuning_results 
-                    (session_id, strategy_id, factors, window_size, rebalance_frequency,
-                     data_period, selection_count, weight_method, total_return, 
-                     annual_return, sharpe_ratio, max_drawdown, win_rate, trade_count,
-                     start_date, end_date, raw_result)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    session_id, strategy_id,
-                    json.dumps(strategy_config.get('factors', [])),
-                    strategy_config.get('window_size'),
-                    strategy_config.get('rebalance_frequency'),
-                    strategy_config.get('data_period'),
-                    strategy_config.get('selection_count'),
-                    strategy_config.get('weight_method'),
-                    metrics.get('total_return'),
-                    metrics.get('annual_return'),
-                    metrics.get('sharpe_ratio'),
-                    metrics.get('max_drawdown'),
-                    metrics.get('win_rate'),
-                    metrics.get('trade_count'),
-                    metrics.get('start_date'),
-                    metrics.get('end_date'),
-                    json.dumps(result)
-                ))
+        except Exception as e:
+            self.logger.error(f"保存回測結果失敗: {e}")
+            raise
+            
+    @staticmethod
+    def _result_rows(session_id: str, strategy_id: str, result: Dict[str, Any]) -> Tuple[Tuple, Tuple]:
+        """回測結果 -> (匯總表行, 完整結果表行)"""
+        # 提取關鍵指標
+        strategy_config = result.get('strategy_config', {})
+        metrics = result.get('metrics', {})
+        
+        summary_row = (
+            session_id, strategy_id,
+            _dumps(strategy_config.get('factors', [])),
+            strategy_config.get('window_size'),
+            strategy_config.get('rebalance_frequency'),
+            strategy_config.get('data_period'),
+            strategy_config.get('selection_count'),
+            strategy_config.get('weight_method'),
+            metrics.get('total_return'),
+            metrics.get('annual_return'),
+            metrics.get('sharpe_ratio'),
+            metrics.get('max_drawdown'),
+            metrics.get('win_rate'),
+            metrics.get('trade_count'),
+            metrics.get('start_date'),
+            metrics.get('end_date')
+        )
+        return summary_row, (session_id, strategy_id, _pack_raw(result))
+        
+    def save_execution_batch(self, session_id: str,
+                             finished: List[Tuple[int, str, Optional[float], Optional[str]]],
+                             results: List[Tuple[str, Dict[str, Any]]]):
+        """
+        批量記錄已結束策略的狀態和回測結果 (單個事務、一次提交)
+        
+        Args:
+            session_id: 會話ID
+            finished: [(隊列記錄ID, 'completed'/'failed', 執行時間, 錯誤消息)]
+            results: [(策略ID, 回測結果)]
+        """
+        try:
+            summary_rows = []
+            raw_rows = []
+            for strategy_id, result in results:
+                summary_row, raw_row = self._result_rows(session_id, strategy_id, result)
+                summary_rows.append(summary_row)
+                raw_rows.append(raw_row)
                 
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(_SQL_MARK_FINISHED, [
+                    (status, execution_time, error_message, queue_id)
+                    for queue_id, status, execution_time, error_message in finished
+                ])
+                cursor.executemany(_SQL_INSERT_RESULT, summary_rows)
+                cursor.executemany(_SQL_INSERT_RAW, raw_rows)
                 conn.commit()
                 
         except Exception as e:
-            self.logger.error(f"保存回測結果失敗: {e}")
+            self.logger.error(f"批量保存執行結果失敗: {e}")
             raise
             
+    def get_raw_result(self, session_id: str, strategy_id: str) -> Optional[Dict[str, Any]]:
+        """獲取單個策略的完整回測結果，不存在時返回 None"""
+        try:
+            with self.get_connection() as conn:
+                row = conn.execute(
+                    'SELECT raw FROM hyperparameter_tuning_raw WHERE session_id = ? AND strategy_id = ?',
+                    (session_id, strategy_id)
+                ).fetchone()
+            return _load_raw(row['raw']) if row and row['raw'] is not None else None
+            
+        except Exception as e:
+            self.logger.error(f"獲取完整回測結果失敗: {e}")
+            return None
+            
     def get_session_status(self, session_id: str) -> Dict[str, Any]:
         """
         獲取會話狀態
@@ -360,43 +661,16 @@ class DatabaseManager:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # 獲取會話基本信息
-                cursor.execute('''
-                    SELECT * FROM tuning_sessions WHERE session_id = ?
-                ''', (session_id,))
+                # 會話信息、策略執行統計和最佳結果在一條查詢中取得 (同一快照)，
+                # 統計與最佳結果由 JSON1 聚合為 JSON 文本
+                cursor.execute(_SQL_SESSION_STATUS, (session_id, session_id, session_id))
                 session_row = cursor.fetchone()
                 
                 if not session_row:
                     return {"error": "會話不存在"}
                     
-                # 獲取策略執行統計
-                cursor.execute('''
-                    SELECT 
-                        status,
-                        COUNT(*) as count,
-                        AVG(execution_time_seconds) as avg_time
-                    FROM strategy_queue 
-                    WHERE session_id = ? 
-                    GROUP BY status
-                ''', (session_id,))
-                
-                status_stats = {}
-                for row in cursor.fetchall():
-                    status_stats[row['status']] = {
-                        'count': row['count'],
-                        'avg_time': row['avg_time']
-                    }
-                    
-                # 獲取最佳結果
-                cursor.execute('''
-                    SELECT strategy_id, sharpe_ratio, annual_return
-                    FROM hyperparameter_tuning_results 
-                    WHERE session_id = ? 
-                    ORDER BY sharpe_ratio DESC 
-                    LIMIT 5
-                ''', (session_id,))
-                
-                top_results = [dict(row) for row in cursor.fetchall()]
+                status_stats = _loads(session_row['status_breakdown'])
+                top_results = _loads(session_row['top_results'])
                 
                 return {
                     'session_id': session_id,
@@ -444,15 +718,14 @@ class DatabaseManager:
             是否成功
         """
         try:
+            self.flush_logs()
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                # 一開始就取得寫鎖，所有刪除在同一事務內完成、一次提交
+                cursor.execute('BEGIN IMMEDIATE')
                 
                 if failed_only:
-                    # 只清理失敗的策略
-                    cursor.execute('''
-                        DELETE FROM strategy_queue 
-                        WHERE session_id = ? AND status = 'failed'
-                    ''', (session_id,))
+                    # 只清理失敗的策略 (先刪日誌，否則子查詢已找不到失敗記錄)
                     cursor.execute('''
                         DELETE FROM execution_log 
                         WHERE session_id = ? AND strategy_id IN (
@@ -460,9 +733,14 @@ class DatabaseManager:
                             WHERE session_id = ? AND status = 'failed'
                         )
                     ''', (session_id, session_id))
+                    cursor.execute('''
+                        DELETE FROM strategy_queue 
+                        WHERE session_id = ? AND status = 'failed'
+                    ''', (session_id,))
                 else:
                     # 清理整個會話
                     cursor.execute('DELETE FROM hyperparameter_tuning_results WHERE session_id = ?', (session_id,))
+                    cursor.execute('DELETE FROM hyperparameter_tuning_raw WHERE session_id = ?', (session_id,))
                     cursor.execute('DELETE FROM strategy_queue WHERE session_id = ?', (session_id,))
                     cursor.execute('DELETE FROM execution_log WHERE session_id = ?', (session_id,))
                     cursor.execute('DELETE FROM tuning_sessions WHERE session_id = ?', (session_id,))
@@ -477,13 +755,16 @@ class DatabaseManager:
     def clean_all_data(self, failed_only: bool = False) -> bool:
         """清理所有數據"""
         try:
+            self.flush_logs()
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                cursor.execute('BEGIN IMMEDIATE')
                 
                 if failed_only:
                     cursor.execute("DELETE FROM strategy_queue WHERE status = 'failed'")
                 else:
                     cursor.execute('DELETE FROM hyperparameter_tuning_results')
+                    cursor.execute('DELETE FROM hyperparameter_tuning_raw')
                     cursor.execute('DELETE FROM strategy_queue')
                     cursor.execute('DELETE FROM execution_log')
                     cursor.execute('DELETE FROM tuning_sessions')
@@ -497,17 +778,15 @@ class DatabaseManager:
             
     def log_execution(self, session_id: str, level: str, message: str, 
                      strategy_id: str = None, details: Dict[str, Any] = None):
-        """記錄執行日誌"""
+        """記錄執行日誌 (放入隊列由後台線程批量寫入；隊列滿時直接同步寫入)"""
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO execution_log 
-                    (session_id, strategy_id, log_level, message, details)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (session_id, strategy_id, level, message, 
-                     json.dumps(details) if details else None))
-                conn.commit()
+            row = (session_id, strategy_id, level, message,
+                   _dumps(details) if details else None)
+            self._ensure_log_writer()
+            try:
+                self._log_queue.put_nowait(row)
+            except queue.Full:
+                self._write_log_rows([row])
                 
         except Exception as e:
             self.logger.error(f"記錄執行日誌失敗: {e}") 
\ No newline at end of file
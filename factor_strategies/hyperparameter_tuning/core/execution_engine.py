@@ -4,16 +4,29 @@
 """
 
 import logging
-import subprocess
+import importlib.util
 import json
 import time
+import hashlib
 import os
-import tempfile
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from typing import Dict, Any, List, Optional, Callable
 from pathlib import Path
-from dataclasses import dataclass
+from types import MappingProxyType
+from dataclasses import dataclass, replace
+
+import multiprocessing
+import numpy as np
+
+# threadpoolctl 為可選依賴，用於在工作進程中限制 BLAS/OpenMP 線程數
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
 
 from .database_manager import DatabaseManager
 from .progress_manager import ProgressManager
@@ -22,7 +35,184 @@ from .progress_manager import ProgressManager
 import sys
 sys.path.append(str(Path(__file__).parent.parent.parent.parent))
 from factor_strategies.factor_engine import FactorEngine
-from factor_strategies.factor_strategy_config import FACTOR_STRATEGIES
+from factor_strategies.factor_strategy_config import equal_weights
+from factor_strategies.run_factor_strategies import generate_date_range
+from backtest_v5 import run_backtest
+
+# 因子代碼 -> FactorEngine 因子定義 (模塊級只讀常量，構建動態策略時不再逐次重建)
+_FACTOR_MAPPING = MappingProxyType({
+    'SR': {
+        'name': 'F_sharpe',
+        'function': 'calculate_sharpe_ratio',
+        'input_col': 'roi_1d',
+        'params': {'annualizing_factor': 365}
+    },
+    'DD': {
+        'name': 'F_drawdown', 
+        'function': 'calculate_max_drawdown',
+        'input_col': 'roi_1d',
+        'params': {}
+    },
+    'TR': {
+        'name': 'F_trend',
+        'function': 'calculate_trend_slope',
+        'input_col': 'roi_1d',
+        'params': {}
+    },
+    'ST': {
+        'name': 'F_stability',
+        'function': 'calculate_inv_std_dev',
+        'input_col': 'roi_1d',
+        'params': {'epsilon': 1e-9}
+    },
+    'WR': {
+        'name': 'F_winrate',
+        'function': 'calculate_win_rate',
+        'input_col': 'roi_1d',
+        'params': {}
+    },
+    'SO': {
+        'name': 'F_sortino',
+        'function': 'calculate_sortino_ratio',
+        'input_col': 'roi_1d', 
+        'params': {'annualizing_factor': 365}
+    }
+})
+
+# 執行結果批量寫庫：累積到此數量或距上次寫入超過此秒數時寫入一次
+_RESULT_FLUSH_SIZE = 64
+_RESULT_FLUSH_SECONDS = 2.0
+
+# 回測配置中與策略和配置文件都無關的固定參數
+_FIXED_BACKTEST_PARAMS = {
+    'exit_size': 1.0,
+    'max_positions': 4,
+    'entry_top_n': 4,
+    'exit_threshold': 10,
+    'position_mode': 'percentage_based'
+}
+
+
+@lru_cache(maxsize=4096)
+def _strategy_name(factors: tuple, window_size, rebalance_frequency, data_period,
+                   selection_count, weight_method) -> str:
+    """由策略參數生成策略名稱"""
+    return (f"{'_'.join(factors)}_W{window_size}_{rebalance_frequency}D_D{data_period}"
+            f"_S{selection_count}_{weight_method}")
+
+
+@lru_cache(maxsize=1024)
+def _factor_block(factors: tuple, window_size) -> tuple:
+    """構建 (factors配置, ranking_logic)，相同因子組合與窗口的策略共享 (只讀)"""
+    factors_config = {}
+    for factor_code in factors:
+        if factor_code in _FACTOR_MAPPING:
+            factor_info = _FACTOR_MAPPING[factor_code]
+            factors_config[factor_info['name']] = {
+                'function': factor_info['function'],
+                'window': window_size,
+                'input_col': factor_info['input_col'],
+                'params': dict(factor_info['params'])
+            }
+    ranking_logic = {
+        'indicators': list(factors_config.keys()),
+        'weights': equal_weights(len(factors_config))  # 均等權重
+    }
+    return factors_config, ranking_logic
+
+
+@lru_cache(maxsize=4096)
+def _dynamic_strategy(factors: tuple, window_size, data_period, strategy_name: str) -> Dict[str, Any]:
+    """構建 FactorEngine 策略定義 (缓存；返回的字典只讀，同一定義可命中引擎的執行計劃缓存)"""
+    factors_config, ranking_logic = _factor_block(factors, window_size)
+    return {
+        'name': f"Dynamic Strategy {strategy_name}",
+        'description': f"動態生成的策略：{list(factors)}",
+        'data_requirements': {
+            'min_data_days': data_period,
+            'skip_first_n_days': 3,
+        },
+        'factors': factors_config,
+        'ranking_logic': ranking_logic
+    }
+
+# 進程池工作進程內的執行引擎 (由 _init_worker 在每個工作進程中設置一次)
+_WORKER_ENGINE = None
+
+
+# 工作進程內原生數值庫的線程數限制 (並行由進程池提供，避免每個進程再開多個 BLAS 線程搶佔核心)
+_NATIVE_THREAD_ENV = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+
+
+def _limit_worker_threads(cpu_sets: Optional[List[List[int]]]):
+    """限制工作進程的原生線程數，並按需將其綁定到一組CPU核心"""
+    for name in _NATIVE_THREAD_ENV:
+        os.environ[name] = '1'  # 對之後啟動的子進程生效
+    if threadpool_limits is not None:
+        threadpool_limits(1)    # 對已載入的 BLAS/OpenMP 生效
+        
+    if cpu_sets and hasattr(os, 'sched_setaffinity'):
+        # 進程池按創建順序給工作進程編號 (1, 2, ...)，依次輪流使用各組核心
+        identity = multiprocessing.current_process()._identity
+        index = (identity[0] - 1) if identity else os.getpid()
+        try:
+            os.sched_setaffinity(0, cpu_sets[index % len(cpu_sets)])
+        except OSError:
+            pass
+
+
+def _init_worker(engine: 'BatchExecutionEngine', cpu_sets: Optional[List[List[int]]] = None):
+    """進程池初始化：每個工作進程只接收一次執行引擎，並在接收任務前創建和預熱因子引擎"""
+    global _WORKER_ENGINE
+    _limit_worker_threads(cpu_sets)
+    # 回測在工作進程內直接執行，丟棄其逐日打印 (原先由子進程輸出捕獲吸收)；日誌不受影響
+    sys.stdout = open(os.devnull, 'w')
+    engine._factor_engines = threading.local()
+    engine._get_factor_engine()
+    _WORKER_ENGINE = engine
+
+
+def _execute_in_worker(strategy: Dict[str, Any], timeout_seconds: int) -> 'ExecutionResult':
+    """進程池任務入口 (模塊級函數以便序列化)"""
+    return _WORKER_ENGINE._execute_single_strategy(strategy, timeout_seconds, mark_running=False)
+
+
+class _ThreadQuietStdout:
+    """
+    按線程靜默的 stdout 代理
+    
+    contextlib.redirect_stdout 替換的是全進程的 sys.stdout，多個回測線程交錯進出時
+    可能把 stdout 永久留在 devnull；此代理只丟棄被標記線程的輸出，其他線程照常打印。
+    """
+    
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+        
+    def write(self, text):
+        if getattr(self._local, 'quiet', False):
+            return len(text)
+        return self._stream.write(text)
+        
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+_QUIET_STDOUT_LOCK = threading.Lock()
+
+
+@contextmanager
+def _quiet_stdout():
+    """靜默當前線程的 stdout (線程池模式下同進程回測的逐日打印不輸出到控制台)"""
+    with _QUIET_STDOUT_LOCK:
+        if not isinstance(sys.stdout, _ThreadQuietStdout):
+            sys.stdout = _ThreadQuietStdout(sys.stdout)
+        proxy = sys.stdout
+    proxy._local.quiet = True
+    try:
+        yield
+    finally:
+        proxy._local.quiet = False
 
 @dataclass
 class ExecutionResult:
@@ -55,7 +245,7 @@ class BatchExecutionEngine:
         # 執行配置
         self.project_root = Path(__file__).parent.parent.parent.parent
         self.factor_engine_path = self.project_root / "factor_strategies" / "run_factor_strategies.py"
-        self.backtest_script_path = self.project_root / "backtest_v5.py"
+        self.backtest_script_path = self.project_root / "backtest_v5.py"  # 回測模塊 (同進程導入)
         
         # 執行狀態
         self._is_running = False
@@ -63,8 +253,20 @@ class BatchExecutionEngine:
         self._current_session_id = None
         
         # 性能監控
-        self._execution_times = []
         self._max_history = 100
+        self._execution_times = deque(maxlen=self._max_history)  # 超出上限時自動丟棄最舊記錄
+        
+        # 當前批次的完成/失敗計數 (由進度心跳線程讀取)
+        self._completed_count = 0
+        self._failed_count = 0
+        
+        # 待寫入數據庫的結束狀態與回測結果 (批量寫入，見 _flush_results)
+        self._pending_finished = []
+        self._pending_results = []
+        self._last_flush = time.monotonic()
+        
+        # 因子引擎在同一線程/進程內的策略之間復用 (共享數據與因子分數缓存)
+        self._factor_engines = threading.local()
         
     def execute_batch(self, session_id: str, parallel_count: int = 4, 
                      resume: bool = False, timeout_minutes: int = 30) -> bool:
@@ -134,28 +336,98 @@ class BatchExecutionEngine:
             self._is_running = False
             self._current_session_id = None
             
+    def _use_processes(self) -> bool:
+        """是否使用進程池 (配置 execution.use_processes，默認開啟)"""
+        if self.config_manager is None:
+            return True
+        return self.config_manager.config_data.get('execution', {}).get('use_processes', True)
+        
+    def _worker_cpu_sets(self, parallel_count: int) -> Optional[List[List[int]]]:
+        """
+        將可用CPU核心分為 parallel_count 組供工作進程綁定
+        (配置 execution.pin_worker_cpus，默認關閉；僅 Linux 支持)
+        """
+        if self.config_manager is None:
+            return None
+        if not self.config_manager.config_data.get('execution', {}).get('pin_worker_cpus', False):
+            return None
+        if not hasattr(os, 'sched_getaffinity'):
+            return None
+        cores = sorted(os.sched_getaffinity(0))
+        group_count = min(parallel_count, len(cores))
+        return [cores[i::group_count] for i in range(group_count)]
+        
+    def _max_tasks_per_child(self) -> int:
+        """工作進程回收前執行的策略數 (配置 execution.max_tasks_per_child，默認0即不回收)"""
+        if self.config_manager is None:
+            return 0
+        return self.config_manager.config_data.get('execution', {}).get('max_tasks_per_child', 0) or 0
+        
     def _execute_strategies_parallel(self, session_id: str, strategies: List[Dict[str, Any]], 
                                    parallel_count: int, timeout_minutes: int) -> bool:
         """並行執行策略"""
         try:
-            completed_count = 0
-            failed_count = 0
+            self._completed_count = 0
+            self._failed_count = 0
+            
+            # 進度由後台心跳線程定時匯報，結果收集循環中不再計時和格式化日誌
+            stop_heartbeat = threading.Event()
+            heartbeat = threading.Thread(
+                target=self._progress_heartbeat,
+                args=(stop_heartbeat, len(strategies), time.monotonic()),
+                name='execution-progress',
+                daemon=True
+            )
+            heartbeat.start()
+            
+            # 因子計算為純Python CPU密集運算，默認使用進程池繞過GIL；
+            # 執行引擎在每個工作進程初始化時傳遞一次，狀態更新只在主進程進行
+            use_processes = self._use_processes()
+            if use_processes:
+                pool_kwargs = {}
+                max_tasks = self._max_tasks_per_child()
+                if max_tasks and sys.version_info >= (3, 11):
+                    # 定期重啟工作進程以限制長批次的內存增長 (ProcessPoolExecutor 此時使用 spawn 啟動)
+                    pool_kwargs['max_tasks_per_child'] = max_tasks
+                pool = ProcessPoolExecutor(max_workers=parallel_count, initializer=_init_worker,
+                                           initargs=(self, self._worker_cpu_sets(parallel_count)),
+                                           **pool_kwargs)
+                task_fn = _execute_in_worker
+            else:
+                pool = ThreadPoolExecutor(max_workers=parallel_count)
+                task_fn = self._execute_single_strategy
             
-            # 使用線程池執行
-            with ThreadPoolExecutor(max_workers=parallel_count) as executor:
-                # 提交所有任務
+            with pool as executor:
+                # 提交所有任務 (配置相同的策略只執行一次，其餘在完成時複用結果)；
+                # 池中空閒的工作進程從共享隊列取下一個任務，按預估耗時從大到小提交，
+                # 避免批次末尾只剩少數慢策略在跑、其他工作進程空閒
                 future_to_strategy = {}
-                for strategy in strategies:
+                primary_by_key = {}
+                duplicates = {}
+                for strategy in sorted(strategies, key=self._estimated_cost, reverse=True):
                     if self._should_stop:
                         break
+                    
+                    config_key = self._strategy_config_key(strategy)
+                    primary = primary_by_key.get(config_key)
+                    if primary is not None:
+                        duplicates.setdefault(primary['id'], []).append(strategy)
+                        continue
+                    primary_by_key[config_key] = strategy
+                    
+                    if use_processes:
+                        self.progress_manager.update_strategy_status(strategy['id'], 'running')
                         
                     future = executor.submit(
-                        self._execute_single_strategy,
+                        task_fn,
                         strategy,
                         timeout_minutes * 60  # 轉換為秒
                     )
                     future_to_strategy[future] = strategy
                     
+                if duplicates:
+                    self.logger.info(f"跳過重複配置的策略: {sum(map(len, duplicates.values()))} 個 (完成時複用結果)")
+                    
                 # 等待任務完成
                 for future in as_completed(future_to_strategy):
                     if self._should_stop:
@@ -166,135 +438,169 @@ class BatchExecutionEngine:
                     
                     try:
                         result = future.result()
+                        self._handle_result(session_id, queue_id, result)
                         
-                        if result.success:
-                            # 更新策略狀態為完成
-                            self.progress_manager.update_strategy_status(
-                                queue_id=queue_id,
-                                status='completed',
-                                execution_time=result.execution_time
-                            )
-                            
-                            # 保存回測結果
-                            if result.result:
-                                self.db_manager.save_backtest_result(
-                                    session_id=session_id,
-                                    strategy_id=result.strategy_id,
-                                    result=result.result
-                                )
-                                
-                            completed_count += 1
-                            self.logger.info(f"策略執行成功: {result.strategy_id} ({result.execution_time:.1f}s)")
-                            
-                        else:
-                            # 更新策略狀態為失敗
-                            self.progress_manager.update_strategy_status(
-                                queue_id=queue_id,
-                                status='failed',
-                                execution_time=result.execution_time,
-                                error_message=result.error_message
-                            )
-                            
-                            failed_count += 1
-                            self.logger.error(f"策略執行失敗: {result.strategy_id} - {result.error_message}")
-                            
                         # 記錄執行時間用於性能分析
                         self._record_execution_time(result.execution_time)
                         
-                        # 每10個策略記錄一次進度
-                        if (completed_count + failed_count) % 10 == 0:
-                            self.logger.info(f"執行進度: 完成 {completed_count}, 失敗 {failed_count}")
+                        for duplicate in duplicates.get(queue_id, ()):
+                            self._handle_result(session_id, duplicate['id'], replace(
+                                result, strategy_id=duplicate['strategy_id'], execution_time=0.0
+                            ))
                             
                     except Exception as e:
                         # 處理異常
-                        self.progress_manager.update_strategy_status(
-                            queue_id=queue_id,
-                            status='failed',
-                            error_message=f"執行異常: {str(e)}"
-                        )
-                        failed_count += 1
-                        self.logger.error(f"策略執行異常: {strategy['strategy_id']} - {e}")
+                        for failed in (strategy, *duplicates.get(queue_id, ())):
+                            self._pending_finished.append((failed['id'], 'failed', None, f"執行異常: {str(e)}"))
+                            self._failed_count += 1
+                            self.logger.error(f"策略執行異常: {failed['strategy_id']} - {e}")
+                            
+                    self._maybe_flush_results(session_id)
                         
-            self.logger.info(f"並行執行完成 - 成功: {completed_count}, 失敗: {failed_count}")
+            self._flush_results(session_id)
+            self.logger.info(f"並行執行完成 - 成功: {self._completed_count}, 失敗: {self._failed_count}")
             return not self._should_stop
             
         except Exception as e:
             self.logger.error(f"並行執行異常: {e}")
             return False
-            
-    def _execute_single_strategy(self, strategy: Dict[str, Any], timeout_seconds: int) -> ExecutionResult:
+        finally:
+            # 中途退出時也寫入已收集的結果
+            try:
+                self._flush_results(session_id)
+            except Exception as e:
+                self.logger.error(f"寫入執行結果失敗: {e}")
+            # 結果已全部寫入，仍為 running 的策略未執行完 (停止或異常退出)，恢復為 pending 以便續跑
+            try:
+                self.progress_manager.reset_running_strategies(session_id)
+            except Exception as e:
+                self.logger.error(f"恢復未完成策略失敗: {e}")
+            stop_heartbeat.set()
+            
+    @staticmethod
+    def _estimated_cost(strategy: Dict[str, Any]) -> int:
+        """策略的相對耗時估計：因子計算量約與 因子數 × 窗口長度 成正比"""
+        strategy_config = strategy['strategy_config']
+        return len(strategy_config.get('factors', ())) * (strategy_config.get('window_size') or 1)
+        
+    @staticmethod
+    def _strategy_config_key(strategy: Dict[str, Any]) -> bytes:
+        """策略配置的內容哈希 (不含 strategy_id)，相同則回測結果相同"""
+        strategy_config = strategy['strategy_config']
+        payload = json.dumps(
+            {key: value for key, value in strategy_config.items() if key != 'strategy_id'},
+            sort_keys=True, default=str
+        )
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).digest()
+        
+    def _handle_result(self, session_id: str, queue_id: int, result: ExecutionResult):
+        """根據執行結果記錄策略狀態和回測結果 (先緩存，由 _flush_results 批量寫入)"""
+        if result.success:
+            # 策略狀態為完成，並保存回測結果
+            self._pending_finished.append((queue_id, 'completed', result.execution_time, None))
+            if result.result:
+                self._pending_results.append((result.strategy_id, result.result))
+                
+            self._completed_count += 1
+            self.logger.info(f"策略執行成功: {result.strategy_id} ({result.execution_time:.1f}s)")
+            
+        else:
+            # 策略狀態為失敗
+            self._pending_finished.append((queue_id, 'failed', result.execution_time, result.error_message))
+            
+            self._failed_count += 1
+            self.logger.error(f"策略執行失敗: {result.strategy_id} - {result.error_message}")
+            
+    def _maybe_flush_results(self, session_id: str):
+        """緩存的結果達到批量大小或距上次寫入過久時寫入數據庫"""
+        if (len(self._pending_finished) >= _RESULT_FLUSH_SIZE
+                or time.monotonic() - self._last_flush >= _RESULT_FLUSH_SECONDS):
+            self._flush_results(session_id)
+            
+    def _flush_results(self, session_id: str):
+        """在一個事務內寫入緩存的策略結束狀態和回測結果"""
+        self._last_flush = time.monotonic()
+        if not self._pending_finished and not self._pending_results:
+            return
+        finished, self._pending_finished = self._pending_finished, []
+        results, self._pending_results = self._pending_results, []
+        self.progress_manager.record_execution_batch(session_id, finished, results)
+            
+    def _progress_interval(self) -> float:
+        """進度匯報間隔秒數 (配置 execution.progress_interval_seconds，默認30秒)"""
+        if self.config_manager is None:
+            return 30
+        return self.config_manager.config_data.get('execution', {}).get('progress_interval_seconds', 30)
+        
+    def _progress_heartbeat(self, stop_event: threading.Event, total: int, start_time: float):
+        """後台心跳：按固定間隔讀取完成/失敗計數並記錄進度"""
+        interval = self._progress_interval()
+        while not stop_event.wait(interval):
+            if not self.logger.isEnabledFor(logging.INFO):
+                continue
+            done_count = self._completed_count + self._failed_count
+            elapsed = time.monotonic() - start_time
+            self.logger.info(f"執行進度: {done_count}/{total} (完成 {self._completed_count}, 失敗 {self._failed_count}), "
+                             f"耗時 {elapsed:.1f}s ({done_count / elapsed:.2f} 個/秒)")
+            
+    def _execute_single_strategy(self, strategy: Dict[str, Any], timeout_seconds: int,
+                                 mark_running: bool = True) -> ExecutionResult:
         """
         執行單個策略的真實回測
         
         Args:
             strategy: 策略信息
             timeout_seconds: 超時時間（秒）
+            mark_running: 是否在此更新策略狀態為運行中 (進程池模式下由主進程更新)
             
         Returns:
             執行結果
         """
         strategy_id = strategy['strategy_id']
+        # strategy_config 已在讀取待執行策略時解析為字典
         strategy_config = strategy['strategy_config']
         
-        # 如果是字符串，需要解析為字典
-        if isinstance(strategy_config, str):
-            strategy_config = json.loads(strategy_config)
-        
         start_time = time.time()
         
         try:
             self.logger.debug(f"開始執行策略: {strategy_id}")
             
             # 更新策略狀態為運行中
-            self.progress_manager.update_strategy_status(strategy['id'], 'running')
+            if mark_running:
+                self.progress_manager.update_strategy_status(strategy['id'], 'running')
             
             # 補充完整的回測配置
             complete_config = self._build_complete_config(strategy_config)
             
-            # 創建臨時配置文件
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-                json.dump(complete_config, f, indent=2)
-                config_file = f.name
-                
-            try:
-                # 步驟1: 先生成策略排行榜數據
-                factor_result = self._run_factor_strategies(complete_config, timeout_seconds // 2)
-                if not factor_result['success']:
-                    return ExecutionResult(
-                        success=False,
-                        strategy_id=strategy_id,
-                        execution_time=time.time() - start_time,
-                        error_message=f"策略排行榜生成失敗: {factor_result['error']}"
-                    )
-                
-                # 步驟2: 執行真實回測腳本 (BR-002: 真實回測執行)
-                result = self._run_backtest_script(strategy_id, config_file, timeout_seconds // 2)
-                
-                execution_time = time.time() - start_time
-                
-                if result['success']:
-                    return ExecutionResult(
-                        success=True,
-                        strategy_id=strategy_id,
-                        execution_time=execution_time,
-                        result=result['data'],
-                        stdout=result.get('stdout')
-                    )
-                else:
-                    return ExecutionResult(
-                        success=False,
-                        strategy_id=strategy_id,
-                        execution_time=execution_time,
-                        error_message=result.get('error', 'Unknown error'),
-                        stderr=result.get('stderr')
-                    )
-                    
-            finally:
-                # 清理臨時文件
-                try:
-                    os.unlink(config_file)
-                except:
-                    pass
+            # 步驟1: 先生成策略排行榜數據
+            factor_result = self._run_factor_strategies(complete_config, timeout_seconds // 2)
+            if not factor_result['success']:
+                return ExecutionResult(
+                    success=False,
+                    strategy_id=strategy_id,
+                    execution_time=time.time() - start_time,
+                    error_message=f"策略排行榜生成失敗: {factor_result['error']}"
+                )
+            
+            # 步驟2: 執行真實回測 (BR-002: 真實回測執行)
+            result = self._run_backtest(strategy_id, complete_config)
+            
+            execution_time = time.time() - start_time
+            
+            if result['success']:
+                return ExecutionResult(
+                    success=True,
+                    strategy_id=strategy_id,
+                    execution_time=execution_time,
+                    result=result['data']
+                )
+            else:
+                return ExecutionResult(
+                    success=False,
+                    strategy_id=strategy_id,
+                    execution_time=execution_time,
+                    error_message=result.get('error', 'Unknown error')
+                )
                     
         except Exception as e:
             execution_time = time.time() - start_time
@@ -305,123 +611,36 @@ class BatchExecutionEngine:
                 error_message=str(e)
             )
             
-    def _run_backtest_script(self, strategy_id: str, config_file: str, 
-                           timeout_seconds: int) -> Dict[str, Any]:
+    def _run_backtest(self, strategy_id: str, complete_config: Dict[str, Any]) -> Dict[str, Any]:
         """
-        運行回測腳本
+        在當前進程內運行回測 (直接調用 backtest_v5.run_backtest，不再啟動子進程)
         
         Args:
             strategy_id: 策略ID
-            config_file: 配置文件路徑
-            timeout_seconds: 超時時間
+            complete_config: 完整的回測配置
             
         Returns:
             執行結果
         """
         try:
-            # 構建命令
-            cmd = [
-                'python', str(self.backtest_script_path),
-                '--config', config_file,
-                '--strategy_id', strategy_id,
-                '--output_format', 'json',
-                '--quiet'  # 減少輸出
-            ]
-            
-            self.logger.debug(f"執行命令: {' '.join(cmd)}")
-            
-            # 執行命令
-            process = subprocess.run(
-                cmd,
-                cwd=str(self.project_root),
-                capture_output=True,
-                text=True,
-                timeout=timeout_seconds
-            )
-            
-            if process.returncode == 0:
-                # 解析輸出結果 - 從混合輸出中提取JSON
-                try:
-                    # 嘗試從stdout末尾提取JSON
-                    stdout_lines = process.stdout.strip().split('\n')
-                    
-                    # 查找最後一個看起來像JSON的部分
-                    json_data = None
-                    for i in range(len(stdout_lines) - 1, -1, -1):
-                        line = stdout_lines[i].strip()
-                        if line.startswith('{') and line.endswith('}'):
-                            try:
-                                json_data = json.loads(line)
-                                break
-                            except json.JSONDecodeError:
-                                continue
-                    
-                    # 如果沒找到單行JSON，嘗試多行JSON
-                    if json_data is None:
-                        # 從最後開始向前查找JSON開始標記
-                        json_start = -1
-                        brace_count = 0
-                        for i in range(len(stdout_lines) - 1, -1, -1):
-                            line = stdout_lines[i].strip()
-                            if '}' in line:
-                                brace_count += line.count('}')
-                            if '{' in line:
-                                brace_count -= line.count('{')
-                                if brace_count == 0:
-                                    json_start = i
-                                    break
-                        
-                        if json_start >= 0:
-                            json_text = '\n'.join(stdout_lines[json_start:])
-                            json_data = json.loads(json_text)
-                    
-                    if json_data:
-                        return {
-                            'success': True,
-                            'data': json_data,
-                            'stdout': process.stdout
-                        }
-                    else:
-                        return {
-                            'success': False,
-                            'error': 'No valid JSON found in output',
-                            'stdout': process.stdout,
-                            'stderr': process.stderr
-                        }
-                        
-                except json.JSONDecodeError as e:
-                    return {
-                        'success': False,
-                        'error': f'JSON解析失敗: {e}',
-                        'stdout': process.stdout,
-                        'stderr': process.stderr
-                    }
-                except Exception as e:
-                    return {
-                        'success': False,
-                        'error': f'輸出解析異常: {e}',
-                        'stdout': process.stdout,
-                        'stderr': process.stderr
-                    }
-            else:
-                return {
-                    'success': False,
-                    'error': f'回測腳本執行失敗 (返回碼: {process.returncode})',
-                    'stdout': process.stdout,
-                    'stderr': process.stderr
-                }
-                
-        except subprocess.TimeoutExpired:
-            return {
-                'success': False,
-                'error': f'執行超時 ({timeout_seconds}秒)'
-            }
+            with _quiet_stdout():
+                data = run_backtest(complete_config, strategy_id, quiet=True)
         except Exception as e:
             return {
                 'success': False,
                 'error': f'執行異常: {str(e)}'
             }
             
+        if data.get('success'):
+            return {
+                'success': True,
+                'data': data
+            }
+        return {
+            'success': False,
+            'error': f"回測執行失敗: {data.get('error', 'Unknown error')}"
+        }
+            
     def _build_complete_config(self, strategy_config: Dict[str, Any]) -> Dict[str, Any]:
         """
         構建完整的回測配置，添加必要的回測參數
@@ -433,27 +652,26 @@ class BatchExecutionEngine:
             完整的配置
         """
         # 根據factors生成strategy_name
-        factors_str = '_'.join(strategy_config['factors'])
-        strategy_name = f"{factors_str}_W{strategy_config['window_size']}_{strategy_config['rebalance_frequency']}D_D{strategy_config['data_period']}_S{strategy_config['selection_count']}_{strategy_config['weight_method']}"
+        strategy_name = _strategy_name(
+            tuple(strategy_config['factors']), strategy_config['window_size'],
+            strategy_config['rebalance_frequency'], strategy_config['data_period'],
+            strategy_config['selection_count'], strategy_config['weight_method']
+        )
         
         # 從配置文件讀取回測參數
         backtest_config = self.config_manager.config_data.get('system', {}).get('backtest', {})
         
         # 創建完整配置
-        complete_config = strategy_config.copy()
-        complete_config.update({
+        complete_config = {
+            **strategy_config,
             'strategy_name': strategy_name,
             'start_date': backtest_config.get('start_date', '2024-11-01'),
             'end_date': backtest_config.get('end_date', '2024-12-05'),
             'initial_capital': backtest_config.get('initial_capital', 10000),
             'position_size': backtest_config.get('position_size', 0.25),
             'fee_rate': backtest_config.get('fee_rate', 0.001),
-            'exit_size': 1.0,
-            'max_positions': 4,
-            'entry_top_n': 4,
-            'exit_threshold': 10,
-            'position_mode': 'percentage_based'
-        })
+            **_FIXED_BACKTEST_PARAMS
+        }
         
         return complete_config
         
@@ -467,74 +685,8 @@ class BatchExecutionEngine:
         Returns:
             完整的策略配置
         """
-        # 因子名稱映射表
-        factor_mapping = {
-            'SR': {
-                'name': 'F_sharpe',
-                'function': 'calculate_sharpe_ratio',
-                'input_col': 'roi_1d',
-                'params': {'annualizing_factor': 365}
-            },
-            'DD': {
-                'name': 'F_drawdown', 
-                'function': 'calculate_max_drawdown',
-                'input_col': 'roi_1d',
-                'params': {}
-            },
-            'TR': {
-                'name': 'F_trend',
-                'function': 'calculate_trend_slope',
-                'input_col': 'roi_1d',
-                'params': {}
-            },
-            'ST': {
-                'name': 'F_stability',
-                'function': 'calculate_inv_std_dev',
-                'input_col': 'roi_1d',
-                'params': {'epsilon': 1e-9}
-            },
-            'WR': {
-                'name': 'F_winrate',
-                'function': 'calculate_win_rate',
-                'input_col': 'roi_1d',
-                'params': {}
-            },
-            'SO': {
-                'name': 'F_sortino',
-                'function': 'calculate_sortino_ratio',
-                'input_col': 'roi_1d', 
-                'params': {'annualizing_factor': 365}
-            }
-        }
-        
-        # 構建factors配置
-        factors_config = {}
-        for factor_code in config['factors']:
-            if factor_code in factor_mapping:
-                factor_info = factor_mapping[factor_code]
-                factors_config[factor_info['name']] = {
-                    'function': factor_info['function'],
-                    'window': config['window_size'],
-                    'input_col': factor_info['input_col'],
-                    'params': factor_info['params']
-                }
-        
-        # 構建完整策略配置
-        strategy_config = {
-            'name': f"Dynamic Strategy {config['strategy_name']}",
-            'description': f"動態生成的策略：{config['factors']}",
-            'data_requirements': {
-                'min_data_days': config['data_period'],
-                'skip_first_n_days': 3,
-            },
-            'factors': factors_config,
-            'ranking_logic': {
-                'indicators': list(factors_config.keys()),
-                'weights': [1.0 / len(factors_config)] * len(factors_config)  # 均等權重
-            }
-        }
-        
-        return strategy_config
+        return _dynamic_strategy(tuple(config['factors']), config['window_size'],
+                                 config['data_period'], config['strategy_name'])
 
     def _run_factor_strategies(self, config: Dict[str, Any], timeout_seconds: int) -> Dict[str, Any]:
         """
@@ -554,14 +706,12 @@ class BatchExecutionEngine:
             # 創建動態策略配置
             dynamic_strategy_config = self._create_dynamic_strategy(config)
             
-            # 動態添加到FACTOR_STRATEGIES字典
-            FACTOR_STRATEGIES[strategy_name] = dynamic_strategy_config
-            
-            self.logger.debug(f"動態添加策略: {strategy_name}")
+            # 策略定義直接傳給FactorEngine，不寫入全局FACTOR_STRATEGIES (並行執行時無共享狀態)
+            self.logger.debug(f"動態構建策略: {strategy_name}")
             self.logger.debug(f"策略配置: {dynamic_strategy_config}")
             
-            # 創建FactorEngine實例
-            engine = FactorEngine()
+            # 復用FactorEngine實例
+            engine = self._get_factor_engine()
             
             # 讀取回測配置
             backtest_config = self.config_manager.config_data.get('system', {}).get('backtest', {})
@@ -573,25 +723,19 @@ class BatchExecutionEngine:
             
             if ranking_mode == 'range':
                 # 範圍模式：生成多日數據
-                from datetime import datetime, timedelta
-                
                 start_date_str = backtest_config.get('ranking_start_date', '2024-04-03')
                 end_date_str = backtest_config.get('ranking_end_date', '2025-06-20')
                 
-                start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
-                end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
-                
-                current_date = start_date
-                date_count = (end_date - start_date).days + 1
+                # 預先生成日期字符串列表，避免逐日的日期運算與格式化
+                dates = generate_date_range(start_date_str, end_date_str)
+                date_count = len(dates)
                 
                 self.logger.info(f"範圍模式：生成 {date_count} 天的策略排名數據 ({start_date_str} 到 {end_date_str})")
                 
-                processed_days = 0
-                while current_date <= end_date:
-                    target_date_str = current_date.strftime('%Y-%m-%d')
-                    
+                for processed_days, target_date_str in enumerate(dates, 1):
                     try:
-                        result_df = engine.run_strategy(strategy_name, target_date_str, save_to_db=True)
+                        result_df = engine.run_strategy(strategy_name, target_date_str, save_to_db=True,
+                                                       strategy_def=dynamic_strategy_config)
                         
                         if not result_df.empty:
                             total_records += len(result_df)
@@ -605,9 +749,6 @@ class BatchExecutionEngine:
                         failed_dates.append(target_date_str)
                         self.logger.error(f"日期 {target_date_str} 執行失敗: {e}")
                     
-                    current_date += timedelta(days=1)
-                    processed_days += 1
-                    
                     # 進度報告（每50天報告一次）
                     if processed_days % 50 == 0:
                         self.logger.info(f"進度: {processed_days}/{date_count} 天已處理 ({processed_days/date_count*100:.1f}%)")
@@ -617,7 +758,8 @@ class BatchExecutionEngine:
             else:
                 # 單日模式：原有邏輯
                 target_date = backtest_config.get('ranking_date', '2024-12-04')
-                result_df = engine.run_strategy(strategy_name, target_date, save_to_db=True)
+                result_df = engine.run_strategy(strategy_name, target_date, save_to_db=True,
+                                               strategy_def=dynamic_strategy_config)
                 
                 if not result_df.empty:
                     total_records = len(result_df)
@@ -651,30 +793,44 @@ class BatchExecutionEngine:
                 'success': False,
                 'error': f'動態策略執行異常: {str(e)}'
             }
-        finally:
-            # 清理動態添加的策略配置（可選）
-            if strategy_name in FACTOR_STRATEGIES:
-                # 可以選擇保留或刪除
-                pass
             
+    def _get_factor_engine(self) -> FactorEngine:
+        """獲取當前線程的FactorEngine (首次使用時創建；缓存非線程安全，不跨線程共享)"""
+        engine = getattr(self._factor_engines, 'engine', None)
+        if engine is None:
+            engine = FactorEngine()
+            engine.warmup_factor_functions()
+            self._factor_engines.engine = engine
+        return engine
+        
+    def __getstate__(self):
+        # 傳遞到工作進程時不攜帶數據庫/進度管理器 (狀態更新只在主進程進行)
+        state = self.__dict__.copy()
+        state['db_manager'] = None
+        state['progress_manager'] = None
+        state['_execution_times'] = deque(maxlen=self._max_history)
+        state['_pending_finished'] = []
+        state['_pending_results'] = []
+        state['_factor_engines'] = None
+        return state
+        
     def _record_execution_time(self, execution_time: float):
         """記錄執行時間用於性能分析"""
         self._execution_times.append(execution_time)
-        if len(self._execution_times) > self._max_history:
-            self._execution_times.pop(0)
             
     def get_performance_stats(self) -> Dict[str, Any]:
         """獲取性能統計"""
         if not self._execution_times:
             return {}
             
-        times = self._execution_times
+        # 一次轉成數組，聚合在 NumPy 中完成 (歷史上限調大時同樣適用)
+        times = np.fromiter(self._execution_times, dtype=np.float64, count=len(self._execution_times))
         return {
-            'total_executions': len(times),
-            'avg_time': sum(times) / len(times),
-            'min_time': min(times),
-            'max_time': max(times),
-            'recent_avg': sum(times[-10:]) / min(10, len(times))
+            'total_executions': int(times.size),
+            'avg_time': float(times.mean()),
+            'min_time': float(times.min()),
+            'max_time': float(times.max()),
+            'recent_avg': float(times[-10:].mean())
         }
         
     def stop_execution(self):
@@ -701,26 +857,11 @@ class BatchExecutionEngine:
         if not self.factor_engine_path.exists():
             issues.append(f"因子引擎不存在: {self.factor_engine_path}")
             
-        # 檢查Python環境
-        try:
-            result = subprocess.run(['python', '--version'], 
-                                  capture_output=True, text=True, timeout=10)
-            python_version = result.stdout.strip()
-        except Exception as e:
-            issues.append(f"Python環境檢查失敗: {e}")
-            python_version = "未知"
-            
-        # 檢查必要的Python模塊
+        # 檢查Python環境與必要模塊 (回測在當前進程內執行，直接檢查當前解釋器)
         required_modules = ['pandas', 'numpy', 'sqlite3']
-        missing_modules = []
-        
-        for module in required_modules:
-            try:
-                subprocess.run(['python', '-c', f'import {module}'], 
-                             capture_output=True, timeout=5, check=True)
-            except:
-                missing_modules.append(module)
-                
+        python_version = f"Python {sys.version.split()[0]}"
+        missing_modules = [name for name in required_modules if importlib.util.find_spec(name) is None]
+            
         if missing_modules:
             issues.append(f"缺少必要模塊: {missing_modules}")
             
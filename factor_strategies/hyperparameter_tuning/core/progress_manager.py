@@ -124,10 +124,10 @@ class ProgressManager:
             limit: 限制數量
             
         Returns:
-            待執行的策略列表
+            待執行的策略列表 (strategy_config 已解析為字典)
         """
         try:
-            strategies = self.db_manager.get_pending_strategies(session_id, limit)
+            strategies = list(self.db_manager.get_pending_strategies(session_id, limit))
             self.logger.debug(f"獲取待執行策略: {len(strategies)} 個")
             return strategies
             
@@ -205,6 +205,27 @@ class ProgressManager:
             self.logger.error(f"更新策略狀態失敗: {e}")
             raise
             
+    def record_execution_batch(self, session_id: str,
+                               finished: List[Tuple[int, str, Optional[float], Optional[str]]],
+                               results: List[Tuple[str, Dict[str, Any]]]):
+        """
+        批量記錄已結束策略的狀態和回測結果
+        
+        Args:
+            session_id: 會話ID
+            finished: [(隊列記錄ID, 'completed'/'failed', 執行時間, 錯誤消息)]
+            results: [(策略ID, 回測結果)]
+        """
+        try:
+            self.db_manager.save_execution_batch(session_id, finished, results)
+            
+            # 清除統計緩存
+            self._clear_stats_cache()
+            
+        except Exception as e:
+            self.logger.error(f"批量記錄執行結果失敗: {e}")
+            raise
+            
     def get_session_info(self, session_id: str) -> Optional[SessionInfo]:
         """
         獲取會話信息
@@ -419,8 +440,8 @@ class ProgressManager:
             if session_info.status == 'failed':
                 return True, "會話失敗，可以重試失敗的策略"
                 
-            pending_strategies = self.get_pending_strategies(session_id, limit=1)
-            if not pending_strategies:
+            # 只需判斷是否存在，直接取迭代器的第一條
+            if next(self.db_manager.get_pending_strategies(session_id, limit=1), None) is None:
                 return False, "沒有待執行的策略"
                 
             return True, "會話可以續跑"
@@ -476,6 +497,38 @@ class ProgressManager:
             self.logger.error(f"重置失敗策略失敗: {e}")
             raise
             
+    def reset_running_strategies(self, session_id: str) -> int:
+        """
+        將未完成的運行中策略恢復為待執行狀態 (執行中斷後續跑可重新拾取)
+        
+        Args:
+            session_id: 會話ID
+            
+        Returns:
+            恢復的策略數量
+        """
+        try:
+            with self.db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    UPDATE strategy_queue 
+                    SET status = 'pending', 
+                        started_at = NULL
+                    WHERE session_id = ? AND status = 'running'
+                ''', (session_id,))
+                
+                reset_count = cursor.rowcount
+                conn.commit()
+                
+            if reset_count > 0:
+                self._clear_stats_cache()
+                self.logger.info(f"恢復未完成策略為待執行: {reset_count} 個")
+            return reset_count
+            
+        except Exception as e:
+            self.logger.error(f"恢復未完成策略失敗: {e}")
+            raise
+            
     def _calculate_estimated_time(self, session_id: str, status_data: Dict[str, Any]) -> Optional[float]:
         """計算預估剩餘時間"""
         try:
@@ -10,6 +10,12 @@ from dataclasses import dataclass
 
 from .database_manager import DatabaseManager
 
+# orjson 為可選依賴，未安裝時退回標準庫 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 @dataclass
 class PerformanceMetrics:
     """性能指標類"""
@@ -341,9 +347,15 @@ class ResultCollector:
             return None
             
     def _export_to_json(self, results: List[Dict[str, Any]], file_path: str):
-        """導出為JSON格式"""
+        """導出為JSON格式 (優先使用 orjson 加速序列化)"""
+        if orjson is not None:
+            option = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            with open(file_path, 'wb') as f:
+                f.write(orjson.dumps(results, option=option, default=str))
+            return
+            
         with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+            json.dump(results, f, indent=2, ensure_ascii=False, default=str)
             
     def _export_to_csv(self, results: List[Dict[str, Any]], file_path: str):
         """導出為CSV格式"""
@@ -18,6 +18,9 @@ import argparse
 import sys
 import os
 import logging
+import logging.handlers
+import atexit
+import multiprocessing
 import time
 import signal
 from pathlib import Path
@@ -35,14 +38,14 @@ from factor_strategies.hyperparameter_tuning.core import (
     ResultCollector,
     DatabaseManager
 )
-from factor_strategies.hyperparameter_tuning.config import ConfigManager
+from factor_strategies.hyperparameter_tuning.config import get_config_manager
 
 class MassTuningSystem:
     """大規模超參數調優系統主類"""
     
     def __init__(self, config_path: str = None):
         """初始化系統"""
-        self.config_manager = ConfigManager(config_path)
+        self.config_manager = get_config_manager(config_path)
         self.db_manager = DatabaseManager()
         self.progress_manager = ProgressManager(self.db_manager)
         self.param_generator = ParameterSpaceGenerator(self.config_manager)
@@ -64,13 +67,32 @@ class MassTuningSystem:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         log_file = log_dir / f"mass_tuning_{timestamp}.log"
         
+        # 文件日誌先緩衝在內存中，累積1024條或遇到ERROR時批量寫入
+        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        self._log_buffer = logging.handlers.MemoryHandler(
+            capacity=1024,
+            flushLevel=logging.ERROR,
+            target=file_handler,
+            flushOnClose=True
+        )
+        atexit.register(self._log_buffer.flush)
+        
+        # 記錄器只把日誌放入隊列，由後台 QueueListener 線程統一寫文件和終端，
+        # 執行線程不會阻塞在磁盤I/O上；使用進程隊列，進程池中的工作進程同樣適用
+        log_queue = multiprocessing.Queue(-1)
+        self._log_listener = logging.handlers.QueueListener(
+            log_queue,
+            self._log_buffer,
+            logging.StreamHandler(sys.stdout)
+        )
+        self._log_listener.start()
+        atexit.register(self._log_listener.stop)  # 先於緩衝區 flush 執行，排空隊列
+        
+        # 格式化在 QueueHandler 中完成，下游處理器直接輸出消息
         logging.basicConfig(
             level=logging.INFO,
             format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file),
-                logging.StreamHandler(sys.stdout)
-            ]
+            handlers=[logging.handlers.QueueHandler(log_queue)]
         )
         
         self.logger = logging.getLogger(__name__)
@@ -149,6 +171,9 @@ class MassTuningSystem:
         except Exception as e:
             self.logger.error(f"執行批量回測失敗: {e}")
             raise
+        finally:
+            # 批次結束後將緩衝的日誌寫入文件
+            self._log_buffer.flush()
             
     def get_status(self, session_id: str = None, detailed: bool = False) -> Dict[str, Any]:
         """查看執行狀態"""
@@ -19,10 +19,14 @@ import sqlite3
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
 import subprocess
 import argparse
 import itertools
+import queue
+import select
+import threading
 from pathlib import Path
 
 # 添加项目根目录到路径
@@ -31,6 +35,147 @@ project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 
 from database_operations import DatabaseManager
+from factor_strategies.factor_strategy_config import equal_weights, factor_name
+
+# tqdm 为可选依赖，安装后使用进度条代替逐条打印
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
+
+# orjson 为可选依赖，未安装时退回标准库 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 进程池工作进程内的系统实例和策略配置共享内存 (由 _init_worker 在每个工作进程中设置一次)
+_WORKER_SYSTEM = None
+_WORKER_CONFIG_SHM = None
+
+
+def _share_strategy_configs(pending_strategies: List[Dict[str, Any]]) -> Tuple[shared_memory.SharedMemory, List[Tuple[int, int]]]:
+    """
+    将所有待执行策略的JSON配置一次性写入共享内存
+    
+    Returns:
+        (共享内存块, 每个策略配置的 (偏移, 长度) 列表)
+    """
+    encoded = [strategy_data['strategy_config'].encode('utf-8') for strategy_data in pending_strategies]
+    buffer = b'\n'.join(encoded)
+    
+    shm = shared_memory.SharedMemory(create=True, size=max(len(buffer), 1))
+    shm.buf[:len(buffer)] = buffer
+    
+    spans = []
+    offset = 0
+    for item in encoded:
+        spans.append((offset, len(item)))
+        offset += len(item) + 1
+    
+    return shm, spans
+
+
+def _init_worker(system: 'MassHyperparameterSystem', shm_name: str = None):
+    """进程池初始化：每个工作进程只接收一次系统配置，并连接策略配置共享内存"""
+    global _WORKER_SYSTEM, _WORKER_CONFIG_SHM
+    _WORKER_SYSTEM = system
+    
+    if shm_name:
+        try:
+            # Python 3.13+：由主进程负责释放，工作进程不登记
+            _WORKER_CONFIG_SHM = shared_memory.SharedMemory(name=shm_name, track=False)
+        except TypeError:
+            _WORKER_CONFIG_SHM = shared_memory.SharedMemory(name=shm_name)
+
+
+def _execute_in_worker(config_span: Tuple[int, int], start_date: str, end_date: str) -> Dict[str, Any]:
+    """进程池任务入口 (模块级函数以便序列化)，只接收配置在共享内存中的位置"""
+    offset, length = config_span
+    strategy_config = json.loads(bytes(_WORKER_CONFIG_SHM.buf[offset:offset + length]))
+    return _WORKER_SYSTEM._execute_single_strategy(strategy_config, start_date, end_date)
+
+
+class FactorWorkerPool:
+    """
+    常驻因子策略工作进程池
+    
+    每个工作进程运行 factor_worker_loop.py，通过 stdin/stdout 按行收发JSON任务，
+    在多个策略之间复用同一个解释器和 FactorEngine。
+    """
+    
+    # 工作进程脚本 (相对项目根目录) 与附加参数
+    worker_script = ('factor_strategies', 'factor_worker_loop.py')
+    worker_args = ()
+    worker_label = 'Factor worker'
+    
+    def __init__(self, size: int, project_root: str):
+        self.project_root = project_root
+        self._workers = []
+        self._idle = queue.Queue()
+        for _ in range(max(size, 1)):
+            worker = self._spawn()
+            self._workers.append(worker)
+            self._idle.put(worker)
+    
+    def _spawn(self) -> subprocess.Popen:
+        return subprocess.Popen(
+            [sys.executable, '-u', os.path.join(self.project_root, *self.worker_script), *self.worker_args],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            cwd=self.project_root
+        )
+    
+    def run(self, task: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """取一个空闲工作进程执行任务；超时或进程异常时重启该工作进程"""
+        worker = self._idle.get()
+        try:
+            worker.stdin.write(json.dumps(task, ensure_ascii=False) + '\n')
+            worker.stdin.flush()
+            
+            ready, _, _ = select.select([worker.stdout], [], [], timeout)
+            line = worker.stdout.readline() if ready else ''
+            if not line:
+                raise TimeoutError(f"{self.worker_label} {'exited' if ready else 'timed out'}")
+            return json.loads(line)
+        except (OSError, ValueError, TimeoutError) as e:
+            worker = self._replace(worker)
+            return {'success': False, 'error': str(e)}
+        finally:
+            self._idle.put(worker)
+    
+    def _replace(self, worker: subprocess.Popen) -> subprocess.Popen:
+        worker.kill()
+        worker.wait()
+        new_worker = self._spawn()
+        self._workers[self._workers.index(worker)] = new_worker
+        return new_worker
+    
+    def close(self):
+        """关闭stdin让工作进程自行退出"""
+        for worker in self._workers:
+            try:
+                worker.stdin.close()
+                worker.wait(timeout=10)
+            except (OSError, subprocess.TimeoutExpired):
+                worker.kill()
+        self._workers = []
+
+
+class BacktestWorkerPool(FactorWorkerPool):
+    """
+    常驻回测工作进程池
+    
+    每个工作进程运行 backtest_v5.py --batch，按行收发JSON任务并复用同一个回测器，
+    避免每个策略都重新启动解释器和导入依赖。
+    """
+    
+    worker_script = ('backtest_v5.py',)
+    worker_args = ('--batch',)
+    worker_label = 'Backtest worker'
+
 
 class MassHyperparameterSystem:
     """大规模超参数调优系统"""
@@ -50,6 +195,17 @@ class MassHyperparameterSystem:
         # 时间戳
         self.session_id = datetime.now().strftime('%Y%m%d_%H%M%S')
         
+        # 回测结果每累积多少条批量写入一次
+        self.result_flush_size = 100
+        
+        # 常驻因子/回测工作进程 (首次使用时创建)
+        self._factor_workers = None
+        self._backtest_workers = None
+        self._worker_count = 1
+        
+        # 失败过多时中止剩余策略
+        self._abort = threading.Event()
+        
         # 初始化数据库
         self._init_databases()
         
@@ -298,7 +454,8 @@ class MassHyperparameterSystem:
                            start_date: str = "2024-01-01",
                            end_date: str = "2025-06-20", 
                            max_parallel: int = 4,
-                           resume: bool = True) -> Dict[str, Any]:
+                           resume: bool = True,
+                           use_processes: bool = False) -> Dict[str, Any]:
         """执行大规模调优
         
         Args:
@@ -306,11 +463,13 @@ class MassHyperparameterSystem:
             end_date: 回测结束日期  
             max_parallel: 最大并行数
             resume: 是否从上次中断处继续
+            use_processes: 使用进程池执行 (适合进程内的CPU密集计算，绕过GIL)；
+                           默认线程池，适合以子进程为主的执行方式
         """
         print(f"\n🏭 开始大规模超参数调优")
         print(f"=" * 80)
         print(f"📅 回测期间: {start_date} - {end_date}")
-        print(f"🔄 最大并行: {max_parallel}")
+        print(f"🔄 最大并行: {max_parallel} ({'进程池' if use_processes else '线程池'})")
         print(f"⏮️ 断点续跑: {resume}")
         print(f"=" * 80)
         
@@ -326,38 +485,90 @@ class MassHyperparameterSystem:
         # 批量执行
         start_time = time.time()
         
-        with ThreadPoolExecutor(max_workers=max_parallel) as executor:
-            # 提交所有任务
-            future_to_strategy = {}
-            
-            for strategy_data in pending_strategies:
-                strategy_config = json.loads(strategy_data['strategy_config'])
-                future = executor.submit(
-                    self._execute_single_strategy,
-                    strategy_config,
-                    start_date,
-                    end_date
-                )
-                future_to_strategy[future] = strategy_data
-            
-            # 处理完成的任务
-            completed = 0
-            failed = 0
-            
-            for future in as_completed(future_to_strategy):
-                strategy_data = future_to_strategy[future]
-                strategy_id = strategy_data['strategy_id']
+        abort_after_failures = self.config.get('execution', {}).get('abort_after_failures', 100)
+        self._abort.clear()
+        
+        # 线程模式下每个线程对应一个常驻因子/回测工作进程；进程模式下每个进程各自持有一个
+        self._worker_count = 1 if use_processes else max_parallel
+        
+        config_shm = None
+        if use_processes:
+            # 系统配置在每个工作进程初始化时传递一次；
+            # 策略配置一次性放入共享内存，任务只传 (偏移, 长度)
+            config_shm, task_args = _share_strategy_configs(pending_strategies)
+            pool = ProcessPoolExecutor(max_workers=max_parallel, initializer=_init_worker,
+                                       initargs=(self, config_shm.name))
+            task_fn = _execute_in_worker
+        else:
+            task_args = [json.loads(strategy_data['strategy_config']) for strategy_data in pending_strategies]
+            pool = ThreadPoolExecutor(max_workers=max_parallel)
+            task_fn = self._execute_single_strategy
+        
+        # 处理完成的任务
+        completed = 0
+        failed = 0
+        pending_rows = []  # 待批量写入的结果行
+        
+        # 有 tqdm 时由进度条限频刷新，只单独输出失败信息
+        progress = tqdm(total=len(pending_strategies), mininterval=0.5, smoothing=0.1,
+                        desc="🏭 调优进度") if tqdm is not None else None
+        
+        try:
+            with pool as executor:
+                future_to_strategy = {
+                    executor.submit(task_fn, args, start_date, end_date): strategy_data
+                    for strategy_data, args in zip(pending_strategies, task_args)
+                }
                 
-                try:
-                    result = future.result()
-                    if result['success']:
-                        completed += 1
-                        print(f"✅ [{completed+failed:,}/{len(pending_strategies):,}] {strategy_id} - "
-                              f"ROI: {result.get('total_return', 'N/A'):.2f}%")
-                    else:
+                # 按完成顺序处理，慢策略不阻塞其它结果的写入与中止判断
+                for future in as_completed(future_to_strategy):
+                    strategy_data = future_to_strategy[future]
+                    strategy_id = strategy_data['strategy_id']
+                    
+                    if future.cancelled():
+                        continue  # 中止后被取消的任务保持 pending，便于断点续跑
+                    
+                    try:
+                        result = future.result()
+                        if result.get('aborted'):
+                            continue
+                        
+                        if result['success']:
+                            completed += 1
+                            pending_rows.append(result['result_row'])
+                            if len(pending_rows) >= self.result_flush_size:
+                                self._save_backtest_results(pending_rows)
+                                pending_rows = []
+                            if progress is None:
+                                print(f"✅ [{completed+failed:,}/{len(pending_strategies):,}] {strategy_id} - "
+                                      f"ROI: {result.get('total_return', 'N/A'):.2f}%")
+                        else:
+                            failed += 1
+                            message = (f"❌ [{completed+failed:,}/{len(pending_strategies):,}] {strategy_id} - "
+                                       f"{result.get('error', 'Unknown error')}")
+                            if progress is None:
+                                print(message)
+                            else:
+                                progress.write(message)
+                    
+                    except Exception as e:
                         failed += 1
-                        print(f"❌ [{completed+failed:,}/{len(pending_strategies):,}] {strategy_id} - "
-                              f"{result.get('error', 'Unknown error')}")
+                        message = f"❌ [{completed+failed:,}/{len(pending_strategies):,}] {strategy_id} - 异常: {str(e)[:100]}"
+                        if progress is None:
+                            print(message)
+                        else:
+                            progress.write(message)
+                        self._update_strategy_status(strategy_id, 'failed', error_message=str(e))
+                    
+                    if failed > abort_after_failures and not self._abort.is_set():
+                        self._abort.set()
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        print(f"🛑 失败数超过 {abort_after_failures}，中止剩余策略 (可断点续跑)")
+                    
+                    if progress is not None:
+                        progress.update(1)
+                        progress.set_postfix(完成=completed, 失败=failed, refresh=False)
+                        continue
                     
                     # 定期显示进度
                     if (completed + failed) % 100 == 0:
@@ -368,11 +579,18 @@ class MassHyperparameterSystem:
                         
                         print(f"📊 进度统计: 完成 {completed:,}, 失败 {failed:,}, "
                               f"处理速度 {rate:.1f}/分钟, 预计剩余 {eta/60:.1f}小时")
-                
-                except Exception as e:
-                    failed += 1
-                    print(f"❌ [{completed+failed:,}/{len(pending_strategies):,}] {strategy_id} - 异常: {str(e)[:100]}")
-                    self._update_strategy_status(strategy_id, 'failed', error_message=str(e))
+        
+        finally:
+            if progress is not None:
+                progress.close()
+            
+            # 写入剩余结果 (异常退出时也不丢失已完成的结果)
+            self._save_backtest_results(pending_rows)
+            
+            self._close_workers()
+            if config_shm is not None:
+                config_shm.close()
+                config_shm.unlink()
         
         total_time = time.time() - start_time
         
@@ -409,6 +627,10 @@ class MassHyperparameterSystem:
         """执行单个策略"""
         strategy_id = strategy_config['strategy_id']
         
+        if self._abort.is_set():
+            # 已中止：保持 pending 状态，便于断点续跑
+            return {'success': False, 'aborted': True, 'error': 'Aborted'}
+        
         try:
             # 更新状态为运行中
             self._update_strategy_status(strategy_id, 'running')
@@ -429,14 +651,12 @@ class MassHyperparameterSystem:
                 self._update_strategy_status(strategy_id, 'failed', error_message="Backtest execution failed")
                 return {'success': False, 'error': 'Backtest failed'}
             
-            # 保存结果
-            self._save_backtest_result(strategy_config, backtest_result)
-            self._update_strategy_status(strategy_id, 'backtest_completed')
-            
+            # 结果行交由主循环批量写入 (同时更新为 backtest_completed)
             return {
                 'success': True,
                 'total_return': backtest_result.get('total_return', 0),
-                'sharpe_ratio': backtest_result.get('sharpe_ratio', 0)
+                'sharpe_ratio': backtest_result.get('sharpe_ratio', 0),
+                'result_row': self._build_result_row(strategy_config, backtest_result)
             }
             
         except Exception as e:
@@ -445,124 +665,102 @@ class MassHyperparameterSystem:
     
     def _run_factor_strategy(self, strategy_config: Dict[str, Any], 
                            start_date: str, end_date: str) -> bool:
-        """运行因子策略"""
-        # 动态注册策略
-        registered_name = self._register_temp_strategy(strategy_config)
-        
-        try:
-            # 构建命令
-            cmd = [
-                sys.executable,
-                os.path.join(self.project_root, 'factor_strategies', 'run_factor_strategies.py'),
-                '--start_date', start_date,
-                '--end_date', end_date,
-                '--strategy', registered_name,
-                '--auto'
-            ]
-            
-            # 执行命令
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                cwd=self.project_root,
-                timeout=600  # 10分钟超时
-            )
-            
-            return result.returncode == 0
-            
-        except subprocess.TimeoutExpired:
-            return False
-        except Exception:
-            return False
-        finally:
-            # 清理临时策略
-            self._unregister_temp_strategy(registered_name)
+        """运行因子策略 (交由常驻工作进程执行)"""
+        if self._factor_workers is None:
+            self._factor_workers = FactorWorkerPool(self._worker_count, self.project_root)
+        
+        task = {
+            'strategy_name': strategy_config['strategy_id'],
+            'factor_strategy': self._build_factor_strategy(strategy_config),
+            'start_date': start_date,
+            'end_date': end_date
+        }
+        result = self._factor_workers.run(task, timeout=600)  # 10分钟超时
+        return result.get('success', False)
+    
+    def _close_workers(self):
+        """关闭常驻因子/回测工作进程"""
+        if self._factor_workers is not None:
+            self._factor_workers.close()
+            self._factor_workers = None
+        if self._backtest_workers is not None:
+            self._backtest_workers.close()
+            self._backtest_workers = None
+    
+    def __getstate__(self):
+        # 工作进程池不随系统实例传递到进程池，由各进程自行创建
+        state = self.__dict__.copy()
+        state['_factor_workers'] = None
+        state['_backtest_workers'] = None
+        state['_abort'] = threading.Event()  # Event 无法序列化，进程内各自持有 (中止靠取消排队任务)
+        return state
     
     def _run_backtest(self, strategy_config: Dict[str, Any], 
                      start_date: str, end_date: str) -> Optional[Dict[str, Any]]:
-        """运行回测"""
-        backtest_params = self.config.get('backtest', {})
+        """运行回测 (交由常驻回测工作进程执行)"""
+        if self._backtest_workers is None:
+            self._backtest_workers = BacktestWorkerPool(self._worker_count, self.project_root)
         
-        try:
-            # 构建回测命令
-            cmd = [
-                sys.executable,
-                os.path.join(self.project_root, 'backtest_v5.py'),
-                strategy_config['strategy_id'],  # 策略名
-                start_date,
-                end_date,
-                str(backtest_params.get('initial_capital', 10000)),
-                str(backtest_params.get('position_size', 0.25)),
-                str(backtest_params.get('fee_rate', 0.001)),
-                str(backtest_params.get('max_positions', 4)),
-                str(backtest_params.get('entry_top_n', 4)),
-                str(backtest_params.get('exit_threshold', 10))
-            ]
-            
-            # 执行回测
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                cwd=self.project_root,
-                timeout=300  # 5分钟超时
-            )
-            
-            if result.returncode == 0:
-                return self._parse_backtest_output(result.stdout)
-            else:
-                return None
-                
-        except subprocess.TimeoutExpired:
-            return None
-        except Exception:
+        backtest_params = self.config.get('backtest', {})
+        task = {
+            'strategy_id': strategy_config['strategy_id'],
+            'config': {
+                'strategy_name': strategy_config['strategy_id'],
+                'start_date': start_date,
+                'end_date': end_date,
+                'initial_capital': backtest_params.get('initial_capital', 10000),
+                'position_size': backtest_params.get('position_size', 0.25),
+                'fee_rate': backtest_params.get('fee_rate', 0.001),
+                'max_positions': backtest_params.get('max_positions', 4),
+                'entry_top_n': backtest_params.get('entry_top_n', 4),
+                'exit_threshold': backtest_params.get('exit_threshold', 10)
+            }
+        }
+        result = self._backtest_workers.run(task, timeout=300)  # 5分钟超时
+        if not result.get('success'):
             return None
+        return self._backtest_metrics(result)
+    
+    @staticmethod
+    def _backtest_metrics(result: Dict[str, Any]) -> Dict[str, Any]:
+        """从批量回测结果中取出结果表所需的指标"""
+        performance = result['performance']
+        backtest_days = result['backtest_period'].get('backtest_days') or 0
+        total_roi = performance['total_roi']
+        annual_return = total_roi * 365 / backtest_days if backtest_days else 0.0
+        
+        return {
+            'total_return': total_roi * 100,
+            'annual_return': annual_return * 100,
+            'sharpe_ratio': performance['sharpe_ratio'],
+            'max_drawdown': performance['max_drawdown'] * 100,
+            'win_rate': performance['win_rate'] * 100,
+            'total_trades': result['execution_summary']['positions_taken']
+        }
     
-    def _parse_backtest_output(self, output: str) -> Dict[str, Any]:
-        """解析回测输出"""
-        import re
-        
-        result = {}
-        lines = output.split('\n')
-        
-        for line in lines:
-            # 提取关键指标
-            if '总收益率' in line or 'Total Return' in line:
-                numbers = re.findall(r'-?\d+\.?\d*', line)
-                if numbers:
-                    result['total_return'] = float(numbers[-1])
-            elif '年化收益率' in line or 'Annual Return' in line:
-                numbers = re.findall(r'-?\d+\.?\d*', line)
-                if numbers:
-                    result['annual_return'] = float(numbers[-1])
-            elif '夏普比率' in line or 'Sharpe Ratio' in line:
-                numbers = re.findall(r'-?\d+\.?\d*', line)
-                if numbers:
-                    result['sharpe_ratio'] = float(numbers[-1])
-            elif '最大回撤' in line or 'Max Drawdown' in line:
-                numbers = re.findall(r'-?\d+\.?\d*', line)
-                if numbers:
-                    result['max_drawdown'] = float(numbers[-1])
-            elif '胜率' in line or 'Win Rate' in line:
-                numbers = re.findall(r'-?\d+\.?\d*', line)
-                if numbers:
-                    result['win_rate'] = float(numbers[-1])
-            elif '交易次数' in line or 'Total Trades' in line:
-                numbers = re.findall(r'\d+', line)
-                if numbers:
-                    result['total_trades'] = int(numbers[-1])
-        
-        return result
-    
-    def _register_temp_strategy(self, strategy_config: Dict[str, Any]) -> str:
-        """临时注册策略"""
-        # 这里简化处理，实际应该动态注册到 FACTOR_STRATEGIES
-        return strategy_config['strategy_id']
-    
-    def _unregister_temp_strategy(self, strategy_name: str):
-        """取消临时策略注册"""
-        pass
+    def _build_factor_strategy(self, strategy_config: Dict[str, Any]) -> Dict[str, Any]:
+        """构建 FACTOR_STRATEGIES 格式的策略配置 (在工作进程内注册)"""
+        factors_dict = {}
+        for factor_func in strategy_config['factors']:
+            factors_dict[factor_name(factor_func)] = {
+                'function': factor_func,
+                'window': strategy_config['window'],
+                'input_col': strategy_config['input_column']
+            }
+        
+        return {
+            'name': f"HyperTuned_{strategy_config['strategy_id']}",
+            'description': f"超参数调优生成的策略: {strategy_config['strategy_id']}",
+            'data_requirements': {
+                'min_data_days': strategy_config['min_data_days'],
+                'skip_first_n_days': strategy_config['skip_first_n_days']
+            },
+            'factors': factors_dict,
+            'ranking_logic': {
+                'indicators': list(factors_dict.keys()),
+                'weights': equal_weights(len(factors_dict))  # 等权重
+            }
+        }
     
     def _update_strategy_status(self, strategy_id: str, status: str, error_message: str = None):
         """更新策略状态"""
@@ -580,12 +778,37 @@ class MassHyperparameterSystem:
                     WHERE strategy_id = ?
                 """, (status, strategy_id))
     
-    def _save_backtest_result(self, strategy_config: Dict[str, Any], backtest_result: Dict[str, Any]):
-        """保存回测结果"""
+    def _build_result_row(self, strategy_config: Dict[str, Any], backtest_result: Dict[str, Any]) -> tuple:
+        """构建一条回测结果记录"""
         backtest_params = self.config.get('backtest', {})
         
+        return (
+            self.session_id,
+            strategy_config['strategy_id'],
+            json.dumps(strategy_config['factors']),
+            strategy_config['window'],
+            strategy_config['input_column'],
+            strategy_config['min_data_days'],
+            strategy_config['skip_first_n_days'],
+            strategy_config['weight_method'],
+            backtest_params.get('start_date'),
+            backtest_params.get('end_date'),
+            backtest_params.get('initial_capital', 10000),
+            backtest_result.get('total_return'),
+            backtest_result.get('annual_return'),
+            backtest_result.get('sharpe_ratio'),
+            backtest_result.get('max_drawdown'),
+            backtest_result.get('win_rate'),
+            backtest_result.get('total_trades')
+        )
+    
+    def _save_backtest_results(self, rows: List[tuple]):
+        """批量保存回测结果，并将对应策略标记为 backtest_completed"""
+        if not rows:
+            return
+        
         with sqlite3.connect(self.results_db_path) as conn:
-            conn.execute("""
+            conn.executemany("""
                 INSERT OR REPLACE INTO hyperparameter_tuning_results (
                     session_id, strategy_id, factors, window, input_column,
                     min_data_days, skip_first_n_days, weight_method,
@@ -593,25 +816,15 @@ class MassHyperparameterSystem:
                     total_return, annual_return, sharpe_ratio, max_drawdown,
                     win_rate, total_trades
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                self.session_id,
-                strategy_config['strategy_id'],
-                json.dumps(strategy_config['factors']),
-                strategy_config['window'],
-                strategy_config['input_column'],
-                strategy_config['min_data_days'],
-                strategy_config['skip_first_n_days'],
-                strategy_config['weight_method'],
-                backtest_params.get('start_date'),
-                backtest_params.get('end_date'),
-                backtest_params.get('initial_capital', 10000),
-                backtest_result.get('total_return'),
-                backtest_result.get('annual_return'),
-                backtest_result.get('sharpe_ratio'),
-                backtest_result.get('max_drawdown'),
-                backtest_result.get('win_rate'),
-                backtest_result.get('total_trades')
-            ))
+            """, rows)
+        
+        # 结果落盘后再更新状态，中断时未写入的策略会在续跑时重新执行
+        with sqlite3.connect(self.progress_db_path) as conn:
+            conn.executemany("""
+                UPDATE strategy_progress 
+                SET status = 'backtest_completed', end_time = CURRENT_TIMESTAMP
+                WHERE strategy_id = ?
+            """, [(row[1],) for row in rows])
     
     def _generate_summary(self) -> Dict[str, Any]:
         """生成执行总结"""
@@ -674,8 +887,13 @@ class MassHyperparameterSystem:
         
         # 保存到文件
         analysis_file = os.path.join(self.work_dir, f"performance_analysis_{self.session_id}.json")
-        with open(analysis_file, 'w', encoding='utf-8') as f:
-            json.dump(analysis_result, f, indent=2, ensure_ascii=False)
+        if orjson is not None:
+            option = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            with open(analysis_file, 'wb') as f:
+                f.write(orjson.dumps(analysis_result, option=option, default=str))
+        else:
+            with open(analysis_file, 'w', encoding='utf-8') as f:
+                json.dump(analysis_result, f, indent=2, ensure_ascii=False, default=str)
         
         print(f"📄 分析结果已保存: {analysis_file}")
         
@@ -13,6 +13,8 @@ import time
 import subprocess
 import json
 import random
+import copy
+import functools
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Tuple
 from itertools import combinations
@@ -23,6 +25,22 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 
+from factor_strategies.factor_strategy_config import equal_weights, factor_name
+
+@functools.lru_cache(maxsize=8)
+def _load_yaml_cached(config_path: str, mtime_ns: int) -> Dict[str, Any]:
+    """按 (绝对路径, 修改时间) 缓存解析结果，文件变更后自动重新解析"""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def load_yaml_config(config_path: str) -> Dict[str, Any]:
+    """读取YAML配置 (同一文件只解析一次，返回深拷贝避免调用方修改缓存)"""
+    config_path = os.path.abspath(config_path)
+    config = _load_yaml_cached(config_path, os.stat(config_path).st_mtime_ns)
+    return copy.deepcopy(config)
+
+
 class OptimizedHyperparameterTuner:
     """优化版超参数调优器"""
     
@@ -57,8 +75,7 @@ class OptimizedHyperparameterTuner:
         if not config_path:
             raise FileNotFoundError(f"配置文件不存在，尝试的路径: {possible_paths}")
         
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
+        config = load_yaml_config(config_path)
         
         print(f"✅ 配置文件加载成功: {config_path}")
         return config
@@ -170,16 +187,13 @@ class OptimizedHyperparameterTuner:
         
         # 构建因子配置
         factors_dict = {}
-        weights = []
         
         for i, factor_func in enumerate(strategy_config['factors']):
-            factor_name = f"F_{factor_func.replace('calculate_', '')}"
-            factors_dict[factor_name] = {
+            factors_dict[factor_name(factor_func)] = {
                 'function': factor_func,
                 'window': strategy_config['window'],
                 'input_col': strategy_config['input_column']
             }
-            weights.append(1.0 / len(strategy_config['factors']))  # 等权重
         
         # 构建完整策略配置
         factor_strategy = {
@@ -192,7 +206,7 @@ class OptimizedHyperparameterTuner:
             'factors': factors_dict,
             'ranking_logic': {
                 'indicators': list(factors_dict.keys()),
-                'weights': weights
+                'weights': equal_weights(len(strategy_config['factors']))  # 等权重
             }
         }
         
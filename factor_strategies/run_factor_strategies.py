@@ -22,7 +22,7 @@
 import sys
 import os
 import time
-from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
 import argparse
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -32,7 +32,7 @@ import threading
 # 添加父目錄到 Python 路徑
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from factor_strategies.factor_engine import FactorEngine
+from factor_strategies.factor_engine import FactorEngine, MAIN_DB_PATH
 from factor_strategies.factor_strategy_config import FACTOR_STRATEGIES
 from database_operations import DatabaseManager
 
@@ -53,11 +53,7 @@ def get_available_dates_from_database():
     """
     try:
         # 使用與 FactorEngine 相同的數據庫路徑
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(current_dir)
-        db_path = os.path.join(project_root, "data", "funding_rate.db")
-        
-        db = DatabaseManager(db_path)
+        db = DatabaseManager(MAIN_DB_PATH)
         with db.get_connection() as conn:
             query = "SELECT DISTINCT date FROM return_metrics ORDER BY date"
             result = pd.read_sql_query(query, conn)
@@ -88,17 +84,8 @@ def generate_date_range(start_date, end_date):
     Returns:
         list: 日期字符串列表
     """
-    start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-    end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-    
-    dates = []
-    current_dt = start_dt
-    
-    while current_dt <= end_dt:
-        dates.append(current_dt.strftime('%Y-%m-%d'))
-        current_dt += timedelta(days=1)
-    
-    return dates
+    # datetime64[D] 整體轉換為字符串，不經過逐日 strftime
+    return np.datetime_as_string(pd.date_range(start_date, end_date, freq='D').values, unit='D').tolist()
 
 def print_available_strategies():
     """顯示所有可用策略"""
@@ -136,7 +123,7 @@ def select_strategies_interactively():
             except ValueError:
                 print(f"❌ 無效輸入。可用策略: {list(FACTOR_STRATEGIES.keys())} 或 'all'")
 
-def run_strategy_for_date(engine: FactorEngine, strategy_name: str, target_date: str):
+def run_strategy_for_date(engine: FactorEngine, strategy_name: str, target_date: str, strategy_def: dict = None):
     """
     為特定日期執行單個策略
     
@@ -144,20 +131,21 @@ def run_strategy_for_date(engine: FactorEngine, strategy_name: str, target_date:
         engine: FactorEngine 實例
         strategy_name: 策略名稱
         target_date: 目標日期
+        strategy_def: 策略定義 (可選，動態策略直接傳入而不註冊到 FACTOR_STRATEGIES)
         
     Returns:
         bool: 是否執行成功
     """
     try:
         # 預檢查數據是否充足
-        is_sufficient, message = engine.check_data_sufficiency(strategy_name, target_date)
+        is_sufficient, message = engine.check_data_sufficiency(strategy_name, target_date, strategy_def)
         
         if not is_sufficient:
             print(f"⚠️ 跳過 {target_date}: {message}")
             return False
         
         # 執行策略
-        result = engine.run_strategy(strategy_name, target_date)
+        result = engine.run_strategy(strategy_name, target_date, strategy_def=strategy_def)
         
         if not result.empty:
             print(f"✅ {target_date}: {len(result)} 個交易對")
@@ -513,10 +501,7 @@ def main():
         print(f"\n📊 最新結果預覽:")
         try:
             # 使用與 FactorEngine 相同的數據庫路徑
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            project_root = os.path.dirname(current_dir)
-            db_path = os.path.join(project_root, "data", "funding_rate.db")
-            db = DatabaseManager(db_path)
+            db = DatabaseManager(MAIN_DB_PATH)
             
             latest_date = dates_to_process[-1]
             latest_strategy = selected_strategies[0]
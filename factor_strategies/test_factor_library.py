@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+因子庫向量化實現等價性測試腳本
+對比 calculate_weighted_scores / multi_window_sharpe 與原逐交易對、逐窗口公式的結果
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加項目根目錄到路徑
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from factor_strategies.factor_library import (
+    calculate_sharpe_ratio, calculate_weighted_scores, multi_window_sharpe
+)
+
+RNG_SEED = 20250701
+
+
+def _reference_weighted_score(z_row: np.ndarray, valid_row: np.ndarray, weights: np.ndarray) -> float:
+    """原逐交易對公式：Σ(z × 權重) / Σ(有效權重)，無效因子不計入，沒有有效權重時為 NaN"""
+    weighted_sum = 0.0
+    total_weight = 0.0
+    for z_score, valid, weight in zip(z_row, valid_row, weights):
+        if valid:
+            weighted_sum += z_score * weight
+            total_weight += weight
+    if total_weight == 0:
+        return np.nan
+    return weighted_sum / total_weight
+
+
+def _reference_sharpe(values: np.ndarray, window: int, annualizing_factor: int, max_sharpe: float) -> float:
+    """原逐窗口公式：取最近 window 個數據點，數據點不足時為 NaN，否則調用 calculate_sharpe_ratio"""
+    recent = pd.Series(values).tail(window)
+    if len(recent) < max(2, min(window // 4, 3)):
+        return np.nan
+    return float(calculate_sharpe_ratio(recent, annualizing_factor=annualizing_factor, max_sharpe=max_sharpe))
+
+
+def _random_scores(rng: np.random.Generator, n_pairs: int, n_factors: int, nan_ratio: float = 0.2):
+    """生成帶 NaN 的隨機標準化分數矩陣，並保證至少一個交易對沒有任何有效因子"""
+    z_matrix = rng.normal(size=(n_pairs, n_factors))
+    z_matrix[rng.random((n_pairs, n_factors)) < nan_ratio] = np.nan
+    z_matrix[0, :] = np.nan
+    return z_matrix, ~np.isnan(z_matrix)
+
+
+def test_weighted_scores():
+    """測試加權分數：隨機數據 (含NaN)、零權重、單因子"""
+    print("🧪 測試 calculate_weighted_scores 與逐交易對公式一致")
+    print("=" * 60)
+
+    rng = np.random.default_rng(RNG_SEED)
+    cases = []
+    for n_factors in (1, 2, 3, 5):
+        cases.append((f"{n_factors}因子 隨機權重", n_factors, rng.random(n_factors)))
+        cases.append((f"{n_factors}因子 等權重", n_factors, np.full(n_factors, 1.0 / n_factors)))
+        cases.append((f"{n_factors}因子 全零權重", n_factors, np.zeros(n_factors)))
+        if n_factors > 1:
+            weights = rng.random(n_factors)
+            weights[0] = 0.0
+            cases.append((f"{n_factors}因子 含零權重", n_factors, weights))
+
+    all_passed = True
+    for case_name, n_factors, weights in cases:
+        z_matrix, valid_mask = _random_scores(rng, 200, n_factors)
+
+        expected = np.array([
+            _reference_weighted_score(z_matrix[i], valid_mask[i], weights) for i in range(len(z_matrix))
+        ])
+        actual = calculate_weighted_scores(z_matrix, valid_mask, weights)
+
+        passed = actual.shape == expected.shape and np.allclose(actual, expected, equal_nan=True)
+        all_passed &= passed
+        print(f"   {'✅' if passed else '❌'} {case_name}")
+
+    # 多策略權重矩陣 (因子數, 策略數) 按列與單策略結果一致
+    z_matrix, valid_mask = _random_scores(rng, 200, 4)
+    weight_matrix = rng.random((4, 3))
+    weight_matrix[:, 2] = 0.0
+    actual = calculate_weighted_scores(z_matrix, valid_mask, weight_matrix)
+    passed = all(
+        np.allclose(actual[:, k], [
+            _reference_weighted_score(z_matrix[i], valid_mask[i], weight_matrix[:, k]) for i in range(len(z_matrix))
+        ], equal_nan=True)
+        for k in range(weight_matrix.shape[1])
+    )
+    all_passed &= passed
+    print(f"   {'✅' if passed else '❌'} 多策略權重矩陣")
+
+    return all_passed
+
+
+def test_multi_window_sharpe():
+    """測試多窗口夏普比率：隨機數據 (含NaN)、常數序列、數據不足"""
+    print("🧪 測試 multi_window_sharpe 與逐窗口 calculate_sharpe_ratio 一致")
+    print("=" * 60)
+
+    rng = np.random.default_rng(RNG_SEED)
+    windows = (1, 2, 3, 5, 7, 14, 30, 60, 90, 120)
+
+    with_nan = rng.normal(0.001, 0.02, size=100)
+    with_nan[rng.random(100) < 0.15] = np.nan
+    nan_tail = rng.normal(0.001, 0.02, size=40)
+    nan_tail[-10:] = np.nan
+
+    cases = [
+        ("隨機序列", rng.normal(0.001, 0.02, size=150)),
+        ("含NaN序列", with_nan),
+        ("尾部全為NaN", nan_tail),
+        ("常數正收益", np.full(50, 0.01)),
+        ("常數負收益", np.full(50, -0.01)),
+        ("全零收益", np.zeros(50)),
+        ("數據不足", rng.normal(size=2)),
+        ("極值截斷", np.r_[np.full(20, 0.5), 0.5 + 1e-12]),
+    ]
+
+    all_passed = True
+    for case_name, values in cases:
+        for annualizing_factor, max_sharpe in ((365, 1000.0), (252, 5.0)):
+            actual = multi_window_sharpe(values, windows, annualizing_factor, max_sharpe)
+            expected = {
+                window: _reference_sharpe(values, window, annualizing_factor, max_sharpe) for window in windows
+            }
+            passed = all(
+                np.isclose(actual[window], expected[window], equal_nan=True) for window in windows
+            )
+            all_passed &= passed
+            print(f"   {'✅' if passed else '❌'} {case_name} (年化{annualizing_factor}, 上限{max_sharpe})")
+
+    return all_passed
+
+
+def main():
+    """主測試函數"""
+    print("🚀 因子庫向量化實現等價性測試")
+    print("=" * 80)
+
+    tests = [
+        ("加權分數測試", test_weighted_scores),
+        ("多窗口夏普比率測試", test_multi_window_sharpe),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                passed += 1
+                print(f"\n✅ {test_name} 通過")
+            else:
+                print(f"\n❌ {test_name} 失敗")
+        except Exception as e:
+            print(f"\n❌ {test_name} 異常: {e}")
+
+    print(f"\n📊 測試結果: {passed}/{total} 通過")
+
+    return 0 if passed == total else 1
+
+
+if __name__ == "__main__":
+    exit(main())